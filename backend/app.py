@@ -13,11 +13,14 @@ Why Flask?
 - Great documentation
 """
 
-from flask import Flask, request, jsonify, send_file, send_from_directory
+from flask import Flask, Response, request, jsonify, send_file, redirect
 from flask_cors import CORS
 from pathlib import Path
-from typing import Tuple
+from typing import Dict, Tuple
+from urllib.parse import quote
 import os
+import threading
+import time
 from backend.config import (
     FLASK_DEBUG, 
     FLASK_PORT, 
@@ -25,23 +28,131 @@ from backend.config import (
     FLASK_ENV,
     SECRET_KEY,
     DOWNLOADS_DIR,
-    MAX_REQUESTS_PER_HOUR
+    WORK_DIR,
+    MAX_REQUESTS_PER_HOUR,
+    DELIVERY_MODE,
+    RESUME_INTERRUPTED_JOBS,
+    AUDIO_DEFAULT_FORMAT,
+    PREFETCH_ENABLED,
+    HEALTH_CACHE_SECONDS,
+    MAX_REQUEST_BODY_BYTES
 )
 from backend.download_service import DownloadService
+from backend.job_store import job_store
+from backend.artifact_store import artifact_store
+from backend.cluster import cluster, FORWARDED_HEADER, FORWARD_REQUEST_HEADERS, NodeUnreachable
+from backend.circuit_breaker import circuit_breaker
+from backend.prefetcher import Prefetcher
+from backend.egress_pool import egress_pool
+from backend.client_selector import client_selector
+from backend.bandwidth import bandwidth, CLASS_FILE, CLASS_PROXY
 from backend.rate_limiter import rate_limiter
-from backend.security import sanitize_filename, is_safe_path, get_client_ip, validate_domain
+from backend.request_checks import request_checks, RequestRejected
+from backend.scheduler import download_scheduler
+from backend.stream_proxy import stream_proxy
+from backend.thumbnail_cache import thumbnail_cache
+from backend.static_assets import StaticAssets
+from backend.responses import (
+    FastJSONProvider,
+    json_bytes_response,
+    envelope,
+    dumps,
+    CACHE_NONE,
+    CACHE_PROBE,
+    CACHE_FORMATS,
+)
+from backend.subtitles import SUBTITLE_FORMATS, MIMETYPES as SUBTITLE_MIMETYPES, SubtitlesNotFound
+from backend.url_classifier import classify_url
+from backend.security import sanitize_filename, is_safe_path, get_client_ip
 
 # Initialize Flask app
 app = Flask(__name__)
 app.config['SECRET_KEY'] = SECRET_KEY
+# Every request body is a small JSON object (see request_checks.py)
+app.config['MAX_CONTENT_LENGTH'] = MAX_REQUEST_BODY_BYTES
+# jsonify through orjson when available
+app.json = FastJSONProvider(app)
 
 # Enable CORS (Cross-Origin Resource Sharing)
 # Allow all origins in production (since frontend is served from same origin)
 CORS(app, resources={r"/api/*": {"origins": "*"}})
 
+# Frontend files, hashed and precompressed once at startup
+FRONTEND_DIR = Path(__file__).resolve().parent.parent / 'frontend'
+static_assets = StaticAssets(FRONTEND_DIR, reload=FLASK_DEBUG)
+
 # Initialize download service
 download_service = DownloadService()
 
+# Pick up downloads a previous worker left behind
+job_store.recover(DOWNLOADS_DIR, WORK_DIR)
+if RESUME_INTERRUPTED_JOBS:
+    threading.Thread(target=download_service.resume_interrupted_jobs, daemon=True).start()
+
+# Keep info for the most requested URLs warm
+prefetcher = Prefetcher(download_service)
+if PREFETCH_ENABLED:
+    prefetcher.start()
+
+
+def forward_to_owner(url: str):
+    """
+    In a cluster, hand the request to the node that owns this video.
+    
+    Returns the owner's response, or None to handle the request here (no
+    cluster, this node is the owner, already forwarded, or owner down).
+    """
+    if request.headers.get(FORWARDED_HEADER):
+        return None
+    owner = cluster.owner(url)
+    if owner is None:
+        return None
+    
+    headers = {name: request.headers[name] for name in FORWARD_REQUEST_HEADERS if request.headers.get(name)}
+    headers.setdefault('Content-Type', 'application/json')
+    # Rate limits and scheduling stay per real client
+    headers['X-Forwarded-For'] = get_client_ip(request)
+    try:
+        status, response_headers, body = cluster.forward(
+            owner, request.method, request.full_path, request.get_data(), headers
+        )
+    except NodeUnreachable:
+        return None
+    except Exception:
+        # The owner got the request and may be working on it - don't start
+        # the same work here
+        return jsonify({
+            'status': 'error',
+            'message': 'The server handling this video did not answer in time. Please try again.'
+        }), 504
+    return Response(body, status=status, headers=response_headers)
+
+
+@app.after_request
+def default_cache_control(response):
+    """API JSON is per-request unless the endpoint says otherwise."""
+    if request.path.startswith('/api/') and response.mimetype == 'application/json':
+        response.headers.setdefault('Cache-Control', CACHE_NONE)
+    return response
+
+
+@app.after_request
+def meter_interactive(response):
+    """Count API/page bytes (bulk transfers are metered as they stream)."""
+    if not response.direct_passthrough and not response.is_streamed:
+        bandwidth.record_interactive(response.calculate_content_length() or 0)
+    return response
+
+
+def shaped(response: Response, traffic_class: str) -> Response:
+    """Throttle a bulk transfer to the client's and this process's bandwidth share."""
+    if bandwidth.shaping:
+        response.response = bandwidth.throttle(response.response, get_client_ip(request), traffic_class)
+    else:
+        # No limits - keep the sendfile fast path and just count the bytes
+        bandwidth.meter.record(traffic_class, response.content_length or 0)
+    return response
+
 
 # ============================================================================
 # API ENDPOINTS
@@ -52,10 +163,7 @@ def index():
     """
     Root endpoint - serves frontend HTML.
     """
-    from flask import send_from_directory
-    import os
-    frontend_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'frontend')
-    return send_from_directory(frontend_dir, 'index.html')
+    return static_assets.response('index.html', request)
 
 
 @app.route('/api/validate', methods=['POST'])
@@ -75,34 +183,26 @@ def validate_url():
         }
     """
     try:
-        data = request.get_json()
+        try:
+            url = request_checks.url_field(request_checks.json_body(request).get('url'))
+        except RequestRejected as e:
+            return rejection(e, {'valid': False})
         
-        if not data or 'url' not in data:
-            return jsonify({
-                'valid': False,
-                'message': 'URL is required'
-            }), 400
-        
-        url = data['url']
-        
-        # Domain validation
-        if not validate_domain(url):
-            return jsonify({
-                'valid': False,
-                'message': 'Domain not allowed'
-            }), 403
+        error = check_url(url, {'valid': False})
+        if error is not None:
+            return error
         
+        prefetcher.record(url)
         is_valid, error_msg = download_service.validate_url(url)
         
         if is_valid:
-            # Get video info if valid
+            # Get video info if valid (serialized once per cache entry)
             try:
-                video_info = download_service.get_video_info(url)
-                return jsonify({
+                video_info = download_service.get_video_info_json(url)
+                return json_bytes_response(envelope({
                     'valid': True,
-                    'message': 'URL is valid',
-                    'video_info': video_info
-                })
+                    'message': 'URL is valid'
+                }, 'video_info', video_info))
             except Exception as e:
                 return jsonify({
                     'valid': True,
@@ -122,6 +222,174 @@ def validate_url():
         }), 500
 
 
+@app.route('/api/info', methods=['GET'])
+def video_info():
+    """
+    Tiered video information.
+    
+    Query params:
+        url: The video URL
+        tier: "probe" (default) - title/thumbnail only, from oEmbed or a
+              flat extraction; fast enough to call on every Enter press
+              "formats" - full extraction with the format list; fetch it
+              lazily when the user opens the quality selector
+    
+    Response:
+        {
+            "valid": true/false,
+            "message": "...",
+            "video_info": {...}
+        }
+    """
+    url = (request.args.get('url') or '').strip()
+    tier = request.args.get('tier', 'probe')
+    
+    if tier not in ('probe', 'formats'):
+        return jsonify({
+            'valid': False,
+            'message': 'tier must be "probe" or "formats"'
+        }), 400
+    
+    # Probes mostly go to oEmbed, which works even while yt-dlp is blocked
+    error = check_url(url, {'valid': False}, breaker=tier == 'formats')
+    if error is not None:
+        return error
+    
+    prefetcher.record(url)
+    try:
+        if tier == 'probe':
+            info = download_service.probe_json(url)
+        else:
+            info = download_service.get_video_info_json(url)
+    except Exception as e:
+        return jsonify({
+            'valid': False,
+            'message': str(e)
+        }), 400
+    
+    # Same bytes for the same cache entry - ETag lets browsers revalidate for free
+    return json_bytes_response(
+        envelope({'valid': True, 'message': 'URL is valid'}, 'video_info', info),
+        request=request,
+        cache_control=CACHE_PROBE if tier == 'probe' else CACHE_FORMATS
+    )
+
+
+def rejection(e: RequestRejected, error_fields: Dict) -> Response:
+    """Error response for a failed request check."""
+    response = jsonify({**error_fields, 'message': e.message, **e.extra})
+    response.status_code = e.status
+    if 'retry_after' in e.extra:
+        response.headers['Retry-After'] = str(e.extra['retry_after'])
+    return response
+
+
+def check_url(url: str, error_fields: Dict, breaker: bool = True):
+    """
+    Cheap checks for a URL before any extraction (see request_checks.py).
+    
+    Returns an error response, the owner's response when another node owns
+    the video, or None if the request should be handled here.
+    """
+    try:
+        platform = request_checks.target(request_checks.url_field(url)).platform
+    except RequestRejected as e:
+        return rejection(e, error_fields)
+    
+    forwarded = forward_to_owner(url)
+    if forwarded is not None:
+        return forwarded
+    
+    try:
+        if breaker:
+            request_checks.breaker(platform)
+    except RequestRejected as e:
+        return rejection(e, error_fields)
+    request_checks.passed()
+    return None
+
+
+@app.route('/api/metadata', methods=['GET'])
+def video_metadata():
+    """
+    Metadata without media: description, chapters, tags and the languages
+    available for /api/subtitles.
+    
+    Query params:
+        url: The video URL
+    """
+    url = (request.args.get('url') or '').strip()
+    error = check_url(url, {'status': 'error'})
+    if error is not None:
+        return error
+    
+    prefetcher.record(url)
+    try:
+        metadata = download_service.get_metadata_json(url)
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    
+    return json_bytes_response(
+        envelope({'status': 'success'}, 'metadata', metadata),
+        request=request,
+        cache_control=CACHE_FORMATS
+    )
+
+
+@app.route('/api/subtitles', methods=['GET'])
+def video_subtitles():
+    """
+    Download one subtitle track as a file.
+    
+    Query params:
+        url: The video URL
+        lang: Language code from /api/metadata (e.g. "en")
+        format: "srt" (default) or "vtt"
+        auto: "1" for the platform's automatic captions
+    """
+    url = (request.args.get('url') or '').strip()
+    lang = (request.args.get('lang') or '').strip()
+    subtitle_format = request.args.get('format', 'srt').lower()
+    auto = request.args.get('auto', '0').lower() in ('1', 'true')
+    
+    if not lang:
+        return jsonify({
+            'status': 'error',
+            'message': 'lang is required (see /api/metadata for available languages)'
+        }), 400
+    if subtitle_format not in SUBTITLE_FORMATS:
+        return jsonify({
+            'status': 'error',
+            'message': 'format must be "srt" or "vtt"'
+        }), 400
+    error = check_url(url, {'status': 'error'})
+    if error is not None:
+        return error
+    
+    prefetcher.record(url)
+    try:
+        text = download_service.get_subtitles(url, lang, subtitle_format, auto)
+    except SubtitlesNotFound as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 404
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    
+    filename = sanitize_filename(f"{classify_url(url).video_id or 'subtitles'}.{lang}.{subtitle_format}")
+    return Response(text.encode('utf-8'), content_type=SUBTITLE_MIMETYPES[subtitle_format], headers={
+        'Content-Disposition': f"attachment; filename*=UTF-8''{quote(filename)}",
+        'Cache-Control': CACHE_FORMATS,
+    })
+
+
 @app.route('/api/download', methods=['POST'])
 def download():
     """
@@ -131,7 +399,11 @@ def download():
         {
             "url": "https://...",
             "format_id": "optional format ID",
-            "audio_only": true/false
+            "audio_only": true/false,
+            "audio_format": "native/mp3" (optional, audio only),
+            "start": seconds or "mm:ss" (optional clip start),
+            "end": seconds or "mm:ss" (optional clip end),
+            "delivery": "auto/server" (optional)
         }
     
     Response:
@@ -139,30 +411,40 @@ def download():
             "status": "success/error",
             "message": "...",
             "filename": "...",
-            "download_url": "/api/file/..."
+            "delivery": "direct/proxy/server",
+            "audio_processing": "stream_copy/transcode" (audio only),
+            "download_url": "/api/file/... or the platform's media URL"
         }
     """
     try:
-        data = request.get_json()
-        
-        if not data or 'url' not in data:
-            return jsonify({
-                'status': 'error',
-                'message': 'URL is required'
-            }), 400
+        # Cheap checks first - nothing below runs for a rejected request
+        try:
+            params = request_checks.download_params(
+                request_checks.json_body(request), AUDIO_DEFAULT_FORMAT, DELIVERY_MODE
+            )
+            url = params['url']
+            platform = request_checks.target(url).platform
+            
+            forwarded = forward_to_owner(url)
+            if forwarded is not None:
+                return forwarded
+            
+            client_ip = get_client_ip(request)
+            request_checks.rate_limit(client_ip)
+            request_checks.breaker(platform)
+        except RequestRejected as e:
+            return rejection(e, {'status': 'error'})
+        request_checks.passed()
         
-        url = data['url']
-        format_id = data.get('format_id')
-        audio_only = data.get('audio_only', False)
+        format_id = params['format_id']
+        audio_only = params['audio_only']
+        audio_format = params['audio_format']
+        delivery = params['delivery']
+        start, end = params['start'], params['end']
+        clipping = start is not None or end is not None
         
-        # Domain validation
-        if not validate_domain(url):
-            return jsonify({
-                'status': 'error',
-                'message': 'Domain not allowed'
-            }), 403
-        
-        # Validate URL first
+        # Validate URL (extraction, usually served from the info cache after this)
+        prefetcher.record(url)
         is_valid, error_msg = download_service.validate_url(url)
         if not is_valid:
             return jsonify({
@@ -170,22 +452,42 @@ def download():
                 'message': error_msg or 'Invalid URL'
             }), 400
         
-        # Check rate limit
-        client_ip = get_client_ip(request)
-        allowed, msg = rate_limiter.is_allowed(client_ip)
-        if not allowed:
-            return jsonify({
-                'status': 'error',
-                'message': msg,
-                'rate_limit_exceeded': True
-            }), 429
+        # Hand out the platform's URL when no server-side work is needed
+        result = None
+        if delivery == 'auto' and not clipping:
+            result = download_service.resolve_direct_url(
+                url=url,
+                format_id=format_id,
+                audio_only=audio_only,
+                audio_format=audio_format
+            )
         
-        # Download
-        result = download_service.download_video(
-            url=url,
-            format_id=format_id,
-            audio_only=audio_only
-        )
+        if result and result['delivery'] == 'proxy':
+            # IP-bound URL - stream it through /api/file instead
+            token = stream_proxy.make_token(result['media_url'], result['http_headers'], result.get('egress'))
+            download_url = f"/api/file/{quote(result['filename'])}?proxy={token}"
+        elif result:
+            download_url = result['media_url']
+        else:
+            # Download (queued fairly behind other clients' jobs)
+            result = download_scheduler.run(
+                lambda: download_service.download_video(
+                    url=url,
+                    format_id=format_id,
+                    audio_only=audio_only,
+                    audio_format=audio_format,
+                    start=start,
+                    end=end
+                ),
+                client_ip=client_ip,
+                lane='audio' if audio_only else 'video',
+                platform=platform,
+                cost=download_service.estimate_cost(url, format_id, audio_only, start, end)
+            )
+            download_url = f"/api/file/{quote(result['filename'])}"
+            if cluster.enabled and not artifact_store.shared:
+                # The file only exists on this node
+                download_url += f"?node={quote(cluster.node_id)}"
         
         # Return success with download URL
         return jsonify({
@@ -194,7 +496,9 @@ def download():
             'filename': result['filename'],
             'filesize': result['filesize'],
             'title': result['title'],
-            'download_url': f"/api/file/{result['filename']}"
+            'delivery': result['delivery'],
+            'audio_processing': result.get('audio_processing'),
+            'download_url': download_url
         })
         
     except Exception as e:
@@ -211,13 +515,34 @@ def serve_file(filename):
     
     Security: Only serves files from downloads directory.
     Prevents directory traversal attacks.
+    
+    With ?proxy=<token>, streams the signed upstream media URL instead
+    (see stream_proxy.py). With ?node=<id>, the file lives on another node
+    of the cluster and is streamed from there. With a shared artifact store
+    (S3), redirects to a presigned URL.
     """
     try:
         # Sanitize filename
         safe_filename = sanitize_filename(filename)
         
+        proxy_token = request.args.get('proxy')
+        if proxy_token:
+            return proxy_file(proxy_token, safe_filename)
+        
+        node = request.args.get('node')
+        if node and node != cluster.node_id and cluster.node_url(node):
+            return node_file(node, safe_filename)
+        
+        if artifact_store.local_path(safe_filename) is None:
+            if not artifact_store.exists(safe_filename):
+                return jsonify({
+                    'status': 'error',
+                    'message': 'File not found'
+                }), 404
+            return redirect(artifact_store.url(safe_filename))
+        
         # Security: Prevent directory traversal
-        file_path = DOWNLOADS_DIR / safe_filename
+        file_path = artifact_store.local_path(safe_filename)
         
         # Ensure the file is actually in downloads directory
         if not is_safe_path(file_path):
@@ -226,18 +551,18 @@ def serve_file(filename):
                 'message': 'Invalid file path'
             }), 403
         
-        if not file_path.exists():
+        if not file_path.is_file():
             return jsonify({
                 'status': 'error',
                 'message': 'File not found'
             }), 404
         
         # Send file to client
-        return send_file(
+        return shaped(send_file(
             str(file_path),
             as_attachment=True,
             download_name=safe_filename
-        )
+        ), CLASS_FILE)
         
     except Exception as e:
         return jsonify({
@@ -246,23 +571,178 @@ def serve_file(filename):
         }), 500
 
 
+def proxy_file(token: str, safe_filename: str):
+    """
+    Stream an IP-bound media URL from upstream to the client.
+    
+    Forwards the client's Range header so seeking and resumed downloads work.
+    """
+    media = stream_proxy.load_token(token)
+    if not media:
+        return jsonify({
+            'status': 'error',
+            'message': 'Download link expired or invalid'
+        }), 403
+    
+    status, headers, body = stream_proxy.open(
+        media['url'],
+        http_headers=media['headers'],
+        range_header=request.headers.get('Range'),
+        route=egress_pool.get(media.get('route'))
+    )
+    if status >= 400:
+        # Drain and release the upstream connection before giving up
+        for _ in body:
+            pass
+        return jsonify({
+            'status': 'error',
+            'message': f'Media server returned {status}'
+        }), 502
+    
+    headers['Content-Disposition'] = f"attachment; filename*=UTF-8''{quote(safe_filename)}"
+    body = bandwidth.throttle(body, get_client_ip(request), CLASS_PROXY)
+    return Response(body, status=status, headers=headers, direct_passthrough=True)
+
+
+def node_file(node: str, safe_filename: str):
+    """Stream a file that was downloaded on another node of the cluster."""
+    status, headers, body = stream_proxy.open(
+        f"{cluster.node_url(node)}/api/file/{quote(safe_filename)}",
+        http_headers={FORWARDED_HEADER: cluster.node_id},
+        range_header=request.headers.get('Range')
+    )
+    if status >= 400:
+        for _ in body:
+            pass
+        return jsonify({
+            'status': 'error',
+            'message': 'File not found' if status == 404 else f'Node {node} returned {status}'
+        }), 404 if status == 404 else 502
+    
+    headers['Content-Disposition'] = f"attachment; filename*=UTF-8''{quote(safe_filename)}"
+    body = bandwidth.throttle(body, get_client_ip(request), CLASS_PROXY)
+    return Response(body, status=status, headers=headers, direct_passthrough=True)
+
+
+@app.route('/api/thumbnail/<token>', methods=['GET'])
+def serve_thumbnail(token):
+    """
+    Serve a resized, cached copy of a video thumbnail.
+    
+    Query params:
+        size: "small" (default) or "medium"
+    
+    The token is the signed thumbnail URL from get_video_info, so this can't
+    be used to fetch arbitrary URLs.
+    """
+    thumbnail_url = thumbnail_cache.load_token(token)
+    if not thumbnail_url:
+        return jsonify({
+            'status': 'error',
+            'message': 'Invalid thumbnail'
+        }), 404
+    
+    try:
+        webp = 'image/webp' in request.headers.get('Accept', '')
+        path, mimetype = thumbnail_cache.get(thumbnail_url, request.args.get('size', 'small'), webp)
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'Thumbnail unavailable: {str(e)[:100]}'
+        }), 502
+    
+    response = send_file(str(path), mimetype=mimetype, etag=path.name, conditional=True)
+    # Variants never change for a given token
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    response.headers['Vary'] = 'Accept'
+    return response
+
+
+# Liveness never changes - build the response body once
+LIVE_BODY = dumps({'status': 'alive'})
+_readiness = {'checked_at': 0.0, 'ready': False, 'body': b''}
+
+
+def check_readiness() -> Tuple[bool, bytes]:
+    """
+    Can this worker serve downloads? (cached for HEALTH_CACHE_SECONDS)
+    
+    Load balancers probe every few seconds; the checks touch the disk, so
+    their result is reused between probes.
+    """
+    now = time.time()
+    if now - _readiness['checked_at'] >= HEALTH_CACHE_SECONDS:
+        checks = {'downloads_dir': DOWNLOADS_DIR.is_dir()}
+        try:
+            job_store.get('')
+            checks['job_store'] = True
+        except Exception:
+            checks['job_store'] = False
+        ready = all(checks.values())
+        _readiness.update({
+            'checked_at': now,
+            'ready': ready,
+            'body': dumps({'status': 'ready' if ready else 'not_ready', 'checks': checks}),
+        })
+    return _readiness['ready'], _readiness['body']
+
+
+@app.route('/api/health/live', methods=['GET'])
+def liveness():
+    """Liveness probe: the process is up and answering. No checks at all."""
+    return json_bytes_response(LIVE_BODY)
+
+
+@app.route('/api/health/ready', methods=['GET'])
+def readiness():
+    """Readiness probe: 503 while the downloads dir or job store is unavailable."""
+    ready, body = check_readiness()
+    return json_bytes_response(body, status=200 if ready else 503)
+
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """
+    Operational metrics for this worker process: bandwidth by traffic
+    class, scheduler queue, egress routes, breakers, prefetching and
+    requests rejected by the cheap checks (per stage).
+    """
+    return jsonify({
+        'bandwidth': bandwidth.stats(),
+        'scheduler': download_scheduler.stats(),
+        'egress': egress_pool.stats(),
+        'player_clients': client_selector.stats(),
+        'circuit_breaker': circuit_breaker.stats(),
+        'prefetch': prefetcher.stats(),
+        'request_checks': request_checks.stats(),
+    })
+
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """
     Health check endpoint.
     Useful for monitoring and deployment checks.
+    
+    For load balancer probes use /api/health/live and /api/health/ready,
+    which are much cheaper.
     """
     client_ip = get_client_ip(request)
     remaining = rate_limiter.get_remaining_requests(client_ip)
+    ready, _ = check_readiness()
     
     return jsonify({
-        'status': 'healthy',
+        'status': 'healthy' if ready else 'unhealthy',
         'downloads_dir': str(DOWNLOADS_DIR),
-        'downloads_dir_exists': DOWNLOADS_DIR.exists(),
+        'downloads_dir_exists': DOWNLOADS_DIR.is_dir(),
+        'ready': ready,
         'rate_limit': {
             'max_requests': MAX_REQUESTS_PER_HOUR,
             'remaining': remaining
-        }
+        },
+        'circuit_breaker': circuit_breaker.stats(),
+        'egress': egress_pool.stats(),
+        'prefetch': prefetcher.stats()
     })
 
 
@@ -288,37 +768,38 @@ def internal_error(error):
     }), 500
 
 
-# Serve static frontend files
+# Serve static frontend files (precompressed, from memory - see static_assets.py)
 @app.route('/styles.css')
 def serve_css():
     """Serve CSS file."""
-    import os
-    frontend_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'frontend')
-    return send_from_directory(frontend_dir, 'styles.css')
+    return static_assets.response('styles.css', request)
 
 
 @app.route('/app.js')
 def serve_js():
     """Serve JavaScript file."""
-    import os
-    frontend_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'frontend')
-    return send_from_directory(frontend_dir, 'app.js')
+    return static_assets.response('app.js', request)
 
 
 @app.route('/ads.js')
 def serve_ads_js():
     """Serve ads JavaScript file."""
-    import os
-    frontend_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'frontend')
-    return send_from_directory(frontend_dir, 'ads.js')
+    return static_assets.response('ads.js', request)
 
 
 @app.route('/config.js')
 def serve_config_js():
     """Serve config JavaScript file."""
-    import os
-    frontend_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'frontend')
-    return send_from_directory(frontend_dir, 'config.js')
+    return static_assets.response('config.js', request)
+
+
+@app.route('/assets/<filename>')
+def serve_fingerprinted_asset(filename):
+    """Serve a fingerprinted asset (e.g. app.1a2b3c4d5e6f.js) with immutable caching."""
+    response = static_assets.response(filename, request, fingerprinted=True)
+    if response is None:
+        return not_found(None)
+    return response
 
 
 # ============================================================================
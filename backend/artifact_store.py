@@ -0,0 +1,159 @@
+"""
+Artifact Store Module
+
+Where finished downloads are kept and served from.
+
+Why? With more than one node, each node had its own DOWNLOADS_DIR, so
+/api/file returned 404 whenever the load balancer sent the follow-up GET to a
+different node than the one that did the download. Downloads are now handed
+to an artifact store:
+- LocalArtifactStore: DOWNLOADS_DIR on this node (single box, and the
+  default). In a cluster, /api/file fetches from the owning node.
+- S3ArtifactStore: an S3-compatible bucket every node can read (AWS S3,
+  MinIO for local testing, ...). /api/file redirects to a presigned URL so
+  the bytes never pass through our workers.
+
+yt-dlp always downloads to local disk first; put() publishes the finished
+file to the store.
+"""
+
+import mimetypes
+import shutil
+from pathlib import Path
+from typing import Optional
+from urllib.parse import quote
+from backend.config import (
+    ARTIFACT_STORE,
+    DOWNLOADS_DIR,
+    S3_BUCKET,
+    S3_PREFIX,
+    S3_ENDPOINT_URL,
+    S3_REGION,
+    S3_ACCESS_KEY_ID,
+    S3_SECRET_ACCESS_KEY,
+    S3_URL_TTL,
+)
+
+try:
+    import boto3
+    from botocore.exceptions import ClientError
+except ImportError:  # boto3 is only needed for ARTIFACT_STORE=s3
+    boto3 = None
+    ClientError = Exception
+
+
+class LocalArtifactStore:
+    """
+    Artifacts on this node's disk.
+    """
+
+    # Other nodes can't read these files directly
+    shared = False
+
+    def __init__(self, root: Path = DOWNLOADS_DIR):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def put(self, path: Path, name: Optional[str] = None) -> str:
+        """
+        Publish a finished file under name (default: its own name).
+
+        From a job workspace this is a rename on the same filesystem, so
+        readers never see a half-written file. Returns its artifact name.
+        """
+        path = Path(path)
+        target = self.root / (name or path.name)
+        if path.resolve() != target.resolve():
+            shutil.move(str(path), str(target))
+        return target.name
+
+    def exists(self, name: str) -> bool:
+        return (self.root / name).is_file()
+
+    def local_path(self, name: str) -> Optional[Path]:
+        """Path to serve with send_file (None if the store isn't local)."""
+        return self.root / name
+
+    def url(self, name: str) -> Optional[str]:
+        """External download URL (None - local files are served by /api/file)."""
+        return None
+
+    def delete(self, name: str):
+        (self.root / name).unlink(missing_ok=True)
+
+
+class S3ArtifactStore:
+    """
+    Artifacts in an S3-compatible bucket shared by all nodes.
+    """
+
+    shared = True
+
+    def __init__(self, bucket: str = S3_BUCKET, prefix: str = S3_PREFIX, endpoint_url: Optional[str] = S3_ENDPOINT_URL,
+                 client=None):
+        """
+        Args:
+            client: A ready boto3-compatible S3 client (default: one built
+                from the S3_* settings)
+        """
+        if client is None and boto3 is None:
+            raise Exception("ARTIFACT_STORE=s3 needs boto3 (pip install boto3)")
+        if not bucket:
+            raise Exception("ARTIFACT_STORE=s3 needs S3_BUCKET")
+        self.bucket = bucket
+        self.prefix = prefix
+        self.client = client or boto3.client(
+            's3',
+            endpoint_url=endpoint_url,
+            region_name=S3_REGION,
+            aws_access_key_id=S3_ACCESS_KEY_ID,
+            aws_secret_access_key=S3_SECRET_ACCESS_KEY,
+        )
+
+    def _key(self, name: str) -> str:
+        return f"{self.prefix}{name}"
+
+    def put(self, path: Path, name: Optional[str] = None) -> str:
+        """Upload a finished file under name and remove the local copy. Returns its artifact name."""
+        path = Path(path)
+        name = name or path.name
+        content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        self.client.upload_file(str(path), self.bucket, self._key(name), ExtraArgs={'ContentType': content_type})
+        path.unlink(missing_ok=True)
+        return name
+
+    def exists(self, name: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(name))
+            return True
+        except ClientError:
+            return False
+
+    def local_path(self, name: str) -> Optional[Path]:
+        return None
+
+    def url(self, name: str) -> Optional[str]:
+        """Presigned GET URL that downloads the object as an attachment."""
+        return self.client.generate_presigned_url(
+            'get_object',
+            Params={
+                'Bucket': self.bucket,
+                'Key': self._key(name),
+                'ResponseContentDisposition': f"attachment; filename*=UTF-8''{quote(name)}",
+            },
+            ExpiresIn=S3_URL_TTL,
+        )
+
+    def delete(self, name: str):
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(name))
+
+
+def create_artifact_store():
+    """Build the store selected by ARTIFACT_STORE."""
+    if ARTIFACT_STORE == 's3':
+        return S3ArtifactStore()
+    return LocalArtifactStore()
+
+
+# Global artifact store instance
+artifact_store = create_artifact_store()
@@ -0,0 +1,164 @@
+"""
+Bandwidth Module
+
+Token-bucket bandwidth shaping for bulk transfers, plus throughput metering.
+
+Why? A few simultaneous 4K downloads saturate the uplink, and then file
+transfers and page loads for everyone else crawl. Bulk traffic is limited at
+three levels:
+- per job: yt-dlp's own `ratelimit` (BANDWIDTH_JOB_LIMIT)
+- per client: /api/file and proxied streams (BANDWIDTH_CLIENT_LIMIT)
+- globally: all bulk traffic of the node (BANDWIDTH_GLOBAL_LIMIT), minus a
+  reserve kept free for interactive traffic (API calls, page loads), which
+  is never throttled
+
+The global limit is split evenly between worker processes (WORKER_COUNT), so
+no cross-process coordination is needed on the hot path.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, Optional
+from backend.config import (
+    BANDWIDTH_CLIENT_LIMIT,
+    BANDWIDTH_GLOBAL_LIMIT,
+    BANDWIDTH_INTERACTIVE_RESERVE,
+    WORKER_COUNT,
+)
+
+# Traffic classes reported on /api/metrics
+CLASS_DOWNLOAD = 'download'        # yt-dlp fetching from platforms
+CLASS_FILE = 'file'                # /api/file from local disk
+CLASS_PROXY = 'proxy'              # Streamed through (IP-bound URLs, other nodes)
+CLASS_INTERACTIVE = 'interactive'  # API responses and page assets
+
+MAX_CLIENT_BUCKETS = 1024
+METER_WINDOW = 10  # Seconds averaged for the reported rate
+
+
+class TokenBucket:
+    """
+    Token bucket in bytes/second (rate 0 = unlimited).
+
+    consume() lets the balance go negative and sleeps off the debt, so one
+    big chunk is never stuck waiting for a full bucket.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, amount: int):
+        if self.rate <= 0 or amount <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= amount
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
+class ThroughputMeter:
+    """Bytes per traffic class, with a rate over the last METER_WINDOW seconds."""
+
+    def __init__(self):
+        self._totals: Dict[str, int] = {}
+        self._slots: Dict[str, Dict[int, int]] = {}  # class -> {second: bytes}
+        self._lock = threading.Lock()
+
+    def record(self, traffic_class: str, amount: int):
+        second = int(time.time())
+        with self._lock:
+            self._totals[traffic_class] = self._totals.get(traffic_class, 0) + amount
+            slots = self._slots.setdefault(traffic_class, {})
+            slots[second] = slots.get(second, 0) + amount
+            if len(slots) > METER_WINDOW * 2:
+                for old in [s for s in slots if s <= second - METER_WINDOW]:
+                    del slots[old]
+
+    def stats(self) -> Dict[str, Dict]:
+        now = int(time.time())
+        with self._lock:
+            return {
+                traffic_class: {
+                    'bytes_total': total,
+                    'bytes_per_second': sum(
+                        amount for second, amount in self._slots.get(traffic_class, {}).items()
+                        if second > now - METER_WINDOW
+                    ) // METER_WINDOW,
+                }
+                for traffic_class, total in self._totals.items()
+            }
+
+
+class BandwidthShaper:
+    """
+    Applies the client and global buckets and meters all traffic.
+    """
+
+    def __init__(self, client_limit: int = BANDWIDTH_CLIENT_LIMIT, global_limit: int = BANDWIDTH_GLOBAL_LIMIT,
+                 interactive_reserve: int = BANDWIDTH_INTERACTIVE_RESERVE, workers: int = WORKER_COUNT):
+        self.client_limit = client_limit
+        bulk_limit = max(global_limit - interactive_reserve, global_limit // 10) if global_limit else 0
+        # This process's share of the node's bulk bandwidth
+        self.bulk = TokenBucket(bulk_limit / max(workers, 1))
+        self.meter = ThroughputMeter()
+        self._clients: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _client_bucket(self, client_ip: str) -> TokenBucket:
+        with self._lock:
+            bucket = self._clients.get(client_ip)
+            if bucket is None:
+                bucket = self._clients[client_ip] = TokenBucket(self.client_limit)
+                while len(self._clients) > MAX_CLIENT_BUCKETS:
+                    self._clients.popitem(last=False)
+            self._clients.move_to_end(client_ip)
+            return bucket
+
+    @property
+    def shaping(self) -> bool:
+        return bool(self.client_limit or self.bulk.rate)
+
+    def consume_download(self, amount: int):
+        """Account for bytes yt-dlp fetched (blocks while over the global limit)."""
+        self.bulk.consume(amount)
+        self.meter.record(CLASS_DOWNLOAD, amount)
+
+    def throttle(self, chunks: Iterable[bytes], client_ip: str, traffic_class: str) -> Iterator[bytes]:
+        """Yield chunks no faster than the client's and the global bucket allow."""
+        client = self._client_bucket(client_ip)
+        try:
+            for chunk in chunks:
+                size = len(chunk)
+                client.consume(size)
+                self.bulk.consume(size)
+                self.meter.record(traffic_class, size)
+                yield chunk
+        finally:
+            close = getattr(chunks, 'close', None)
+            if close:
+                close()
+
+    def record_interactive(self, amount: int):
+        self.meter.record(CLASS_INTERACTIVE, amount)
+
+    def stats(self) -> Dict:
+        return {
+            'limits': {
+                'client_bytes_per_second': self.client_limit,
+                'process_bulk_bytes_per_second': int(self.bulk.rate),
+            },
+            'throughput': self.meter.stats(),
+        }
+
+
+# Global bandwidth shaper instance
+bandwidth = BandwidthShaper()
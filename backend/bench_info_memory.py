@@ -0,0 +1,117 @@
+"""
+Info Dict Memory Benchmark
+
+Measures how much memory cached info dicts take, raw vs slim projection
+(see info_projection.py), on synthetic extractions shaped like a long
+YouTube live/VOD stream: hundreds of formats with fragment lists, and
+automatic captions in every language. No network access needed.
+
+Usage:
+    python -m backend.bench_info_memory
+    python -m backend.bench_info_memory --formats 600 --entries 256
+"""
+
+import argparse
+import gc
+import json
+import tracemalloc
+
+from backend.info_projection import slim_info
+
+
+def synthetic_info(video: int, formats: int, fragments: int, languages: int) -> dict:
+    """A large, realistic-looking yt-dlp info dict."""
+    headers = {'User-Agent': 'Mozilla/5.0', 'Accept': '*/*', 'Accept-Language': 'en-us,en;q=0.5'}
+    base = f"https://rr{video % 9}---sn-abc.googlevideo.com/videoplayback?expire=1700000000&id={video}"
+    info = {
+        'id': f"video{video:07d}",
+        'title': f"Synthetic video {video}",
+        'duration': 36000,
+        'thumbnail': f"https://i.ytimg.com/vi/{video}/maxresdefault.jpg",
+        'thumbnails': [{'url': f"https://i.ytimg.com/vi/{video}/{n}.jpg", 'id': str(n)} for n in range(40)],
+        'uploader': 'Bench',
+        'view_count': 1000,
+        'description': 'x' * 5000,
+        'webpage_url': f"https://www.youtube.com/watch?v={video}",
+        'chapters': [{'title': f"Part {n}", 'start_time': n * 60.0, 'end_time': n * 60.0 + 60} for n in range(100)],
+        'formats': [],
+        'automatic_captions': {},
+        'http_headers': headers,
+    }
+    for n in range(formats):
+        video_only = n % 3 != 0
+        info['formats'].append({
+            'format_id': str(100 + n),
+            'url': f"{base}&itag={n}&sig={'s' * 400}",
+            'manifest_url': f"{base}&manifest=dash&{'m' * 200}",
+            'ext': 'mp4' if n % 2 else 'webm',
+            'vcodec': 'avc1.64001F' if video_only else 'none',
+            'acodec': 'none' if video_only else 'mp4a.40.2',
+            'width': 1920, 'height': 144 * (1 + n % 8), 'tbr': 500.0 + n, 'vbr': 400.0 + n,
+            'filesize_approx': 1_000_000 * n,
+            'protocol': 'http_dash_segments',
+            'http_headers': dict(headers),
+            'downloader_options': {'http_chunk_size': 10485760},
+            'fragments': [{'url': f"{base}&sq={f}", 'duration': 5.0} for f in range(fragments)],
+        })
+    for n in range(languages):
+        info['automatic_captions'][f"l{n}"] = [
+            {'url': f"https://www.youtube.com/api/timedtext?v={video}&lang=l{n}&fmt={ext}&{'t' * 300}", 'ext': ext}
+            for ext in ('json3', 'srv1', 'srv2', 'srv3', 'ttml', 'vtt')
+        ]
+    return info
+
+
+def measure(build, count: int) -> tuple:
+    """Bytes held (and peak) after keeping `count` results of build(i)."""
+    gc.collect()
+    tracemalloc.start()
+    kept = [build(i) for i in range(count)]
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return current, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--entries', type=int, default=32, help='Cache entries to keep')
+    parser.add_argument('--formats', type=int, default=300, help='Formats per video')
+    parser.add_argument('--fragments', type=int, default=50, help='Fragments per format')
+    parser.add_argument('--languages', type=int, default=150, help='Caption languages per video')
+    parser.add_argument('--playlist', type=int, default=5000, help='Entries in the synthetic playlist')
+    args = parser.parse_args()
+
+    make = lambda i: synthetic_info(i, args.formats, args.fragments, args.languages)
+    sample = make(0)
+    print(f"One info dict: {len(json.dumps(sample)) / 1024 / 1024:.1f}MB as JSON, "
+          f"{len(json.dumps(slim_info(sample))) / 1024:.0f}KB slim")
+
+    # Raw: what the cache used to keep. Slim: each raw dict is dropped right
+    # after projection, as in DownloadService._extract_info
+    raw, raw_peak = measure(make, args.entries)
+    slim, slim_peak = measure(lambda i: slim_info(make(i)), args.entries)
+    mb = lambda n: n / 1024 / 1024
+    print(f"{args.entries} cached entries: raw {mb(raw):.1f}MB (peak {mb(raw_peak):.1f}MB), "
+          f"slim {mb(slim):.1f}MB (peak {mb(slim_peak):.1f}MB), {raw / max(slim, 1):.0f}x smaller")
+
+    # Playlist: entries come from a generator, only the kept ones are built
+    pulled = []
+
+    def entries():
+        for n in range(args.playlist):
+            pulled.append(n)
+            yield {'id': str(n), 'title': f"Entry {n}", 'url': f"https://youtu.be/{n}", 'duration': 60,
+                   'description': 'x' * 2000}
+
+    gc.collect()
+    tracemalloc.start()
+    playlist = slim_info({'_type': 'playlist', 'title': 'Long playlist', 'entries': entries()})
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"Playlist of {args.playlist}: kept {len(playlist['entries'])} entries, pulled {len(pulled)} "
+          f"from the generator, {mb(current):.2f}MB held (peak {mb(peak):.2f}MB)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Circuit Breaker Module
+
+Stops us hammering a platform that has started blocking us.
+
+Why? When YouTube answers "Sign in to confirm you're not a bot", every
+further request makes the block last longer and wastes a full extraction.
+After BREAKER_FAILURE_THRESHOLD bot-detection errors in a row the breaker
+"opens" for that platform: background work (prefetching) stops and requests
+are rejected early. After BREAKER_COOLDOWN seconds the breaker is
+"half-open": requests go through again (background work stays paused), the
+first success closes the breaker and a single bot-detection failure opens
+it again for another cooldown.
+"""
+
+import threading
+import time
+from typing import Dict
+from backend.config import BREAKER_FAILURE_THRESHOLD, BREAKER_COOLDOWN
+
+# Breaker states
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+def is_bot_detection_error(error_msg: str) -> bool:
+    """Does a yt-dlp error mean the platform is blocking us?"""
+    return "Sign in" in error_msg or "bot" in error_msg.lower()
+
+
+class CircuitBreaker:
+    """
+    Per-platform circuit breaker.
+    """
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURE_THRESHOLD, cooldown: int = BREAKER_COOLDOWN):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._failures: Dict[str, int] = {}
+        self._opened_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def state(self, platform: str) -> str:
+        with self._lock:
+            return self._state(platform)
+
+    def _state(self, platform: str) -> str:
+        opened_at = self._opened_at.get(platform)
+        if opened_at is None:
+            return CLOSED
+        if time.time() - opened_at >= self.cooldown:
+            return HALF_OPEN
+        return OPEN
+
+    def record_success(self, platform: str):
+        with self._lock:
+            self._failures.pop(platform, None)
+            self._opened_at.pop(platform, None)
+
+    def record_failure(self, platform: str):
+        """Count a bot-detection failure (other errors shouldn't be recorded)."""
+        with self._lock:
+            failures = self._failures.get(platform, 0) + 1
+            self._failures[platform] = failures
+            if failures >= self.failure_threshold or platform in self._opened_at:
+                # (Re)open - a failure while half-open restarts the cooldown
+                self._opened_at[platform] = time.time()
+
+    def retry_after(self, platform: str) -> int:
+        """Seconds until the breaker is half-open."""
+        with self._lock:
+            opened_at = self._opened_at.get(platform)
+            if opened_at is None:
+                return 0
+            return max(0, int(opened_at + self.cooldown - time.time()))
+
+    def stats(self) -> Dict[str, str]:
+        with self._lock:
+            return {platform: self._state(platform) for platform in self._opened_at}
+
+
+# Global circuit breaker instance
+circuit_breaker = CircuitBreaker()
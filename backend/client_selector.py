@@ -0,0 +1,201 @@
+"""
+Client Selector Module
+
+Picks which YouTube player client yt-dlp should use, and races alternatives.
+
+Why? Which player client (mweb, ios, android, web) gets past YouTube's bot
+checks changes over time. We used to either list them all (yt-dlp then
+queries every one of them on each extraction) or try them one by one with
+10/5/3 retries each, which could take minutes before failing. Instead:
+- remember per platform which client succeeded most recently and try it first
+- if it hasn't answered within CLIENT_HEDGE_DELAY seconds (or failed), start
+  the next one in parallel; the first success wins
+- stop everything once EXTRACT_LATENCY_BUDGET is spent
+
+Attempts run on a bounded thread pool (EXTRACT_WORKERS threads). Once a
+race is decided - a winner, a final error or the deadline - the attempts
+still queued are cancelled, and the running ones are handed an event that
+is now set: they skip taking an egress lease if they haven't yet, and drop
+their result instead of caching it. A running yt-dlp extraction can't be
+interrupted, so a loser that is already inside one keeps its thread and
+lease until yt-dlp returns. To keep that short, each attempt is told the
+budget left when it starts (its socket timeout is capped by it), and hedged
+attempts run without retries.
+
+Platforms without player clients just get one attempt.
+"""
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Dict, List, Optional, TypeVar
+from backend.config import (
+    YOUTUBE_PLAYER_CLIENTS,
+    CLIENT_HEDGE_DELAY,
+    EXTRACT_LATENCY_BUDGET,
+    EXTRACT_MAX_PARALLEL,
+    EXTRACT_WORKERS,
+)
+
+T = TypeVar('T')
+
+# Platform -> player clients yt-dlp knows for it
+PLAYER_CLIENTS: Dict[str, List[str]] = {
+    'youtube': YOUTUBE_PLAYER_CLIENTS,
+}
+
+# Errors no other client can fix - fail straight away
+_FINAL_ERRORS = ('private video', 'unsupported url', 'video unavailable', 'has been removed',
+                 'copyright', 'file too large', 'not available in your country')
+
+
+def is_final_error(error_msg: str) -> bool:
+    msg = error_msg.lower()
+    return any(e in msg for e in _FINAL_ERRORS)
+
+
+# attempt(client, budget, hedged, decided)
+Attempt = Callable[[Optional[str], float, bool, threading.Event], T]
+
+
+class AttemptDropped(Exception):
+    """Raised for an attempt that lost the race before it got to run."""
+    pass
+
+
+class ClientSelector:
+    """
+    Per-platform memory of the player client that works, plus hedged racing.
+    """
+
+    def __init__(self, clients: Dict[str, List[str]] = PLAYER_CLIENTS, hedge_delay: float = CLIENT_HEDGE_DELAY,
+                 latency_budget: float = EXTRACT_LATENCY_BUDGET, max_parallel: int = EXTRACT_MAX_PARALLEL,
+                 max_workers: int = EXTRACT_WORKERS):
+        self.clients = clients
+        self.hedge_delay = hedge_delay
+        self.latency_budget = latency_budget
+        self.max_parallel = max_parallel
+        self._pool = ThreadPoolExecutor(max_workers=max(max_workers, 1), thread_name_prefix='extract')
+        self._last_success: Dict[str, Dict[str, float]] = {}
+        self._failures: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def ranked(self, platform: str) -> List[Optional[str]]:
+        """
+        Clients to try, best first: most recent success, then fewest
+        failures in a row, then configured order. [None] if the platform
+        has no player clients.
+        """
+        clients = self.clients.get(platform)
+        if not clients:
+            return [None]
+        with self._lock:
+            successes = self._last_success.get(platform, {})
+            failures = self._failures.get(platform, {})
+            return sorted(clients, key=lambda c: (-successes.get(c, 0), failures.get(c, 0), clients.index(c)))
+
+    def best(self, platform: str) -> Optional[str]:
+        return self.ranked(platform)[0]
+
+    def record(self, platform: str, client: Optional[str], ok: bool):
+        if client is None:
+            return
+        with self._lock:
+            failures = self._failures.setdefault(platform, {})
+            if ok:
+                self._last_success.setdefault(platform, {})[client] = time.time()
+                failures.pop(client, None)
+            else:
+                failures[client] = failures.get(client, 0) + 1
+
+    @staticmethod
+    def options_for(platform: str, client: Optional[str]) -> Dict:
+        """yt-dlp options that pin the player client (none for other platforms)."""
+        if client is None:
+            return {}
+        return {'extractor_args': {platform: {'player_client': [client]}}}
+
+    def _submit(self, attempt: Attempt, client: Optional[str], deadline: float, hedged: bool,
+                decided: threading.Event) -> Future:
+        """Queue one attempt on the pool; its budget is whatever is left once it starts."""
+        def target():
+            # Waited behind other extractions - the race may be over by now
+            if decided.is_set() or deadline - time.monotonic() <= 0:
+                raise AttemptDropped(f"Attempt with client {client} dropped")
+            result = attempt(client, max(deadline - time.monotonic(), 1.0), hedged, decided)
+            # Decide right here, before this thread picks up a queued attempt
+            decided.set()
+            return result
+
+        return self._pool.submit(target)
+
+    def run(self, platform: str, attempt: Attempt) -> T:
+        """
+        Run attempt(client, budget, hedged, decided) for the best client,
+        hedging with the next ones.
+
+        budget is the number of seconds left in the latency budget when the
+        attempt starts; hedged is True for every attempt but the first.
+        Attempts should keep their socket timeout and retries within it.
+        decided is set as soon as run() returns or raises: an attempt that
+        sees it set should not take an egress lease or cache its result.
+
+        Raises:
+            The last attempt's error, or Exception on running out of time
+        """
+        candidates = self.ranked(platform)[:max(self.max_parallel, 1)]
+        deadline = time.monotonic() + self.latency_budget
+        decided = threading.Event()
+        pending = {}
+        next_index = 0
+        last_error: Optional[Exception] = None
+
+        def launch():
+            nonlocal next_index
+            client = candidates[next_index]
+            pending[self._submit(attempt, client, deadline, next_index > 0, decided)] = client
+            next_index += 1
+
+        try:
+            launch()
+            while pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                # Wait for a result, but only hedge_delay if there's a next client to start
+                timeout = min(remaining, self.hedge_delay) if next_index < len(candidates) else remaining
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    client = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except AttemptDropped:
+                        continue
+                    except Exception as e:
+                        last_error = e
+                        if is_final_error(str(e)):
+                            raise
+                        self.record(platform, client, False)
+                        continue
+                    self.record(platform, client, True)
+                    return result
+
+                # Slow or failed - bring in the next client
+                if next_index < len(candidates):
+                    launch()
+        finally:
+            decided.set()
+            for future in pending:
+                future.cancel()
+
+        if last_error is not None:
+            raise last_error
+        raise Exception(f"Extraction timed out after {self.latency_budget:g}s")
+
+    def stats(self) -> Dict[str, List[Optional[str]]]:
+        return {platform: self.ranked(platform) for platform in self.clients}
+
+
+# Global client selector instance
+client_selector = ClientSelector()
@@ -0,0 +1,134 @@
+"""
+Cluster Module
+
+Routes each video to one "owner" node with consistent hashing.
+
+Why? Every node has its own info cache, job store and (with the local
+artifact store) downloads. If requests for the same video are spread over
+all nodes, each of them extracts and downloads it again. Hashing the
+classifier's content key onto a ring of nodes sends every request for a
+video to the same node, so its caches stay warm. Adding or removing a node
+only moves the keys next to it on the ring instead of reshuffling all of
+them.
+
+The load balancer can't see the video URL inside a POST body, so nodes
+forward API requests they don't own to the owner over the internal network.
+Conditional and caching headers (If-None-Match, ETag, Cache-Control,
+Retry-After, Content-Disposition) pass through in both directions, so a
+forwarded answer is the same as one from the owner directly.
+
+Only a connect failure means the owner is down and the request is handled
+locally instead. Once the request has reached the owner it may already be
+working on it (a read timeout usually means a slow extraction), and
+handling it here too would start the same download twice.
+"""
+
+import bisect
+import hashlib
+import urllib.error
+import urllib.request
+from typing import Dict, Iterable, Optional, Tuple
+from backend.config import CLUSTER_NODES, NODE_ID, CLUSTER_VNODES, CLUSTER_FORWARD_TIMEOUT
+from backend.url_classifier import classify_url
+
+# Set on forwarded requests so the owner never forwards them again
+FORWARDED_HEADER = 'X-Cluster-Forwarded'
+
+# Headers copied from the client's request to the owner, and from the
+# owner's response back to the client
+FORWARD_REQUEST_HEADERS = ('Content-Type', 'If-None-Match', 'Cache-Control')
+FORWARD_RESPONSE_HEADERS = ('Content-Type', 'ETag', 'Cache-Control', 'Retry-After', 'Content-Disposition')
+
+
+class NodeUnreachable(Exception):
+    """The request never reached the node (it's safe to handle it elsewhere)."""
+
+
+class HashRing:
+    """
+    Consistent hash ring with virtual nodes (evens out the key spread).
+    """
+
+    def __init__(self, nodes: Iterable[str], vnodes: int = CLUSTER_VNODES):
+        self._ring = sorted(
+            (self._hash(f"{node}#{i}"), node)
+            for node in nodes
+            for i in range(vnodes)
+        )
+        self._hashes = [h for h, _ in self._ring]
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'big')
+
+    def node_for(self, key: str) -> Optional[str]:
+        """The node owning a key (first point clockwise from its hash)."""
+        if not self._ring:
+            return None
+        index = bisect.bisect(self._hashes, self._hash(key)) % len(self._ring)
+        return self._ring[index][1]
+
+
+class Cluster:
+    """
+    This node's view of the cluster.
+    """
+
+    def __init__(self, nodes: Dict[str, str] = CLUSTER_NODES, node_id: str = NODE_ID):
+        self.nodes = dict(nodes)
+        self.node_id = node_id
+        self.ring = HashRing(self.nodes)
+
+    @property
+    def enabled(self) -> bool:
+        return len(self.nodes) > 1 and self.node_id in self.nodes
+
+    def owner(self, url: str) -> Optional[str]:
+        """Node that should handle a URL, or None if that's this node (or no cluster)."""
+        if not self.enabled:
+            return None
+        owner = self.ring.node_for(classify_url(url).cache_key)
+        return owner if owner != self.node_id else None
+
+    def node_url(self, node_id: str) -> Optional[str]:
+        return self.nodes.get(node_id)
+
+    def forward(self, node_id: str, method: str, path: str, body: Optional[bytes],
+                headers: Dict[str, str]) -> Tuple[int, Dict[str, str], bytes]:
+        """
+        Send an API request to another node.
+
+        Returns:
+            Tuple of (status, headers, body), headers limited to
+            FORWARD_RESPONSE_HEADERS
+
+        Raises:
+            NodeUnreachable: If the request couldn't be sent to the node
+            Exception: If the node didn't answer (it may still be handling it)
+        """
+        req = urllib.request.Request(
+            self.nodes[node_id] + path,
+            data=body or None,
+            method=method,
+            headers={**headers, FORWARDED_HEADER: self.node_id},
+        )
+        try:
+            with urllib.request.urlopen(req, timeout=CLUSTER_FORWARD_TIMEOUT) as response:
+                return response.status, self._response_headers(response.headers), response.read()
+        except urllib.error.HTTPError as e:
+            # 304/4xx/5xx are real answers from the owner - pass them on
+            return e.code, self._response_headers(e.headers), e.read()
+        except urllib.error.URLError as e:
+            # urllib wraps errors while connecting and sending the request
+            raise NodeUnreachable(f"Node {node_id} unreachable: {e.reason}")
+        except OSError as e:
+            # Sent, but no (complete) answer in time
+            raise Exception(f"Node {node_id} did not answer: {e}")
+
+    @staticmethod
+    def _response_headers(headers) -> Dict[str, str]:
+        return {name: headers[name] for name in FORWARD_RESPONSE_HEADERS if headers.get(name)}
+
+
+# Global cluster instance
+cluster = Cluster()
@@ -6,10 +6,54 @@ Why separate? Keeps the main app.py clean and makes testing easier.
 """
 
 import yt_dlp
+import json
 import os
+import shutil
+import threading
+import time
+import urllib.request
 from pathlib import Path
 from typing import Dict, Optional, Tuple
-from backend.config import DOWNLOADS_DIR, YTDLP_OPTIONS, MAX_DOWNLOAD_SIZE_BYTES, MAX_DOWNLOAD_SIZE_MB
+from urllib.parse import urlparse, parse_qs, urlencode
+from backend.config import (
+    DOWNLOADS_DIR,
+    WORK_DIR,
+    YTDLP_OPTIONS,
+    MAX_DOWNLOAD_SIZE_BYTES,
+    MAX_DOWNLOAD_SIZE_MB,
+    IP_BOUND_URL_PARAMS,
+    IP_BOUND_HOSTS,
+    STREAM_PROXY_ENABLED,
+    JOB_WAIT_TIMEOUT,
+    AUDIO_DEFAULT_FORMAT,
+    PROBE_TIMEOUT,
+    BANDWIDTH_JOB_LIMIT,
+    EXTRACT_SOCKET_TIMEOUT,
+    EXTRACT_LATENCY_BUDGET,
+    PLAYLIST_MAX_ENTRIES,
+)
+from backend.job_store import job_store, STATUS_DOWNLOADING, STATUS_FINISHED, STATUS_FAILED
+from backend.info_cache import info_cache, probe_cache
+from backend.artifact_store import artifact_store
+from backend.bandwidth import bandwidth
+from backend.circuit_breaker import circuit_breaker, is_bot_detection_error
+from backend.client_selector import client_selector, AttemptDropped
+from backend.egress_pool import egress_pool
+from backend.scheduler import estimate_job_cost
+from backend.thumbnail_cache import thumbnail_cache
+from backend.transcoder import transcoder
+from backend.url_classifier import classify_url
+from backend.security import sanitize_filename
+from backend.format_index import FormatIndex
+from backend.info_projection import slim_info
+from backend.responses import dumps
+from backend import subtitles
+
+# oEmbed endpoints for the cheap probe tier (one small JSON request)
+OEMBED_ENDPOINTS = {
+    'youtube': 'https://www.youtube.com/oembed',
+    'vimeo': 'https://vimeo.com/api/oembed.json',
+}
 
 
 class DownloadService:
@@ -23,20 +67,38 @@ class DownloadService:
         """Initialize the download service."""
         self.downloads_dir = DOWNLOADS_DIR
     
-    def _is_youtube_url(self, url: str) -> bool:
-        """Check if URL is from YouTube."""
-        youtube_domains = ['youtube.com', 'youtu.be', 'm.youtube.com', 'www.youtube.com']
-        return any(domain in url.lower() for domain in youtube_domains)
+    def get_platform(self, url: str) -> str:
+        """Return a short platform name for a URL ('youtube', ..., 'other')."""
+        return classify_url(url).platform
     
-    def _is_instagram_url(self, url: str) -> bool:
-        """Check if URL is from Instagram."""
-        instagram_domains = ['instagram.com', 'www.instagram.com']
-        return any(domain in url.lower() for domain in instagram_domains)
+    def estimate_cost(self, url: str, format_id: Optional[str] = None, audio_only: bool = False,
+                      start: Optional[float] = None, end: Optional[float] = None) -> float:
+        """
+        Estimate a download's size for the scheduler.
+        
+        Uses the info cached during validation, so this never hits the network.
+        A format whose size isn't reported is estimated from its bitrate; if
+        that's unknown too, the whole job is estimated from the duration (a
+        missing part must not make a long video look small).
+        """
+        info = info_cache.get(url)
+        fraction = self._clip_fraction(info.get('duration') if info else None, start, end)
+        if info and format_id and not audio_only:
+            formats = {f.get('format_id'): f for f in info.get('formats') or []}
+            sizes = [self._format_size(formats.get(part), info.get('duration')) for part in format_id.split('+')]
+            if all(sizes):
+                return estimate_job_cost({'filesize': sum(sizes)}, audio_only) * fraction
+        return estimate_job_cost(info, audio_only) * fraction
     
-    def _is_twitter_url(self, url: str) -> bool:
-        """Check if URL is from Twitter/X."""
-        twitter_domains = ['twitter.com', 'x.com', 'www.twitter.com', 'www.x.com']
-        return any(domain in url.lower() for domain in twitter_domains)
+    @staticmethod
+    def _format_size(fmt: Optional[Dict], duration: Optional[float]) -> float:
+        """Reported size of a format, else bitrate x duration, else 0."""
+        if not fmt:
+            return 0
+        size = fmt.get('filesize') or fmt.get('filesize_approx')
+        if not size and fmt.get('tbr') and duration:
+            size = fmt['tbr'] * 1000 / 8 * duration
+        return size or 0
     
     def validate_url(self, url: str) -> Tuple[bool, Optional[str]]:
         """
@@ -57,8 +119,12 @@ class DownloadService:
         if not url.startswith(('http://', 'https://')):
             return False, "URL must start with http:// or https://"
         
+        # Extracted moments ago (or kept warm by the prefetcher) - nothing to redo
+        if info_cache.get(url) is not None:
+            return True, None
+        
         # For YouTube, use simpler validation and warn about restrictions
-        if self._is_youtube_url(url):
+        if self.get_platform(url) == 'youtube':
             return self._validate_youtube_url(url)
         
         # For other platforms, use standard validation
@@ -66,20 +132,10 @@ class DownloadService:
     
     def _validate_youtube_url(self, url: str) -> Tuple[bool, Optional[str]]:
         """Validate YouTube URL with special handling."""
-        # Try a simple extraction first with minimal options
         try:
-            ydl_opts = {
-                'quiet': True,
-                'no_warnings': True,
-                'extract_flat': False,
-                # Minimal options - let yt-dlp handle it
-                'skip_download': True,
-            }
-            
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=False)
-                # If we get here, it worked
-                return True, None
+            self.refresh_info(url)
+            # If we get here, it worked
+            return True, None
                 
         except yt_dlp.utils.DownloadError as e:
             error_msg = str(e)
@@ -106,16 +162,7 @@ class DownloadService:
         """Validate non-YouTube URLs."""
         # Check if yt-dlp can extract info (without downloading)
         try:
-            ydl_opts = {
-                'quiet': True,
-                'no_warnings': True,
-                'extract_flat': False,
-                'skip_download': True,
-            }
-            
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.extract_info(url, download=False)
-            
+            self.refresh_info(url)
             return True, None
             
         except yt_dlp.utils.DownloadError as e:
@@ -132,104 +179,174 @@ class DownloadService:
         except Exception as e:
             return False, f"Error validating URL: {str(e)[:200]}"
     
-    def _old_validate_url(self, url: str) -> Tuple[bool, Optional[str]]:
-        """Old validation method - kept for reference."""
-        # Check if yt-dlp can extract info (without downloading)
-        # Try multiple methods to avoid bot detection
-        methods = [
-            {
-                'quiet': True,
-                'no_warnings': True,
-                'extract_flat': False,
-                'user_agent': 'Mozilla/5.0 (iPhone; CPU iPhone OS 16_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/16.0 Mobile/15E148 Safari/604.1',
-                'extractor_args': {
-                    'youtube': {
-                        'player_client': ['mweb'],  # Mobile web - most reliable
-                        'player_skip': [],
-                    }
-                },
-                'http_headers': {
-                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-                    'Accept-Language': 'en-us,en;q=0.5',
-                },
-                'retries': 10,
-                'fragment_retries': 10,
-            },
-            {
-                'quiet': True,
-                'no_warnings': True,
-                'extract_flat': False,
-                'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'extractor_args': {
-                    'youtube': {
-                        'player_client': ['ios'],
-                        'player_skip': [],
-                    }
-                },
-                'retries': 5,
-                'fragment_retries': 5,
-            },
-            {
-                'quiet': True,
-                'no_warnings': True,
-                'extract_flat': False,
-                'extractor_args': {
-                    'youtube': {
-                        'player_client': ['android'],
-                        'player_skip': [],
-                    }
-                },
-                'retries': 3,
-                'fragment_retries': 3,
+    @staticmethod
+    def _extract_limits(budget: float, hedged: bool = False) -> Dict:
+        """
+        socket_timeout and retries for an extraction that has budget seconds.
+        
+        Retries have to fit in the budget, not the other way round. Hedged
+        attempts get none, so a losing one finishes quickly.
+        """
+        socket_timeout = min(EXTRACT_SOCKET_TIMEOUT, budget)
+        retries = 0 if hedged else max(0, min(3, int(budget // socket_timeout) - 1))
+        return {'socket_timeout': socket_timeout, 'retries': retries, 'extractor_retries': retries}
+    
+    def _extract_info(self, url: str, ydl_opts: Dict, decided: Optional[threading.Event] = None) -> Dict:
+        """
+        Full yt-dlp extraction, cached in info_cache (slim projection).
+        
+        Bot-detection errors are counted by the platform's circuit breaker.
+        decided is the client race's event (see client_selector.py): once
+        it's set, the extraction doesn't start, and one that finishes late
+        leaves the cache to the winner.
+        """
+        platform = self.get_platform(url)
+        if decided is not None and decided.is_set():
+            raise AttemptDropped(f"Extraction of {url} dropped")
+        try:
+            with egress_pool.lease(platform) as route, yt_dlp.YoutubeDL({**ydl_opts, **route.ydl_options}) as ydl:
+                info = ydl.extract_info(url, download=False)
+        except Exception as e:
+            if is_bot_detection_error(str(e)):
+                circuit_breaker.record_failure(platform)
+            raise
+        circuit_breaker.record_success(platform)
+        # Only the slim projection outlives this call
+        info = slim_info(info)
+        if decided is None or not decided.is_set():
+            info_cache.set(url, info)
+        return info
+    
+    def _probe_oembed(self, url: str) -> Optional[Dict]:
+        """Fetch title/thumbnail from the platform's oEmbed endpoint, if it has one."""
+        endpoint = OEMBED_ENDPOINTS.get(self.get_platform(url))
+        if not endpoint:
+            return None
+        try:
+            req = urllib.request.Request(
+                f"{endpoint}?{urlencode({'url': url, 'format': 'json'})}",
+                headers={'User-Agent': YTDLP_OPTIONS.get('user_agent', 'Mozilla/5.0')}
+            )
+            with urllib.request.urlopen(req, timeout=PROBE_TIMEOUT) as response:
+                data = json.loads(response.read(64 * 1024))
+        except Exception:
+            return None
+        return {
+            'title': data.get('title'),
+            'thumbnail': data.get('thumbnail_url'),
+            'uploader': data.get('author_name'),
+        }
+    
+    def _probe_flat(self, url: str) -> Dict:
+        """Lightweight yt-dlp extraction: no format resolution, no playlist expansion."""
+        ydl_opts = {
+            'quiet': True,
+            'no_warnings': True,
+            'skip_download': True,
+            'extract_flat': 'in_playlist',
+            'socket_timeout': PROBE_TIMEOUT,
+        }
+        with egress_pool.lease(self.get_platform(url)) as route, yt_dlp.YoutubeDL({**ydl_opts, **route.ydl_options}) as ydl:
+            info = ydl.extract_info(url, download=False, process=False)
+        return {
+            'title': info.get('title'),
+            'thumbnail': info.get('thumbnail') or next(
+                (t.get('url') for t in reversed(info.get('thumbnails') or []) if t.get('url')), None
+            ),
+            'uploader': info.get('uploader'),
+            'duration': info.get('duration'),
+        }
+    
+    def probe(self, url: str) -> Dict:
+        """
+        Cheap "is this supported + title/thumbnail" lookup.
+        
+        Tries the platform's oEmbed endpoint first (one small JSON request),
+        then a flat yt-dlp extraction without format resolution. The full
+        format list is only fetched later via get_video_info.
+        
+        Args:
+            url: The video URL
+            
+        Returns:
+            Dictionary with basic video information (no formats)
+        """
+        cached = probe_cache.get(url)
+        if cached is not None:
+            return cached
+        
+        # A full extraction already happened - nothing cheaper than that
+        full = info_cache.get(url)
+        if full is not None:
+            meta = {
+                'title': full.get('title'),
+                'thumbnail': full.get('thumbnail'),
+                'uploader': full.get('uploader'),
+                'duration': full.get('duration'),
             }
-        ]
+        else:
+            meta = self._probe_oembed(url)
+            if meta is None or not meta.get('title'):
+                try:
+                    meta = self._probe_flat(url)
+                except Exception as e:
+                    error_msg = str(e)
+                    if "Unsupported URL" in error_msg:
+                        raise Exception("This URL is not supported")
+                    raise Exception(f"Failed to get video info: {error_msg[:200]}")
         
-        last_error = None
-        for method_idx, ydl_opts in enumerate(methods):
-            try:
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    ydl.extract_info(url, download=False)
-                
-                # Success! Return immediately
-                return True, None
-                
-            except yt_dlp.utils.DownloadError as e:
-                last_error = e
-                # If this is the last method, we'll handle the error below
-                if method_idx < len(methods) - 1:
-                    # Try next method
-                    continue
-                # Otherwise, fall through to error handling
-                break
-            except Exception as e:
-                last_error = e
-                if method_idx < len(methods) - 1:
-                    continue
-                break
+        video_info = {
+            'title': meta.get('title') or 'Unknown',
+            'duration': meta.get('duration') or 0,
+            'thumbnail': meta.get('thumbnail') or '',
+            'thumbnail_proxy': self._thumbnail_proxy_url(meta.get('thumbnail')),
+            'uploader': meta.get('uploader') or 'Unknown',
+            'supported': True,
+            'formats': [],
+            'tier': 'probe',
+        }
+        probe_cache.set(url, video_info)
+        return video_info
+    
+    def probe_json(self, url: str) -> bytes:
+        """probe, serialized (memoized on the probe cache entry)."""
+        video_info = self.probe(url)
+        return probe_cache.memoize(url, 'json', dumps) or dumps(video_info)
+    
+    def refresh_info(self, url: str) -> Dict:
+        """
+        Extract a URL's info and (re)store it in the info cache.
         
-        # All methods failed, return error
-        if last_error:
-            error_msg = str(last_error)
-            # Handle YouTube bot detection errors
-            if "Sign in to confirm" in error_msg or "bot" in error_msg.lower():
-                return False, "YouTube is blocking automated requests. Please try again in a few minutes or use a different video."
-            elif "Private video" in error_msg:
-                return False, "This video is private and cannot be downloaded"
-            elif "Video unavailable" in error_msg:
-                return False, "Video is unavailable or has been removed"
-            elif "Unsupported URL" in error_msg:
-                return False, "This URL is not supported"
-            else:
-                # Return a cleaner error message
-                if "ERROR:" in error_msg:
-                    # Extract just the error part
-                    error_part = error_msg.split("ERROR:")[-1].strip()
-                    if len(error_part) > 200:
-                        error_part = error_part[:200] + "..."
-                    return False, f"URL validation failed: {error_part}"
-                return False, f"URL validation failed: {error_msg[:200]}"
+        Used by validation, by get_video_info on a cache miss and by the
+        prefetcher to refresh hot URLs before their entry expires.
+        
+        The player client that worked last is tried first; if it's slow or
+        fails, the next one is raced against it (see client_selector.py).
+        
+        Returns:
+            Slim info dictionary (see info_projection.py)
+        """
+        platform = self.get_platform(url)
+        ydl_opts = {
+            'quiet': True,
+            'no_warnings': True,
+            'skip_download': True,
+            # Playlists: list entries page by page without extracting each
+            # video, and stop after the entries we keep
+            'noplaylist': True,
+            'extract_flat': 'in_playlist',
+            'lazy_playlist': True,
+            'playlistend': PLAYLIST_MAX_ENTRIES,
+        }
         
-        return False, "Failed to validate URL after trying multiple methods"
+        def attempt(client: Optional[str], budget: float, hedged: bool, decided: threading.Event) -> Dict:
+            return self._extract_info(url, {
+                **ydl_opts,
+                **self._extract_limits(budget, hedged),
+                **client_selector.options_for(platform, client),
+            }, decided)
+        
+        return client_selector.run(platform, attempt)
     
     def get_video_info(self, url: str) -> Dict:
         """
@@ -241,189 +358,565 @@ class DownloadService:
         Returns:
             Dictionary with video information (title, duration, formats, etc.)
         """
-        ydl_opts = {
-            'quiet': True,
-            'no_warnings': True,
-            # YouTube bot detection bypass - try ios first (most reliable)
-            'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'extractor_args': {
-                'youtube': {
-                    'player_client': ['ios', 'android', 'web'],  # Try ios first
-                    'player_skip': ['webpage'],
+        return self._video_info(self._get_info(url))
+    
+    def get_video_info_json(self, url: str) -> bytes:
+        """
+        get_video_info, serialized.
+        
+        The JSON is memoized on the info cache entry, so hot URLs are only
+        serialized once per extraction.
+        """
+        info = self._get_info(url)
+        build = lambda cached: dumps(self._video_info(cached))
+        return info_cache.memoize(url, 'video_info_json', build) or build(info)
+    
+    def get_metadata_json(self, url: str) -> bytes:
+        """
+        Metadata only (description, chapters, tags, subtitle languages), serialized.
+        
+        Derived from the cached extraction - no media is touched.
+        """
+        info = self._get_info(url)
+        build = lambda cached: dumps(self._metadata(cached))
+        return info_cache.memoize(url, 'metadata_json', build) or build(info)
+    
+    def get_subtitles(self, url: str, lang: str, subtitle_format: str = 'srt', auto: bool = False) -> str:
+        """
+        Subtitle text for a language, converted in-process if needed.
+        
+        Args:
+            url: The video URL
+            lang: Language code as listed by get_metadata_json (e.g. 'en')
+            subtitle_format: 'srt' or 'vtt'
+            auto: Use the platform's automatic captions instead of uploaded subtitles
+            
+        Returns:
+            Subtitle file content
+        """
+        info = self._get_info(url)
+        build = lambda cached: subtitles.render(cached, lang, subtitle_format, auto)
+        # Cached with the info entry - a popular video's captions are fetched once
+        return info_cache.memoize(url, f"subtitles:{lang}:{subtitle_format}:{int(auto)}", build) or build(info)
+    
+    def _metadata(self, info: Dict) -> Dict:
+        """Extract the non-media fields from an info dict."""
+        return {
+            'title': info.get('title', 'Unknown'),
+            'description': info.get('description') or '',
+            'uploader': info.get('uploader', 'Unknown'),
+            'upload_date': info.get('upload_date'),
+            'duration': info.get('duration', 0),
+            'view_count': info.get('view_count', 0),
+            'like_count': info.get('like_count'),
+            'tags': info.get('tags') or [],
+            'categories': info.get('categories') or [],
+            'webpage_url': info.get('webpage_url'),
+            'thumbnail_proxy': self._thumbnail_proxy_url(info.get('thumbnail')),
+            'chapters': [
+                {
+                    'title': chapter.get('title') or '',
+                    'start_time': chapter.get('start_time'),
+                    'end_time': chapter.get('end_time'),
                 }
-            },
-            'retries': 5,
-            'fragment_retries': 5,
-            'file_access_retries': 3,
+                for chapter in info.get('chapters') or []
+            ],
+            'subtitles': subtitles.languages(info.get('subtitles')),
+            'automatic_captions': subtitles.languages(info.get('automatic_captions')),
         }
-        
+    
+    def _get_info(self, url: str) -> Dict:
+        """Cached (slim) info for a URL, extracting it on a miss."""
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=False)
-                
-                # Extract relevant information
-                video_info = {
-                    'title': info.get('title', 'Unknown'),
-                    'duration': info.get('duration', 0),
-                    'thumbnail': info.get('thumbnail', ''),
-                    'uploader': info.get('uploader', 'Unknown'),
-                    'view_count': info.get('view_count', 0),
-                    'formats': self._extract_formats(info),
-                }
-                
-                return video_info
-                
+            # Validation (or the prefetcher) usually extracted this URL already
+            info = info_cache.get(url)
+            if info is None:
+                info = self.refresh_info(url)
+            return info
         except Exception as e:
             error_msg = str(e)
             if "bot" in error_msg.lower() or "Sign in" in error_msg:
                 raise Exception("YouTube is blocking automated requests. Please try again in a few minutes.")
             raise Exception(f"Failed to get video info: {error_msg[:200]}")
     
+    def _video_info(self, info: Dict) -> Dict:
+        """Extract the relevant information from an info dict."""
+        return {
+            'title': info.get('title', 'Unknown'),
+            'duration': info.get('duration', 0),
+            'thumbnail': info.get('thumbnail', ''),
+            'thumbnail_proxy': self._thumbnail_proxy_url(info.get('thumbnail')),
+            'uploader': info.get('uploader', 'Unknown'),
+            'view_count': info.get('view_count', 0),
+            'formats': self._extract_formats(info),
+            'tier': 'formats',
+        }
+    
+    def _thumbnail_proxy_url(self, thumbnail: Optional[str]) -> str:
+        """Return our cached /api/thumbnail URL for a platform thumbnail."""
+        if not thumbnail:
+            return ''
+        return f"/api/thumbnail/{thumbnail_cache.make_token(thumbnail)}"
+    
     def _extract_formats(self, info: Dict) -> list:
         """
         Extract available formats from video info.
         
         Args:
-            info: Raw yt-dlp info dictionary
+            info: yt-dlp info dictionary (raw or slim)
             
         Returns:
             List of available formats
         """
-        formats = []
-        
-        # Get available formats
         available_formats = info.get('formats', [])
+        index = FormatIndex(available_formats)
+        
+        # One entry per resolution: best quality + fastest-to-deliver selectors
+        formats = index.to_list()
         
-        # Extract unique video formats
-        seen_resolutions = set()
-        for fmt in available_formats:
-            if fmt.get('vcodec') != 'none':  # Has video
-                resolution = fmt.get('resolution', 'unknown')
-                if resolution not in seen_resolutions:
-                    formats.append({
-                        'format_id': fmt.get('format_id'),
-                        'resolution': resolution,
-                        'ext': fmt.get('ext', 'mp4'),
-                        'filesize': fmt.get('filesize', 0),
-                    })
-                    seen_resolutions.add(resolution)
-        
-        # Add audio-only option
-        audio_formats = [f for f in available_formats if f.get('acodec') != 'none' and f.get('vcodec') == 'none']
-        if audio_formats:
-            best_audio = max(audio_formats, key=lambda x: x.get('abr', 0))
+        # Add audio-only option (the same m4a-first pick an audio download makes)
+        best_audio = index.best_audio(prefer_ext='m4a')
+        if best_audio:
             formats.append({
                 'format_id': best_audio.get('format_id'),
                 'resolution': 'audio only',
                 'ext': best_audio.get('ext', 'mp3'),
-                'filesize': best_audio.get('filesize', 0),
+                'filesize': best_audio.get('filesize') or 0,
             })
         
         return formats
     
-    def download_video(self, url: str, format_id: Optional[str] = None, audio_only: bool = False) -> Dict:
+    def _build_ydl_options(self, url: str, format_id: Optional[str] = None, audio_only: bool = False) -> Dict:
         """
-        Download video or audio from URL.
+        Build yt-dlp options (format selector + post-processors) for a request.
         
-        Args:
-            url: The video URL
-            format_id: Specific format ID to download (optional)
-            audio_only: If True, download audio only
-            
-        Returns:
-            Dictionary with download status and file path
+        Shared by download_video and resolve_direct_url so both pick the same format.
         """
         # Prepare yt-dlp options
         ydl_opts = YTDLP_OPTIONS.copy()
+        # The player client that worked most recently for this platform
+        platform = self.get_platform(url)
+        ydl_opts.update(client_selector.options_for(platform, client_selector.best(platform)))
         
         if audio_only:
-            # Audio-only download
+            # Audio-only download: best native audio, m4a first (plays everywhere).
+            # 'best' codec = stream copy; it only does anything when we had to
+            # fall back to a muxed file. mp3 (if requested) is encoded
+            # afterwards in the transcoder pool.
             ydl_opts.update({
-                'format': 'bestaudio/best',
+                'format': 'bestaudio[ext=m4a]/bestaudio/best',
                 'postprocessors': [{
                     'key': 'FFmpegExtractAudio',
-                    'preferredcodec': 'mp3',
-                    'preferredquality': '192',
+                    'preferredcodec': 'best',
                 }],
             })
         elif format_id:
-            # Specific format - but ensure audio is included for platforms like Instagram
-            if self._is_instagram_url(url):
+            # format_id usually comes from _extract_formats, which already
+            # pairs video-only streams with audio (e.g. "137+140")
+            if '+' not in format_id and self.get_platform(url) == 'instagram':
                 # Instagram needs video+audio merge
                 ydl_opts['format'] = f'{format_id}+bestaudio/best'
             else:
-                ydl_opts['format'] = format_id
+                ydl_opts['format'] = f'{format_id}/best'
         else:
             # Best quality with audio merge for platforms that need it
-            if self._is_instagram_url(url) or self._is_twitter_url(url):
+            if self.get_platform(url) in ('instagram', 'twitter'):
                 # Instagram and Twitter often have separate streams
                 ydl_opts['format'] = 'bestvideo+bestaudio/best'
             else:
                 # Default: try best with audio, fallback to best
                 ydl_opts['format'] = 'bestvideo+bestaudio/best'
         
+        return ydl_opts
+    
+    def _will_merge(self, url: str, format_selector: str) -> bool:
+        """
+        Will this format selector pick separate video and audio streams?
+        
+        Decided from the selector and the cached info, without an extraction.
+        """
+        first = format_selector.split('/')[0]
+        if '+' not in first:
+            return False
+        video, audio = first.split('+', 1)
+        if video != 'bestvideo' and audio != 'bestaudio':
+            # Explicit IDs (e.g. "137+140" from _extract_formats)
+            return True
+        info = info_cache.get(url)
+        if info is None:
+            # Can't tell - separate streams are the common case
+            return True
+        formats = info.get('formats') or []
+        # The selector only falls back to a single file if a side is missing
+        if video == 'bestvideo' and not any(
+                f.get('vcodec') not in (None, 'none') and f.get('acodec') == 'none' for f in formats):
+            return False
+        if audio == 'bestaudio' and not any(
+                f.get('acodec') not in (None, 'none') and f.get('vcodec') == 'none' for f in formats):
+            return False
+        return True
+    
+    def _is_ip_bound(self, media_url: str) -> bool:
+        """Check if a signed media URL only works from the IP that requested it."""
+        parsed = urlparse(media_url)
+        host = (parsed.hostname or '').lower()
+        if any(host == h or host.endswith('.' + h) for h in IP_BOUND_HOSTS if h):
+            return True
+        
+        params = parse_qs(parsed.query)
+        if any(p in params for p in IP_BOUND_URL_PARAMS):
+            return True
+        # Some CDNs list signed params in 'sparams' instead (e.g. "ip,expire")
+        signed = ','.join(params.get('sparams', [])).split(',')
+        return any(p in signed for p in IP_BOUND_URL_PARAMS)
+    
+    def resolve_direct_url(self, url: str, format_id: Optional[str] = None, audio_only: bool = False,
+                           audio_format: str = AUDIO_DEFAULT_FORMAT) -> Optional[Dict]:
+        """
+        Resolve the platform's own media URL so it can be served without a
+        server-side download.
+        
+        Only works for single-file progressive formats that need no merge or
+        conversion. URLs tied to our server's IP get delivery 'proxy' and are
+        streamed through /api/file; the rest get delivery 'direct' and are
+        handed to the client. URLs that need cookies are downloaded on the
+        server.
+        
+        Args:
+            url: The video URL
+            format_id: Specific format ID (optional)
+            audio_only: If True, resolve audio only
+            audio_format: 'native' or 'mp3' (mp3 always needs a server-side encode)
+            
+        Returns:
+            Result dictionary (same shape as download_video) or None if the
+            media has to be downloaded on the server
+        """
+        ydl_opts = self._build_ydl_options(url, format_id, audio_only)
+        
+        # mp3 has to pass through ffmpeg here
+        if audio_only and audio_format == 'mp3':
+            return None
+        
+        # So do merged streams - don't pay for an uncached extraction just
+        # to find its requested_formats
+        if self._will_merge(url, ydl_opts['format']):
+            return None
+        
+        ydl_opts.update({'quiet': True, 'no_warnings': True, 'skip_download': True})
+        # Only an extraction - YTDLP_OPTIONS' retries are meant for downloads
+        ydl_opts.update(self._extract_limits(EXTRACT_LATENCY_BUDGET))
+        
+        try:
+            with egress_pool.lease(self.get_platform(url)) as route, yt_dlp.YoutubeDL({**ydl_opts, **route.ydl_options}) as ydl:
+                info = ydl.extract_info(url, download=False)
+                # The route is released when the lease ends - keep what we need
+                streamable, egress = route.streamable, route.name
+        except Exception:
+            # Let the server-side download report the real error
+            return None
+        
+        # yt-dlp moves cookies out of http_headers into info['cookies'].
+        # The signed proxy token is readable by the client, so cookies can't
+        # ride in it - download those on the server, with our cookie jar
+        if info.get('cookies') or 'Cookie' in (info.get('http_headers') or {}):
+            return None
+        
+        # Separate video+audio streams need a merge
+        if info.get('requested_formats'):
+            return None
+        
+        media_url = info.get('url')
+        if not media_url or info.get('protocol') not in ('http', 'https'):
+            return None
+        
+        if audio_only:
+            # Native audio is handed out as-is, but only a real audio-only stream
+            if info.get('vcodec') not in (None, 'none'):
+                return None
+        else:
+            # FFmpegVideoConvertor would remux anything that isn't mp4
+            merge_ext = YTDLP_OPTIONS.get('merge_output_format', 'mp4')
+            if info.get('ext') != merge_ext:
+                return None
+        
+        # IP-bound URLs won't work from the user's browser - stream those
+        # through our proxy instead
+        http_headers = info.get('http_headers') or {}
+        delivery = 'direct'
+        if self._is_ip_bound(media_url):
+            # The proxy has to fetch through the same egress route
+            if not STREAM_PROXY_ENABLED or not streamable:
+                return None
+            delivery = 'proxy'
+        
+        filesize = info.get('filesize') or info.get('filesize_approx') or 0
+        if filesize > MAX_DOWNLOAD_SIZE_BYTES:
+            raise Exception(f"File too large: {filesize / 1024 / 1024:.2f}MB (max: {MAX_DOWNLOAD_SIZE_MB}MB)")
+        
+        title = info.get('title', 'Unknown')
+        return {
+            'status': 'success',
+            'delivery': delivery,
+            'filename': sanitize_filename(f"{title}.{info.get('ext', 'mp4')}"),
+            'filepath': None,
+            'filesize': filesize,
+            'title': title,
+            'media_url': media_url,
+            'http_headers': http_headers,
+            'egress': egress,
+            'audio_processing': 'stream_copy' if audio_only else None,
+        }
+    
+    @staticmethod
+    def _clip_fraction(duration: Optional[float], start: Optional[float], end: Optional[float]) -> float:
+        """Share of the media a clip covers (1.0 when not clipping or unknown)."""
+        if (start is None and end is None) or not duration:
+            return 1.0
+        clip_start = start or 0
+        clip_end = min(end if end is not None else duration, duration)
+        return max(clip_end - clip_start, 0) / duration
+    
+    @staticmethod
+    def _estimated_size(info: Dict) -> int:
+        """Size of the selected format(s) as reported by yt-dlp, 0 if unknown."""
+        formats = info.get('requested_formats') or [info]
+        return sum(f.get('filesize') or f.get('filesize_approx') or 0 for f in formats)
+    
+    def existing_download(self, url: str, format_id: Optional[str] = None, audio_only: bool = False,
+                          options: Optional[Dict] = None) -> Optional[Dict]:
+        """
+        The job for these download parameters if it's running, or finished
+        with its file still published. None if a download would run.
+        """
+        job = job_store.get(job_store.job_key(url, format_id, audio_only, options))
+        if job is None:
+            return None
+        if job['status'] == STATUS_DOWNLOADING:
+            return job
+        if job['status'] == STATUS_FINISHED and job['result'] and artifact_store.exists(job['result']['filename']):
+            return job
+        return None
+    
+    def download_video(self, url: str, format_id: Optional[str] = None, audio_only: bool = False,
+                       audio_format: str = AUDIO_DEFAULT_FORMAT, start: Optional[float] = None,
+                       end: Optional[float] = None) -> Dict:
+        """
+        Download video or audio from URL.
+        
+        Args:
+            url: The video URL
+            format_id: Specific format ID to download (optional)
+            audio_only: If True, download audio only
+            audio_format: For audio: 'native' (stream copy, default) or 'mp3' (re-encode)
+            start: Clip start in seconds (optional)
+            end: Clip end in seconds (optional)
+            
+        Returns:
+            Dictionary with download status and file path
+        """
+        options = {'audio_format': audio_format} if audio_only else {}
+        if start is not None or end is not None:
+            options.update({'start': start, 'end': end})
+        
+        # Same download already finished (e.g. pre-downloaded by the prefetcher)
+        done = self.existing_download(url, format_id, audio_only, options)
+        if done and done['status'] == STATUS_FINISHED:
+            return done['result']
+        
+        # Record the job so a restarted worker can resume it
+        job, owned = job_store.start(url, format_id, audio_only, options)
+        if not owned:
+            # Same download already running in another worker - share its result
+            return self._wait_for_job(job['id'])
+        
+        try:
+            with job_store.keep_alive(job['id']):
+                result = self._run_download(url, format_id, audio_only, job['id'], **options)
+        except Exception as e:
+            job_store.fail(job['id'], str(e))
+            raise
+        
+        job_store.finish(job['id'], result)
+        return result
+    
+    def _wait_for_job(self, job_id: str) -> Dict:
+        """Wait for a job owned by another worker and return its result."""
+        deadline = time.time() + JOB_WAIT_TIMEOUT
+        while time.time() < deadline:
+            job = job_store.get(job_id)
+            if job['status'] == STATUS_FINISHED and job['result']:
+                if artifact_store.exists(job['result']['filename']):
+                    return job['result']
+                break
+            if job['status'] == STATUS_FAILED:
+                raise Exception(job['error'] or "Download failed")
+            if job['status'] != STATUS_DOWNLOADING:
+                break
+            time.sleep(1)
+        raise Exception("This download is already in progress. Please try again in a moment.")
+    
+    def resume_interrupted_jobs(self) -> int:
+        """
+        Resume downloads that a dead worker left behind.
+        
+        Each job is claimed atomically, so several workers starting at once
+        won't resume the same download twice.
+        
+        Returns:
+            Number of jobs resumed
+        """
+        resumed = 0
+        for job in job_store.interrupted_jobs():
+            if not job_store.claim(job['id']):
+                continue
+            try:
+                with job_store.keep_alive(job['id']):
+                    result = self._run_download(job['url'], job['format_id'], job['audio_only'], job['id'], **job['options'])
+                job_store.finish(job['id'], result)
+                resumed += 1
+            except Exception as e:
+                job_store.fail(job['id'], str(e))
+        return resumed
+    
+    def _run_download(self, url: str, format_id: Optional[str], audio_only: bool, job_id: str,
+                      audio_format: str = AUDIO_DEFAULT_FORMAT, start: Optional[float] = None,
+                      end: Optional[float] = None) -> Dict:
+        """
+        Run yt-dlp for a job (resumes from its .part file if one exists).
+        
+        The job works in its own directory (WORK_DIR/<job_id>), so jobs never
+        see each other's files and a restarted job finds its .part files
+        again. The finished file is then published under a unique name.
+        """
+        ydl_opts = self._build_ydl_options(url, format_id, audio_only)
+        clipping = start is not None or end is not None
+        
+        workspace = WORK_DIR / job_id
+        workspace.mkdir(parents=True, exist_ok=True)
+        ydl_opts['outtmpl'] = str(workspace / '%(title)s.%(ext)s')
+        
+        if clipping:
+            # Only fetch the fragments/byte ranges covering the clip and cut
+            # at the nearest keyframes (stream copy, no re-encode)
+            ydl_opts.update({
+                'download_ranges': yt_dlp.utils.download_range_func(
+                    None, [(start or 0, end if end is not None else float('inf'))]
+                ),
+                'force_keyframes_at_cuts': False,
+                'outtmpl': str(workspace / '%(title)s [%(section_start)s-%(section_end)s].%(ext)s'),
+            })
+        
+        # Reject oversized downloads before fetching anything. For clips
+        # only the clipped share of the media counts.
+        rejected = {}
+        
+        def size_filter(info_dict, *, incomplete=False):
+            if incomplete:
+                return None
+            estimate = self._estimated_size(info_dict)
+            estimate *= self._clip_fraction(info_dict.get('duration'), start, end)
+            if estimate > MAX_DOWNLOAD_SIZE_BYTES:
+                rejected['message'] = f"File too large: ~{estimate / 1024 / 1024:.2f}MB (max: {MAX_DOWNLOAD_SIZE_MB}MB)"
+                return rejected['message']
+            return None
+        
+        ydl_opts['match_filter'] = size_filter
+        
+        # Per-job cap, enforced by yt-dlp itself
+        if BANDWIDTH_JOB_LIMIT:
+            ydl_opts['ratelimit'] = BANDWIDTH_JOB_LIMIT
+        
         # Progress hook to track download
         download_info = {'status': 'downloading', 'progress': 0}
+        metered = {'bytes': 0}
         
         def progress_hook(d):
             """Callback function for download progress."""
             if d['status'] == 'downloading':
                 total = d.get('total_bytes') or d.get('total_bytes_estimate', 0)
                 downloaded = d.get('downloaded_bytes', 0)
+                # Blocking here slows yt-dlp down to the global bulk limit.
+                # The count restarts for each file (e.g. audio after video).
+                delta = downloaded - metered['bytes'] if downloaded >= metered['bytes'] else downloaded
+                metered['bytes'] = downloaded
+                bandwidth.consume_download(delta)
                 if total > 0:
                     download_info['progress'] = int((downloaded / total) * 100)
                     download_info['downloaded'] = downloaded
                     download_info['total'] = total
+                job_store.update_progress(job_id, download_info['progress'], d.get('tmpfilename'))
             elif d['status'] == 'finished':
                 download_info['status'] = 'finished'
                 download_info['filename'] = d.get('filename')
         
         ydl_opts['progress_hooks'] = [progress_hook]
         
+        # yt-dlp reports the file it ends up with once all post-processors
+        # (merge, convert) have run - no guessing from the title
+        final = {}
+        
+        def post_hook(filepath):
+            final['filepath'] = filepath
+        
+        ydl_opts['post_hooks'] = [post_hook]
+        
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                # Extract info first to get filename
+            # Media URLs can be bound to the IP that extracted them, so the
+            # whole download goes through one route
+            with egress_pool.lease(self.get_platform(url)) as route, yt_dlp.YoutubeDL({**ydl_opts, **route.ydl_options}) as ydl:
                 info = ydl.extract_info(url, download=True)
-                
-                # Get the actual downloaded file
-                filename = ydl.prepare_filename(info)
-                
-                # If audio, the file might have different extension
-                if audio_only and not filename.endswith('.mp3'):
-                    # Find the actual mp3 file
-                    base_name = Path(filename).stem
-                    mp3_file = self.downloads_dir / f"{base_name}.mp3"
-                    if mp3_file.exists():
-                        filename = str(mp3_file)
-                
-                # For Instagram/Twitter: Check if merged file exists (FFmpeg creates it)
-                if self._is_instagram_url(url) or self._is_twitter_url(url):
-                    # FFmpeg merges to .mp4, check for that
-                    base_name = Path(filename).stem
-                    merged_file = self.downloads_dir / f"{base_name}.mp4"
-                    if merged_file.exists():
-                        filename = str(merged_file)
-                
-                # Check file size
-                file_path = Path(filename)
-                if file_path.exists():
-                    file_size = file_path.stat().st_size
-                    if file_size > MAX_DOWNLOAD_SIZE_BYTES:
-                        file_path.unlink()  # Delete oversized file
-                        raise Exception(f"File too large: {file_size / 1024 / 1024:.2f}MB (max: {MAX_DOWNLOAD_SIZE_MB}MB)")
-                    
-                    return {
-                        'status': 'success',
-                        'filename': file_path.name,
-                        'filepath': str(file_path),
-                        'filesize': file_size,
-                        'title': info.get('title', 'Unknown'),
-                    }
-                else:
-                    raise Exception("Downloaded file not found")
+                if rejected:
+                    raise Exception(rejected['message'])
+                # Don't hold the full info dict through transcoding/publishing
+                title = info.get('title', 'Unknown')
+                del info
+            
+            if 'filepath' not in final:
+                raise Exception("Downloaded file not found")
+            file_path = Path(final['filepath'])
+            
+            # Only re-encode audio when mp3 was asked for
+            audio_processing = None
+            if audio_only:
+                audio_processing = 'stream_copy'
+                if audio_format == 'mp3' and file_path.suffix != '.mp3':
+                    file_path = transcoder.to_mp3(file_path)
+                    audio_processing = 'transcode'
+            
+            # Check file size
+            file_size = file_path.stat().st_size
+            if file_size > MAX_DOWNLOAD_SIZE_BYTES:
+                shutil.rmtree(workspace, ignore_errors=True)
+                raise Exception(f"File too large: {file_size / 1024 / 1024:.2f}MB (max: {MAX_DOWNLOAD_SIZE_MB}MB)")
+            
+            # Publish to the artifact store (a shared bucket in a cluster)
+            name = artifact_store.put(file_path, self._published_name(file_path, job_id))
+            shutil.rmtree(workspace, ignore_errors=True)
+            local_path = artifact_store.local_path(name)
+            return {
+                'status': 'success',
+                'delivery': 'server',
+                'filename': name,
+                'filepath': str(local_path) if local_path else None,
+                'filesize': file_size,
+                'title': title,
+                'audio_processing': audio_processing,
+            }
                     
         except yt_dlp.utils.DownloadError as e:
+            if is_bot_detection_error(str(e)):
+                circuit_breaker.record_failure(self.get_platform(url))
             raise Exception(f"Download failed: {str(e)}")
         except Exception as e:
             raise Exception(f"Download error: {str(e)}")
-
+    
+    @staticmethod
+    def _published_name(file_path: Path, job_id: str) -> str:
+        """
+        "<title> [<job key>].<ext>" - the job key stands for the video plus
+        format/clip options, so two videos with the same title never share
+        a name while repeating the same download gives the same one.
+        """
+        suffix = f" [{job_id[:12]}]{file_path.suffix}"
+        return sanitize_filename(file_path.stem[:200 - len(suffix)] + suffix)
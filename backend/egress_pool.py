@@ -0,0 +1,223 @@
+"""
+Egress Pool Module
+
+Spreads extractor traffic over several outbound routes (proxies and local
+source addresses).
+
+Why? Every yt-dlp call used to leave from one IP, and platforms rate-limit
+per IP: under load YouTube starts answering "Sign in to confirm you're not a
+bot", which caps throughput no matter how many workers we run. With a pool:
+- each call leases the least-loaded healthy route
+- a route that hits bot detection (or HTTP 429) cools off for that platform
+  for EGRESS_COOLDOWN seconds while the others carry on
+- each route has a per-platform request budget per minute
+- routes keep a health score (moving average of successes), so flaky
+  proxies get less traffic
+
+Cool-off and budgets are preferences: if no route is available, the least
+loaded one is used anyway. Stopping traffic altogether is the circuit
+breaker's job.
+
+How routes are picked is pluggable (EgressSelector), e.g. for tests or
+sticky routing.
+"""
+
+import base64
+import http.client
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+from urllib.parse import urlparse, unquote
+from backend.config import (
+    EGRESS_PROXIES,
+    EGRESS_SOURCE_ADDRESSES,
+    EGRESS_INCLUDE_DIRECT,
+    EGRESS_PLATFORM_BUDGETS,
+    EGRESS_COOLDOWN,
+)
+from backend.circuit_breaker import is_bot_detection_error
+
+BUDGET_WINDOW = 60  # Seconds
+HEALTH_ALPHA = 0.2  # Weight of the latest outcome in the health score
+MIN_HEALTH = 0.05
+
+# Errors that say something about the route rather than the video
+_ROUTE_ERRORS = ('timed out', 'connection', 'proxy', 'tunnel', 'unreachable', 'http error 429')
+
+
+def is_route_error(error_msg: str) -> bool:
+    msg = error_msg.lower()
+    return is_bot_detection_error(error_msg) or any(e in msg for e in _ROUTE_ERRORS)
+
+
+class EgressRoute:
+    """
+    One way out: direct, from a local source address, or through a proxy.
+    """
+
+    def __init__(self, proxy: Optional[str] = None, source_address: Optional[str] = None):
+        self.proxy = proxy
+        self.source_address = source_address
+        if proxy:
+            parsed = urlparse(proxy)
+            # Never put credentials in names (they show up in stats/tokens)
+            self.name = f"proxy:{parsed.hostname}:{parsed.port}"
+        elif source_address:
+            self.name = f"source:{source_address}"
+        else:
+            self.name = 'direct'
+        self.health = 1.0
+        self.in_flight = 0
+        self._cooling_until: Dict[str, float] = {}
+        self._recent: Dict[str, deque] = {}
+
+    @property
+    def ydl_options(self) -> Dict:
+        """yt-dlp options that send a call through this route."""
+        if self.proxy:
+            return {'proxy': self.proxy}
+        if self.source_address:
+            return {'source_address': self.source_address}
+        return {}
+
+    @property
+    def streamable(self) -> bool:
+        """
+        Can stream_proxy use this route?
+
+        http.client only speaks plain HTTP to a proxy (then CONNECTs through
+        it), so SOCKS and https:// proxies are extraction-only.
+        """
+        return not self.proxy or urlparse(self.proxy).scheme == 'http'
+
+    def is_cooling(self, platform: str, now: float) -> bool:
+        return self._cooling_until.get(platform, 0) > now
+
+    def used_budget(self, platform: str, now: float) -> int:
+        recent = self._recent.get(platform)
+        if not recent:
+            return 0
+        while recent and now - recent[0] > BUDGET_WINDOW:
+            recent.popleft()
+        return len(recent)
+
+    def http_connection(self, scheme: str, host: str, port: int, timeout: int) -> http.client.HTTPConnection:
+        """An http.client connection to host that leaves through this route."""
+        connection_class = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+        if self.proxy:
+            parsed = urlparse(self.proxy)
+            conn = connection_class(parsed.hostname, parsed.port or 8080, timeout=timeout)
+            headers = {}
+            if parsed.username:
+                credentials = f"{unquote(parsed.username)}:{unquote(parsed.password or '')}"
+                headers['Proxy-Authorization'] = 'Basic ' + base64.b64encode(credentials.encode()).decode()
+            conn.set_tunnel(host, port, headers=headers)
+            return conn
+        source = (self.source_address, 0) if self.source_address else None
+        return connection_class(host, port, timeout=timeout, source_address=source)
+
+    def stats(self) -> Dict:
+        now = time.time()
+        return {
+            'health': round(self.health, 3),
+            'in_flight': self.in_flight,
+            'cooling': sorted(p for p in self._cooling_until if self.is_cooling(p, now)),
+        }
+
+
+class EgressSelector(ABC):
+    """Picks a route out of the candidates. Subclass to change the policy."""
+
+    @abstractmethod
+    def select(self, routes: List[EgressRoute], platform: str) -> EgressRoute:
+        pass
+
+
+class LeastLoadedSelector(EgressSelector):
+    """Fewest calls in flight relative to health; ties go to the least used budget."""
+
+    def select(self, routes: List[EgressRoute], platform: str) -> EgressRoute:
+        now = time.time()
+        return min(routes, key=lambda r: (
+            (r.in_flight + 1) / max(r.health, MIN_HEALTH),
+            r.used_budget(platform, now),
+        ))
+
+
+class EgressPool:
+    """
+    Leases outbound routes to yt-dlp calls.
+    """
+
+    def __init__(self, routes: List[EgressRoute], selector: Optional[EgressSelector] = None,
+                 budgets: Optional[Dict[str, int]] = None, cooldown: int = EGRESS_COOLDOWN):
+        self.routes = routes or [EgressRoute()]
+        self.selector = selector or LeastLoadedSelector()
+        self.budgets = EGRESS_PLATFORM_BUDGETS if budgets is None else budgets
+        self.cooldown = cooldown
+        self._by_name = {route.name: route for route in self.routes}
+        self._lock = threading.Lock()
+
+    def get(self, name: Optional[str]) -> Optional[EgressRoute]:
+        return self._by_name.get(name) if name else None
+
+    def acquire(self, platform: str) -> EgressRoute:
+        now = time.time()
+        budget = self.budgets.get(platform, 0)
+        with self._lock:
+            available = [
+                r for r in self.routes
+                if not r.is_cooling(platform, now) and (not budget or r.used_budget(platform, now) < budget)
+            ]
+            route = self.selector.select(available or self.routes, platform)
+            route.in_flight += 1
+            route.used_budget(platform, now)  # Drops entries older than the window
+            route._recent.setdefault(platform, deque()).append(now)
+        return route
+
+    def release(self, route: EgressRoute, platform: str, error: Optional[str] = None):
+        """Record the outcome of a call (error=None means success)."""
+        with self._lock:
+            route.in_flight -= 1
+            if error is None:
+                route.health += HEALTH_ALPHA * (1.0 - route.health)
+            elif is_route_error(error):
+                route.health -= HEALTH_ALPHA * route.health
+                if is_bot_detection_error(error) or 'http error 429' in error.lower():
+                    route._cooling_until[platform] = time.time() + self.cooldown
+
+    @contextmanager
+    def lease(self, platform: str) -> Iterator[EgressRoute]:
+        """
+        Use a route for one yt-dlp call:
+
+            with egress_pool.lease('youtube') as route:
+                ydl_opts.update(route.ydl_options)
+                ...
+        """
+        route = self.acquire(platform)
+        try:
+            yield route
+        except Exception as e:
+            self.release(route, platform, str(e))
+            raise
+        self.release(route, platform)
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {route.name: route.stats() for route in self.routes}
+
+
+def _configured_routes() -> List[EgressRoute]:
+    routes = [EgressRoute(proxy=proxy) for proxy in EGRESS_PROXIES]
+    routes += [EgressRoute(source_address=address) for address in EGRESS_SOURCE_ADDRESSES]
+    if EGRESS_INCLUDE_DIRECT or not routes:
+        routes.append(EgressRoute())
+    return routes
+
+
+# Global egress pool instance
+egress_pool = EgressPool(_configured_routes())
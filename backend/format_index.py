@@ -0,0 +1,208 @@
+"""
+Format Index Module
+
+Ranks the formats yt-dlp reports for a video so we can pick a good one
+per resolution instead of whatever happens to come first.
+
+Why? The first format for a resolution is often a heavy VP9/AV1 stream or a
+video-only DASH stream with no known size. Picking it forces an expensive
+merge (or a full re-encode to mp4) when a cheaper equivalent was available.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+
+# Codecs that fit in an mp4 container without re-encoding (lower = better)
+VIDEO_CODEC_RANK = {
+    'avc1': 0,
+    'h264': 0,
+    'hev1': 1,
+    'hvc1': 1,
+    'h265': 1,
+    'vp09': 2,
+    'vp9': 2,
+    'av01': 3,
+}
+AUDIO_CODEC_RANK = {
+    'mp4a': 0,
+    'aac': 0,
+    'opus': 1,
+    'vorbis': 2,
+}
+# Containers we can hand out as-is (lower = better)
+CONTAINER_RANK = {
+    'mp4': 0,
+    'm4a': 0,
+    'webm': 1,
+}
+# Codecs that FFmpegVideoConvertor can remux into mp4 without re-encoding
+MP4_SAFE_VIDEO_CODECS = {'avc1', 'h264', 'hev1', 'hvc1', 'h265'}
+UNKNOWN_RANK = 5
+
+
+def _codec_family(codec: Optional[str]) -> str:
+    """Return the codec family ('avc1.64001F' -> 'avc1')."""
+    if not codec or codec == 'none':
+        return 'none'
+    return codec.split('.')[0].lower()
+
+
+def _has_video(fmt: Dict) -> bool:
+    vcodec = fmt.get('vcodec')
+    if vcodec == 'none':
+        return False
+    return vcodec is not None or bool(fmt.get('height'))
+
+
+def _has_audio(fmt: Dict) -> bool:
+    return fmt.get('acodec') not in (None, 'none')
+
+
+def _known_size(fmt: Dict) -> int:
+    """Return the reported (or approximate) file size, 0 if unknown."""
+    return fmt.get('filesize') or fmt.get('filesize_approx') or 0
+
+
+def _resolution_label(fmt: Dict) -> str:
+    """Return a stable resolution label for grouping."""
+    resolution = fmt.get('resolution')
+    if resolution and resolution != 'audio only':
+        return resolution
+    if fmt.get('width') and fmt.get('height'):
+        return f"{fmt['width']}x{fmt['height']}"
+    if fmt.get('height'):
+        return f"{fmt['height']}p"
+    return 'unknown'
+
+
+class FormatIndex:
+    """
+    Index of a video's formats, grouped by resolution.
+
+    For every resolution it keeps two picks:
+    - best: most compatible codec/container with a known size, then highest bitrate
+    - fastest: cheapest to deliver (no merge, no re-encode, known small size)
+
+    Both picks are exposed as ready-to-use yt-dlp format selectors, so the
+    frontend can send them back and download_video can use them directly.
+    """
+
+    def __init__(self, formats: List[Dict]):
+        self.formats = [f for f in (formats or []) if f.get('format_id')]
+        self.audio_formats = [f for f in self.formats if _has_audio(f) and not _has_video(f)]
+        self.by_resolution: Dict[str, List[Dict]] = {}
+        for fmt in self.formats:
+            if _has_video(fmt):
+                self.by_resolution.setdefault(_resolution_label(fmt), []).append(fmt)
+
+    # ------------------------------------------------------------------
+    # Scoring
+    # ------------------------------------------------------------------
+
+    def _reencode_needed(self, fmt: Dict) -> bool:
+        """Would producing an mp4 from this format require a re-encode?"""
+        return _codec_family(fmt.get('vcodec')) not in MP4_SAFE_VIDEO_CODECS
+
+    def _quality_key(self, fmt: Dict) -> Tuple:
+        """Sort key for 'best quality' (smaller sorts first)."""
+        # tbr differs between nearly all formats, so it only decides among
+        # equally compatible ones - otherwise AV1 would win every resolution
+        return (
+            -(fmt.get('height') or 0),
+            VIDEO_CODEC_RANK.get(_codec_family(fmt.get('vcodec')), UNKNOWN_RANK),
+            CONTAINER_RANK.get(fmt.get('ext'), UNKNOWN_RANK),
+            0 if _known_size(fmt) else 1,
+            -(fmt.get('tbr') or fmt.get('vbr') or 0),
+        )
+
+    def _delivery_key(self, fmt: Dict) -> Tuple:
+        """Sort key for 'fastest to deliver' (smaller sorts first)."""
+        size = _known_size(fmt)
+        return (
+            0 if _has_audio(fmt) else 1,          # progressive: no merge
+            1 if self._reencode_needed(fmt) else 0,
+            CONTAINER_RANK.get(fmt.get('ext'), UNKNOWN_RANK),
+            0 if size else 1,                    # known size: no surprises
+            size or float('inf'),
+            -(fmt.get('tbr') or 0),
+        )
+
+    def _audio_key(self, fmt: Dict, prefer_ext: Optional[str] = None) -> Tuple:
+        """Sort key for audio-only formats (smaller sorts first)."""
+        return (
+            0 if prefer_ext and fmt.get('ext') == prefer_ext else 1,
+            -(fmt.get('abr') or fmt.get('tbr') or 0),
+            AUDIO_CODEC_RANK.get(_codec_family(fmt.get('acodec')), UNKNOWN_RANK),
+        )
+
+    # ------------------------------------------------------------------
+    # Picks
+    # ------------------------------------------------------------------
+
+    def best_audio(self, prefer_ext: Optional[str] = None) -> Optional[Dict]:
+        """Return the best audio-only format, optionally preferring a container."""
+        if not self.audio_formats:
+            return None
+        return min(self.audio_formats, key=lambda f: self._audio_key(f, prefer_ext))
+
+    def best(self, resolution: str) -> Optional[Dict]:
+        candidates = self.by_resolution.get(resolution)
+        return min(candidates, key=self._quality_key) if candidates else None
+
+    def fastest(self, resolution: str) -> Optional[Dict]:
+        candidates = self.by_resolution.get(resolution)
+        return min(candidates, key=self._delivery_key) if candidates else None
+
+    def selector_for(self, fmt: Dict) -> str:
+        """
+        Build a yt-dlp format selector for a video format.
+
+        Video-only formats are paired with a matching audio stream (m4a for
+        mp4 video so the merge stays a remux).
+        """
+        format_id = fmt['format_id']
+        if _has_audio(fmt):
+            return format_id
+        audio = self.best_audio(prefer_ext='m4a' if fmt.get('ext') == 'mp4' else fmt.get('ext'))
+        if audio:
+            return f"{format_id}+{audio['format_id']}"
+        return f"{format_id}+bestaudio"
+
+    def estimated_size(self, fmt: Dict) -> int:
+        """Estimated delivered size (video + paired audio), 0 if unknown."""
+        size = _known_size(fmt)
+        if size and not _has_audio(fmt):
+            audio = self.best_audio(prefer_ext='m4a' if fmt.get('ext') == 'mp4' else fmt.get('ext'))
+            if audio:
+                size += _known_size(audio)
+        return size
+
+    def _describe(self, fmt: Dict) -> Dict:
+        return {
+            'format_id': self.selector_for(fmt),
+            'ext': fmt.get('ext', 'mp4'),
+            'vcodec': _codec_family(fmt.get('vcodec')),
+            'filesize': self.estimated_size(fmt),
+            'needs_merge': not _has_audio(fmt),
+            'needs_reencode': self._reencode_needed(fmt),
+        }
+
+    def to_list(self) -> List[Dict]:
+        """
+        Return one entry per resolution, highest first.
+
+        'format_id' is the best-quality selector; 'fast_format_id' is the
+        fastest-to-deliver selector for the same resolution.
+        """
+        entries = []
+        for resolution in self.by_resolution:
+            best = self.best(resolution)
+            fast = self.fastest(resolution)
+            entry = {'resolution': resolution, **self._describe(best)}
+            fast_info = self._describe(fast)
+            entry['fast_format_id'] = fast_info['format_id']
+            entry['fast_filesize'] = fast_info['filesize']
+            entries.append((self._quality_key(best), entry))
+
+        entries.sort(key=lambda pair: pair[0])
+        return [entry for _, entry in entries]
@@ -0,0 +1,93 @@
+"""
+Info Cache Module
+
+Keeps recently extracted yt-dlp info dicts in memory for a short time.
+
+Why? Extraction is the slowest part of every request (a full round trip to
+the platform). Validation already extracts the info, so later steps for the
+same URL (scheduling, format lists) can reuse it instead of extracting again.
+
+Each entry can also memoize values derived from its info (e.g. the
+serialized /api/info response), so hot URLs aren't re-serialized on every
+request. Memoized values are dropped whenever the entry is replaced.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+from backend.config import INFO_CACHE_MAX_ENTRIES, INFO_CACHE_TTL, PROBE_CACHE_TTL
+from backend.url_classifier import classify_url
+
+
+class InfoCache:
+    """
+    Small LRU cache with a TTL.
+    
+    Keyed by the classifier's cache key, so youtu.be/ID and
+    youtube.com/watch?v=ID&si=... share one entry.
+    """
+
+    def __init__(self, max_entries: int = INFO_CACHE_MAX_ENTRIES, ttl: int = INFO_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, url: str) -> Optional[Dict]:
+        """Return the cached info for a URL, or None if missing/expired."""
+        key = classify_url(url).cache_key
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, info, _ = entry
+            if time.time() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return info
+
+    def expires_in(self, url: str) -> Optional[float]:
+        """Seconds until a URL's entry expires, or None if it isn't cached."""
+        key = classify_url(url).cache_key
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return None
+        return max(0.0, entry[0] + self.ttl - time.time())
+
+    def memoize(self, url: str, name: str, build: Callable[[Dict], Any]) -> Optional[Any]:
+        """
+        Return build(info) for a URL's entry, computed once per entry.
+        
+        Returns None if the URL isn't cached.
+        """
+        info = self.get(url)
+        if info is None:
+            return None
+        key = classify_url(url).cache_key
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or entry[1] is not info:
+            # Replaced or evicted meanwhile - don't memoize onto the wrong entry
+            return build(info)
+        memo = entry[2]
+        if name not in memo:
+            memo[name] = build(info)  # Racing builders compute the same value
+        return memo[name]
+    
+    def set(self, url: str, info: Dict):
+        """Store info for a URL, evicting the least recently used entry if full."""
+        key = classify_url(url).cache_key
+        with self._lock:
+            self._entries[key] = (time.time(), info, {})
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+# Global info cache instances
+info_cache = InfoCache()
+# Lightweight probe results (title/thumbnail only) - tiny, so kept longer
+probe_cache = InfoCache(max_entries=INFO_CACHE_MAX_ENTRIES * 4, ttl=PROBE_CACHE_TTL)
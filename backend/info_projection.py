@@ -0,0 +1,91 @@
+"""
+Info Projection Module
+
+Cuts yt-dlp info dicts down to the fields we actually use.
+
+Why? A full extraction is often several megabytes: hundreds of formats, each
+with its media URL, HTTP headers, DASH fragment lists and downloader options,
+plus automatic captions in ~150 languages x 6 formats. We used to keep
+that whole dict in the info cache of every long-lived gunicorn worker, where
+it fragments the heap and RSS only grows. What we read from it later is
+small:
+- format fields for FormatIndex and size estimates
+- metadata fields (title, description, chapters, ...)
+- subtitle tracks in a format we can serve (srt, or vtt to convert)
+
+slim_info() keeps just that, dropping empty values. Playlist entries are
+consumed lazily (iter_entries), at most PLAYLIST_MAX_ENTRIES of them, so a
+long playlist is never held as a list of full entries.
+"""
+
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional
+from backend.config import PLAYLIST_MAX_ENTRIES
+
+# Read by FormatIndex and the size/cost estimates
+FORMAT_FIELDS = (
+    'format_id', 'ext', 'vcodec', 'acodec', 'width', 'height', 'resolution',
+    'tbr', 'vbr', 'abr', 'filesize', 'filesize_approx',
+)
+
+# Read by get_video_info, the metadata endpoint and the scheduler
+INFO_FIELDS = (
+    'id', 'title', 'duration', 'thumbnail', 'uploader', 'view_count', 'like_count',
+    'description', 'upload_date', 'tags', 'categories', 'webpage_url',
+    'filesize', 'filesize_approx', '_type',
+)
+
+CHAPTER_FIELDS = ('title', 'start_time', 'end_time')
+ENTRY_FIELDS = ('id', 'title', 'url', 'duration')
+
+# Subtitle formats subtitles.py can serve (vtt is converted to srt)
+SUBTITLE_EXTS = ('srt', 'vtt')
+
+
+def _pick(source: Dict, fields) -> Dict[str, Any]:
+    """Copy the given fields, skipping missing and None values."""
+    return {field: source[field] for field in fields if source.get(field) is not None}
+
+
+def _slim_tracks(tracks: Optional[Dict]) -> Dict[str, List[Dict]]:
+    slim = {}
+    for lang, formats in (tracks or {}).items():
+        kept = [
+            _pick(track, ('url', 'ext', 'http_headers'))
+            for track in formats or []
+            if track.get('url') and track.get('ext') in SUBTITLE_EXTS
+        ]
+        if kept:
+            slim[lang] = kept
+    return slim
+
+
+def iter_entries(info: Dict, limit: int = PLAYLIST_MAX_ENTRIES) -> Iterator[Dict]:
+    """
+    Yield slim playlist entries, at most `limit` of them.
+
+    yt-dlp's entries may be a generator or a lazy list; only the entries
+    actually yielded are ever pulled from it.
+    """
+    for entry in islice(info.get('entries') or (), limit):
+        if entry:
+            yield _pick(entry, ENTRY_FIELDS)
+
+
+def slim_info(info: Dict) -> Dict:
+    """
+    The projection of a raw yt-dlp info dict that caches keep.
+
+    Safe to call on an already slim dict (returns an equivalent copy).
+    """
+    slim = _pick(info, INFO_FIELDS)
+    slim['formats'] = [_pick(fmt, FORMAT_FIELDS) for fmt in info.get('formats') or [] if fmt.get('format_id')]
+    if info.get('chapters'):
+        slim['chapters'] = [_pick(chapter, CHAPTER_FIELDS) for chapter in info['chapters']]
+    for key in ('subtitles', 'automatic_captions'):
+        tracks = _slim_tracks(info.get(key))
+        if tracks:
+            slim[key] = tracks
+    if info.get('entries') is not None:
+        slim['entries'] = list(iter_entries(info))
+    return slim
@@ -0,0 +1,337 @@
+"""
+Job Store Module
+
+Keeps download jobs in a small SQLite database so they survive worker restarts.
+
+Why? Gunicorn kills sync workers after `timeout` seconds and recycles them on
+every deploy. Without a record of what was in flight, the partial file is lost
+and the user starts from scratch. With the job (parameters, .part path,
+progress) on disk, a new worker can pick it up and yt-dlp's `continuedl`
+resumes from the .part file.
+
+SQLite is enough here: one file, no server, safe across gunicorn workers.
+
+A running job is kept alive by a heartbeat thread (keep_alive) for its whole
+run, not just while yt-dlp reports progress: merging, mp3 encoding and
+uploads can take minutes without a progress callback.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from backend.config import JOB_DB_PATH, JOB_STALE_SECONDS, JOB_HEARTBEAT_INTERVAL, ORPHAN_PART_MAX_AGE
+from backend.url_classifier import classify_url
+
+# Job states
+STATUS_DOWNLOADING = 'downloading'
+STATUS_INTERRUPTED = 'interrupted'
+STATUS_FINISHED = 'finished'
+STATUS_FAILED = 'failed'
+
+# yt-dlp leaves these next to the output while a download is in progress
+PARTIAL_SUFFIXES = ('.part', '.ytdl')
+
+# Don't hit the database on every progress callback
+PROGRESS_WRITE_INTERVAL = 2.0  # Seconds
+
+
+def _owner_id() -> str:
+    """Identify this worker process ('host:pid')."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _is_local(owner: Optional[str]) -> bool:
+    """Does the owner run on this host (so its pid can be checked)?"""
+    return bool(owner) and ':' in owner and owner.rsplit(':', 1)[0] == socket.gethostname()
+
+
+def _pid_alive(owner: str) -> bool:
+    """Check if a same-host owner's process is still running."""
+    try:
+        os.kill(int(owner.rsplit(':', 1)[1]), 0)
+        return True
+    except (OSError, ValueError):
+        return False
+
+
+class JobStore:
+    """
+    Persistent store for download jobs.
+
+    Jobs are keyed by their parameters, so retrying the same download finds
+    the existing job (and its .part file) instead of starting over.
+    """
+
+    def __init__(self, db_path: Path = JOB_DB_PATH):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._last_write: Dict[str, float] = {}
+        self._init_db()
+
+    @contextmanager
+    def _connect(self):
+        # One short-lived connection per call keeps this thread-safe
+        conn = sqlite3.connect(str(self.db_path), timeout=10, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    format_id TEXT,
+                    audio_only INTEGER NOT NULL DEFAULT 0,
+                    options TEXT,
+                    status TEXT NOT NULL,
+                    owner TEXT,
+                    part_path TEXT,
+                    progress INTEGER NOT NULL DEFAULT 0,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status)')
+            # Databases created before the options column existed
+            columns = {row['name'] for row in conn.execute('PRAGMA table_info(jobs)')}
+            if 'options' not in columns:
+                conn.execute('ALTER TABLE jobs ADD COLUMN options TEXT')
+
+    @staticmethod
+    def job_key(url: str, format_id: Optional[str], audio_only: bool, options: Optional[Dict] = None) -> str:
+        """Stable job ID for a set of download parameters (URL variants of one video share it)."""
+        raw = json.dumps([classify_url(url).cache_key, format_id, bool(audio_only), options or {}], sort_keys=True)
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _row_to_job(row: Optional[sqlite3.Row]) -> Optional[Dict]:
+        if row is None:
+            return None
+        job = dict(row)
+        job['audio_only'] = bool(job['audio_only'])
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        job['options'] = json.loads(job['options']) if job['options'] else {}
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._connect() as conn:
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return self._row_to_job(row)
+
+    def _is_stale(self, job: Dict) -> bool:
+        """
+        A 'downloading' job whose worker died.
+
+        On this host the owner's pid tells for sure (a live owner may be
+        quiet for a long time, e.g. while encoding). Owners on other hosts
+        are judged by their heartbeat.
+        """
+        if job['status'] != STATUS_DOWNLOADING:
+            return False
+        if _is_local(job['owner']):
+            return not _pid_alive(job['owner'])
+        return time.time() - job['updated_at'] > JOB_STALE_SECONDS
+
+    def start(self, url: str, format_id: Optional[str], audio_only: bool, options: Optional[Dict] = None) -> Tuple[Dict, bool]:
+        """
+        Create or claim the job for these parameters.
+
+        Args:
+            options: Extra download options (e.g. audio_format), stored so a
+                resumed job runs with the same settings
+
+        Returns:
+            Tuple of (job, owned). owned is False when another live worker is
+            already downloading the same thing.
+        """
+        job_id = self.job_key(url, format_id, audio_only, options)
+        now = time.time()
+        owner = _owner_id()
+
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            job = self._row_to_job(row)
+
+            if job and job['status'] == STATUS_DOWNLOADING and not self._is_stale(job):
+                conn.execute('COMMIT')
+                return job, False
+
+            if job:
+                # Keep part_path so the .part file is adopted and resumed
+                conn.execute(
+                    'UPDATE jobs SET status = ?, owner = ?, result = NULL, error = NULL, updated_at = ? WHERE id = ?',
+                    (STATUS_DOWNLOADING, owner, now, job_id)
+                )
+            else:
+                conn.execute(
+                    'INSERT INTO jobs (id, url, format_id, audio_only, options, status, owner, created_at, updated_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (job_id, url, format_id, int(bool(audio_only)), json.dumps(options or {}),
+                     STATUS_DOWNLOADING, owner, now, now)
+                )
+            conn.execute('COMMIT')
+
+        return self.get(job_id), True
+
+    def claim(self, job_id: str) -> bool:
+        """Atomically claim an interrupted job for this worker."""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                'UPDATE jobs SET status = ?, owner = ?, updated_at = ? WHERE id = ? AND status = ?',
+                (STATUS_DOWNLOADING, _owner_id(), time.time(), job_id, STATUS_INTERRUPTED)
+            )
+        return cursor.rowcount == 1
+
+    def heartbeat(self, job_id: str):
+        """Mark a job this worker owns as still running."""
+        with self._connect() as conn:
+            conn.execute(
+                'UPDATE jobs SET updated_at = ? WHERE id = ? AND status = ? AND owner = ?',
+                (time.time(), job_id, STATUS_DOWNLOADING, _owner_id())
+            )
+
+    @contextmanager
+    def keep_alive(self, job_id: str, interval: float = JOB_HEARTBEAT_INTERVAL) -> Iterator[None]:
+        """
+        Send heartbeats for a job from a background thread while the block runs:
+
+            with job_store.keep_alive(job['id']):
+                result = run_the_download()
+        """
+        stopped = threading.Event()
+
+        def beat():
+            while not stopped.wait(interval):
+                try:
+                    self.heartbeat(job_id)
+                except sqlite3.Error:
+                    pass  # Next beat will retry
+
+        thread = threading.Thread(target=beat, name=f"heartbeat-{job_id[:8]}", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stopped.set()
+            thread.join()
+
+    def update_progress(self, job_id: str, progress: int, part_path: Optional[str] = None):
+        """Record progress and the current .part path (throttled)."""
+        now = time.time()
+        if now - self._last_write.get(job_id, 0) < PROGRESS_WRITE_INTERVAL:
+            return
+        self._last_write[job_id] = now
+        with self._connect() as conn:
+            conn.execute(
+                'UPDATE jobs SET progress = ?, part_path = COALESCE(?, part_path), updated_at = ? WHERE id = ?',
+                (progress, part_path, now, job_id)
+            )
+
+    def finish(self, job_id: str, result: Dict):
+        self._last_write.pop(job_id, None)
+        with self._connect() as conn:
+            conn.execute(
+                'UPDATE jobs SET status = ?, progress = 100, part_path = NULL, result = ?, updated_at = ? WHERE id = ?',
+                (STATUS_FINISHED, json.dumps(result), time.time(), job_id)
+            )
+
+    def fail(self, job_id: str, error: str):
+        self._last_write.pop(job_id, None)
+        with self._connect() as conn:
+            conn.execute(
+                'UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?',
+                (STATUS_FAILED, error[:500], time.time(), job_id)
+            )
+
+    def interrupted_jobs(self) -> List[Dict]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                'SELECT * FROM jobs WHERE status = ? ORDER BY updated_at', (STATUS_INTERRUPTED,)
+            ).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    def recover(self, downloads_dir: Path, work_dir: Optional[Path] = None) -> Dict:
+        """
+        Run at worker startup.
+
+        - Marks jobs whose worker died as interrupted (so they can resume)
+        - Adopts .part files and job workspaces that belong to a resumable job
+        - Deletes orphaned .part files and workspaces nobody will resume
+
+        Returns:
+            Counts of interrupted jobs, adopted and removed partial files/workspaces
+        """
+        stats = {'interrupted': 0, 'adopted': 0, 'removed': 0}
+
+        with self._connect() as conn:
+            rows = conn.execute('SELECT * FROM jobs WHERE status = ?', (STATUS_DOWNLOADING,)).fetchall()
+            for job in map(self._row_to_job, rows):
+                if self._is_stale(job):
+                    conn.execute(
+                        'UPDATE jobs SET status = ?, updated_at = ? WHERE id = ? AND status = ?',
+                        (STATUS_INTERRUPTED, time.time(), job['id'], STATUS_DOWNLOADING)
+                    )
+                    stats['interrupted'] += 1
+
+            rows = conn.execute(
+                'SELECT id, part_path FROM jobs WHERE status IN (?, ?)',
+                (STATUS_DOWNLOADING, STATUS_INTERRUPTED)
+            ).fetchall()
+        active_parts = {row['part_path'] for row in rows if row['part_path']}
+        active_jobs = {row['id'] for row in rows}
+
+        now = time.time()
+        for path in Path(downloads_dir).iterdir():
+            if not path.is_file() or not path.name.endswith(PARTIAL_SUFFIXES):
+                continue
+            # The .ytdl file sits next to "<name>.part" - keep them together
+            part_path = str(path.with_suffix('.part')) if path.suffix == '.ytdl' else str(path)
+            if part_path in active_parts:
+                stats['adopted'] += 1
+                continue
+            try:
+                # Young files may belong to a download that hasn't reported yet
+                if now - path.stat().st_mtime > ORPHAN_PART_MAX_AGE:
+                    path.unlink()
+                    stats['removed'] += 1
+            except OSError:
+                pass
+
+        # Job workspaces (WORK_DIR/<job_id>) - whatever is in one of an
+        # active job is what it resumes from
+        if work_dir is not None and Path(work_dir).is_dir():
+            for workspace in Path(work_dir).iterdir():
+                if not workspace.is_dir():
+                    continue
+                if workspace.name in active_jobs:
+                    stats['adopted'] += 1
+                    continue
+                try:
+                    mtimes = [p.stat().st_mtime for p in workspace.iterdir()] + [workspace.stat().st_mtime]
+                    if now - max(mtimes) > ORPHAN_PART_MAX_AGE:
+                        shutil.rmtree(workspace, ignore_errors=True)
+                        stats['removed'] += 1
+                except OSError:
+                    pass
+
+        return stats
+
+
+# Global job store instance
+job_store = JobStore()
@@ -0,0 +1,253 @@
+"""
+Prefetcher Module
+
+Keeps the info for the most requested URLs warm in the info cache.
+
+Why? Our traffic is very skewed: in any given hour a handful of URLs make up
+most requests. Every time one of their info cache entries expires, the next
+user pays for a full extraction. Instead we track popularity with a
+space-saving sketch (a fixed number of counters, however many distinct URLs
+we see) and re-extract the top-K URLs shortly before their entries expire.
+
+Background work must never make things worse, so:
+- extractions (and optional pre-downloads) come out of an hourly budget
+  shared by all worker processes (stored in SQLite, like the job store)
+- platforms whose circuit breaker isn't closed are skipped entirely
+- pre-downloads go through the download scheduler like any other client
+"""
+
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from backend.config import (
+    PREFETCH_TOP_K,
+    PREFETCH_MIN_HITS,
+    PREFETCH_SKETCH_SIZE,
+    PREFETCH_DECAY_INTERVAL,
+    PREFETCH_INTERVAL,
+    PREFETCH_REFRESH_MARGIN,
+    PREFETCH_EXTRACT_BUDGET,
+    PREFETCH_DOWNLOAD,
+    PREFETCH_DOWNLOAD_BUDGET,
+    PREFETCH_DB_PATH,
+)
+from backend.circuit_breaker import circuit_breaker, CLOSED
+from backend.info_cache import info_cache
+from backend.scheduler import download_scheduler
+from backend.url_classifier import classify_url
+
+# Scheduler client name for pre-downloads (shares slots fairly with users)
+PREFETCH_CLIENT = 'prefetch'
+BUDGET_WINDOW = 3600  # Seconds
+
+
+class SpaceSaving:
+    """
+    Space-saving heavy-hitters sketch.
+
+    Tracks at most `capacity` keys. When a new key arrives and the sketch is
+    full, it replaces the key with the smallest count and inherits that
+    count (+1). Any key with more than total/capacity hits is guaranteed to
+    be tracked, and counts are overestimated by at most the inherited error.
+    """
+
+    def __init__(self, capacity: int = PREFETCH_SKETCH_SIZE):
+        self.capacity = capacity
+        self._counts: Dict[str, int] = {}
+        self._errors: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, key: str) -> Optional[str]:
+        """Count one hit for key. Returns the key it evicted, if any."""
+        with self._lock:
+            if key in self._counts:
+                self._counts[key] += 1
+                return None
+            if len(self._counts) < self.capacity:
+                self._counts[key] = 1
+                self._errors[key] = 0
+                return None
+            # O(capacity), but the sketch is small and only full under churn
+            victim = min(self._counts, key=self._counts.get)
+            floor = self._counts.pop(victim)
+            del self._errors[victim]
+            self._counts[key] = floor + 1
+            self._errors[key] = floor
+            return victim
+
+    def top(self, k: int) -> List[Tuple[str, int]]:
+        """The k keys with the highest guaranteed count (count - error)."""
+        with self._lock:
+            ranked = sorted(
+                ((key, count - self._errors[key]) for key, count in self._counts.items()),
+                key=lambda item: item[1],
+                reverse=True
+            )
+        return ranked[:k]
+
+    def decay(self) -> List[str]:
+        """Halve all counts so popularity reflects recent traffic. Returns dropped keys."""
+        with self._lock:
+            dropped = []
+            for key in list(self._counts):
+                self._counts[key] //= 2
+                self._errors[key] //= 2
+                if self._counts[key] == 0:
+                    del self._counts[key]
+                    del self._errors[key]
+                    dropped.append(key)
+            return dropped
+
+
+class SharedBudget:
+    """
+    Hourly budgets shared by all worker processes (one SQLite row each).
+    """
+
+    def __init__(self, db_path: Path = PREFETCH_DB_PATH):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS budgets (
+                    name TEXT PRIMARY KEY,
+                    window_start REAL NOT NULL,
+                    used INTEGER NOT NULL
+                )
+            """)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(str(self.db_path), timeout=10, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def take(self, name: str, limit: int) -> bool:
+        """Use one unit of a budget. False once `limit` units were used this hour."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute('SELECT window_start, used FROM budgets WHERE name = ?', (name,)).fetchone()
+            if row is None or now - row[0] >= BUDGET_WINDOW:
+                window_start, used = now, 0
+            else:
+                window_start, used = row
+            if used >= limit:
+                conn.execute('COMMIT')
+                return False
+            conn.execute(
+                'INSERT OR REPLACE INTO budgets (name, window_start, used) VALUES (?, ?, ?)',
+                (name, window_start, used + 1)
+            )
+            conn.execute('COMMIT')
+        return True
+
+
+class Prefetcher:
+    """
+    Background thread that keeps hot URLs warm.
+    """
+
+    def __init__(self, download_service, budget: Optional[SharedBudget] = None):
+        self.download_service = download_service
+        self.sketch = SpaceSaving()
+        self.budget = budget or SharedBudget()
+        self._urls: Dict[str, str] = {}  # Sketch key -> most recent URL for it
+        self._last_decay = time.time()
+        self._stats = {'refreshed': 0, 'downloaded': 0, 'skipped_breaker': 0, 'skipped_budget': 0,
+                       'skipped_existing': 0, 'errors': 0}
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def record(self, url: str):
+        """Count one request for a URL (cheap - called on every request)."""
+        key = classify_url(url).cache_key
+        self._urls[key] = url
+        evicted = self.sketch.add(key)
+        if evicted:
+            self._urls.pop(evicted, None)
+
+    def hot_urls(self) -> List[str]:
+        return [
+            self._urls[key] for key, hits in self.sketch.top(PREFETCH_TOP_K)
+            if hits >= PREFETCH_MIN_HITS and key in self._urls
+        ]
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='prefetcher', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.wait(PREFETCH_INTERVAL):
+            try:
+                self.run_once()
+            except Exception:
+                self._stats['errors'] += 1
+
+    def run_once(self):
+        """One prefetch round: refresh hot URLs whose entries are about to expire."""
+        if time.time() - self._last_decay >= PREFETCH_DECAY_INTERVAL:
+            for key in self.sketch.decay():
+                self._urls.pop(key, None)
+            self._last_decay = time.time()
+
+        for url in self.hot_urls():
+            # Leave blocked platforms alone, half-open included - a user request should be what tries again
+            if circuit_breaker.state(classify_url(url).platform) != CLOSED:
+                self._stats['skipped_breaker'] += 1
+                continue
+
+            expires_in = info_cache.expires_in(url)
+            if expires_in is not None and expires_in > PREFETCH_REFRESH_MARGIN:
+                continue
+
+            if not self.budget.take('extract', PREFETCH_EXTRACT_BUDGET):
+                self._stats['skipped_budget'] += 1
+                return
+            try:
+                self.download_service.refresh_info(url)
+                self._stats['refreshed'] += 1
+            except Exception:
+                self._stats['errors'] += 1
+                continue
+
+            if PREFETCH_DOWNLOAD:
+                self._predownload(url)
+
+    def _predownload(self, url: str):
+        """Download the default format so the first real request finds it on disk."""
+        # Already on disk (or being downloaded) - don't spend budget on a no-op
+        if self.download_service.existing_download(url):
+            self._stats['skipped_existing'] += 1
+            return
+        if not self.budget.take('download', PREFETCH_DOWNLOAD_BUDGET):
+            self._stats['skipped_budget'] += 1
+            return
+        try:
+            download_scheduler.run(
+                lambda: self.download_service.download_video(url=url),
+                client_ip=PREFETCH_CLIENT,
+                lane='video',
+                platform=classify_url(url).platform,
+                cost=self.download_service.estimate_cost(url)
+            )
+            self._stats['downloaded'] += 1
+        except Exception:
+            self._stats['errors'] += 1
+
+    def stats(self) -> Dict:
+        return {
+            'running': self._thread is not None and self._thread.is_alive(),
+            'hot_urls': len(self.hot_urls()),
+            **self._stats,
+        }
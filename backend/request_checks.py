@@ -0,0 +1,177 @@
+"""
+Request Checks Module
+
+Cheap checks that run before a request costs us any network or yt-dlp work.
+
+Why? /api/download used to run validate_url - a full extraction - before
+looking at the rate limit, so a client over its limit still cost us an
+extraction on every request. Malformed bodies, disallowed domains and
+platforms that are currently blocking us got the same treatment. Now the
+checks run cheapest first and the first one that fails answers the request:
+
+1. body       - size limit, must be a JSON object
+2. schema     - field types and values (url, format_id, audio_format, ...)
+3. url        - an http(s) URL with a host, classified once (memoized)
+4. domain     - ALLOWED_DOMAINS
+5. rate_limit - requests per client and hour
+6. breaker    - the platform's circuit breaker is open
+
+In a cluster the request is forwarded to the owning node after the domain
+check, so the rate limit and breaker that count are the owner's.
+
+Rejections are counted per stage (see /api/metrics): each one is work that
+never reached yt-dlp.
+"""
+
+import threading
+from typing import Any, Dict
+from werkzeug.exceptions import RequestEntityTooLarge
+from backend.config import MAX_REQUEST_BODY_BYTES, MAX_URL_LENGTH, MAX_FORMAT_ID_LENGTH
+from backend.circuit_breaker import circuit_breaker, OPEN
+from backend.rate_limiter import rate_limiter
+from backend.security import validate_domain
+from backend.timecodes import parse_time
+from backend.url_classifier import classify_url, parse_host, ClassifiedURL
+
+# Stages, cheapest first
+STAGE_BODY = 'body'
+STAGE_SCHEMA = 'schema'
+STAGE_URL = 'url'
+STAGE_DOMAIN = 'domain'
+STAGE_RATE_LIMIT = 'rate_limit'
+STAGE_BREAKER = 'breaker'
+STAGES = (STAGE_BODY, STAGE_SCHEMA, STAGE_URL, STAGE_DOMAIN, STAGE_RATE_LIMIT, STAGE_BREAKER)
+
+AUDIO_FORMATS = ('native', 'mp3')
+DELIVERY_MODES = ('auto', 'server')
+
+
+class RequestRejected(Exception):
+    """A check failed. Carries what the endpoint should answer."""
+
+    def __init__(self, stage: str, message: str, status: int = 400, **extra):
+        super().__init__(message)
+        self.stage = stage
+        self.message = message
+        self.status = status
+        self.extra = extra
+
+
+class RequestChecks:
+    """
+    The checks, plus per-stage rejection counters.
+
+    Each check raises RequestRejected or returns what later steps need.
+    """
+
+    def __init__(self, max_body_bytes: int = MAX_REQUEST_BODY_BYTES, max_url_length: int = MAX_URL_LENGTH):
+        self.max_body_bytes = max_body_bytes
+        self.max_url_length = max_url_length
+        self._rejected: Dict[str, int] = {stage: 0 for stage in STAGES}
+        self._passed = 0
+        self._lock = threading.Lock()
+
+    def _reject(self, stage: str, message: str, status: int = 400, **extra):
+        with self._lock:
+            self._rejected[stage] += 1
+        raise RequestRejected(stage, message, status, **extra)
+
+    def passed(self):
+        """Count a request that got through every check."""
+        with self._lock:
+            self._passed += 1
+
+    def json_body(self, request) -> Dict[str, Any]:
+        """The request's JSON object, read with a size limit."""
+        if request.content_length is not None and request.content_length > self.max_body_bytes:
+            self._reject(STAGE_BODY, 'Request body too large', 413)
+        # Chunked bodies have no Content-Length - MAX_CONTENT_LENGTH (set
+        # on the app) stops reading them at the limit
+        try:
+            data = request.get_json(silent=True)
+        except RequestEntityTooLarge:
+            self._reject(STAGE_BODY, 'Request body too large', 413)
+        if not isinstance(data, dict):
+            self._reject(STAGE_BODY, 'Request body must be a JSON object')
+        return data
+
+    def url_field(self, value: Any) -> str:
+        """A 'url' field or query parameter: present, a string, not huge."""
+        if not value:
+            self._reject(STAGE_SCHEMA, 'URL is required')
+        if not isinstance(value, str):
+            self._reject(STAGE_SCHEMA, 'URL must be a string')
+        if len(value) > self.max_url_length:
+            self._reject(STAGE_SCHEMA, f'URL is too long (max {self.max_url_length} characters)')
+        return value.strip()
+
+    def download_params(self, data: Dict[str, Any], default_audio_format: str, default_delivery: str) -> Dict:
+        """Validate and normalize an /api/download body."""
+        url = self.url_field(data.get('url'))
+        format_id = data.get('format_id')
+        audio_only = data.get('audio_only', False)
+        audio_format = data.get('audio_format', default_audio_format)
+        delivery = data.get('delivery', default_delivery)
+
+        if format_id is not None and (not isinstance(format_id, str) or len(format_id) > MAX_FORMAT_ID_LENGTH):
+            self._reject(STAGE_SCHEMA, 'format_id must be a format ID string')
+        if not isinstance(audio_only, bool):
+            self._reject(STAGE_SCHEMA, 'audio_only must be true or false')
+        if audio_format not in AUDIO_FORMATS:
+            self._reject(STAGE_SCHEMA, 'audio_format must be "native" or "mp3"')
+        if delivery not in DELIVERY_MODES:
+            self._reject(STAGE_SCHEMA, 'delivery must be "auto" or "server"')
+
+        # Optional clip range
+        try:
+            start = parse_time(data.get('start'))
+            end = parse_time(data.get('end'))
+        except ValueError as e:
+            self._reject(STAGE_SCHEMA, str(e))
+        if start is not None and end is not None and end <= start:
+            self._reject(STAGE_SCHEMA, 'Clip end must be after clip start')
+
+        return {
+            'url': url,
+            'format_id': format_id or None,
+            'audio_only': audio_only,
+            'audio_format': audio_format,
+            'delivery': delivery,
+            'start': start,
+            'end': end,
+        }
+
+    def target(self, url: str) -> ClassifiedURL:
+        """URL and domain checks. Returns the classified URL."""
+        if not url.lower().startswith(('http://', 'https://')):
+            self._reject(STAGE_URL, 'URL must start with http:// or https://')
+        if not parse_host(url):
+            self._reject(STAGE_URL, 'URL has no host')
+        classified = classify_url(url)
+        if not validate_domain(url):
+            self._reject(STAGE_DOMAIN, 'Domain not allowed', 403)
+        return classified
+
+    def rate_limit(self, client_ip: str):
+        """Counts the request against the client's hourly limit."""
+        allowed, msg = rate_limiter.is_allowed(client_ip)
+        if not allowed:
+            self._reject(STAGE_RATE_LIMIT, msg, 429, rate_limit_exceeded=True)
+
+    def breaker(self, platform: str):
+        """Reject while the platform's breaker is open (half-open lets requests through)."""
+        if circuit_breaker.state(platform) == OPEN:
+            retry_after = circuit_breaker.retry_after(platform)
+            self._reject(STAGE_BREAKER, f'{platform} is temporarily unavailable. Try again in {retry_after} seconds.',
+                         503, retry_after=retry_after)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'passed': self._passed,
+                'rejected': dict(self._rejected),
+            }
+
+
+# Global request checks instance
+request_checks = RequestChecks()
@@ -0,0 +1,87 @@
+"""
+Responses Module
+
+Fast JSON encoding and cache-friendly JSON responses.
+
+Why? Hot endpoints (/api/info, health probes) were rebuilt and re-encoded
+with jsonify on every request. Here:
+- JSON is encoded with orjson when it's installed (several times faster),
+  otherwise compactly with the standard library
+- bodies that were already serialized (memoized in the info cache) are sent
+  as-is, with an ETag derived from the bytes
+- If-None-Match is answered with a bodyless 304
+- every response gets a Cache-Control suited to its endpoint
+"""
+
+import hashlib
+import json
+from typing import Any, Dict, Optional
+from flask import Response
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson is optional
+    orjson = None
+
+JSON_MIMETYPE = 'application/json'
+
+# Cache-Control per kind of response
+CACHE_NONE = 'no-store'
+CACHE_PROBE = 'public, max-age=300'      # Title/thumbnail barely ever change
+CACHE_FORMATS = 'public, max-age=60'     # Sizes/formats can change, keep it short
+CACHE_REVALIDATE = 'no-cache'            # Cache, but check the ETag every time
+
+
+def dumps(obj: Any) -> bytes:
+    """Encode obj as compact UTF-8 JSON."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False, default=str).encode('utf-8')
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider (used by jsonify) built on dumps()."""
+
+    sort_keys = False
+
+    def dumps(self, obj: Any, **kwargs) -> str:
+        return dumps(obj).decode('utf-8')
+
+    def response(self, *args, **kwargs) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        return Response(dumps(obj), mimetype=JSON_MIMETYPE)
+
+
+def etag_for(body: bytes) -> str:
+    return '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+
+
+def json_bytes_response(body: bytes, request=None, status: int = 200, cache_control: str = CACHE_NONE,
+                        etag: Optional[str] = None, headers: Optional[Dict[str, str]] = None) -> Response:
+    """
+    Send pre-serialized JSON.
+
+    Args:
+        body: JSON bytes
+        request: Flask request - when given, an ETag is set and a matching
+            If-None-Match gets a 304
+        status: HTTP status
+        cache_control: Cache-Control header value
+        etag: Precomputed ETag (computed from body if missing)
+    """
+    response_headers = {'Cache-Control': cache_control, **(headers or {})}
+    if request is not None and status == 200:
+        etag = etag or etag_for(body)
+        response_headers['ETag'] = etag
+        if etag in request.headers.get('If-None-Match', ''):
+            return Response(status=304, headers=response_headers)
+    return Response(body, status=status, mimetype=JSON_MIMETYPE, headers=response_headers)
+
+
+def envelope(fields: Dict[str, Any], key: str, body: bytes) -> bytes:
+    """Wrap already-serialized JSON: {...fields, key: <body>} without re-encoding body."""
+    head = dumps(fields)
+    if head == b'{}':
+        return b'{' + dumps(key) + b':' + body + b'}'
+    return head[:-1] + b',' + dumps(key) + b':' + body + b'}'
@@ -0,0 +1,205 @@
+"""
+Download Scheduler Module
+
+Decides which waiting download runs next when all download slots are busy.
+
+Why? Without it, whoever arrives first takes every slot, and one user queuing
+long 1080p downloads makes everyone fetching 15-second clips wait.
+
+How it picks:
+- Weighted fair queuing per client IP: every job gets a virtual finish tag
+  (client's previous tag + cost / weight). Clients that already used a lot
+  of capacity get later tags, so a new client isn't stuck behind them.
+- Shortest job first: the cost is the estimated job size, so short clips get
+  earlier tags than long videos from the same (or an equally busy) client.
+- Lanes: audio-only and video jobs have separate slot limits, so cheap audio
+  jobs keep flowing while the video lane is full.
+- Concurrency limits: global, per lane and per platform.
+
+Limits apply per worker process. A waiting download holds its request
+thread, so the worker needs more threads than download slots (see
+gunicorn_config.py) for a real queue to form.
+"""
+
+import itertools
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, Optional
+from backend.config import (
+    SCHEDULER_MAX_CONCURRENT,
+    SCHEDULER_LANE_LIMITS,
+    SCHEDULER_PLATFORM_LIMITS,
+    SCHEDULER_CLIENT_WEIGHTS,
+    SCHEDULER_MAX_WAIT,
+)
+
+# Cost assumed when nothing is known about the media (in MB)
+DEFAULT_JOB_COST = 50.0
+# Rough bytes per second of media, used when only the duration is known
+VIDEO_BYTES_PER_SECOND = 300 * 1024   # ~2.4 Mbps (720p)
+AUDIO_BYTES_PER_SECOND = 16 * 1024    # ~128 kbps
+
+
+def estimate_job_cost(info: Optional[Dict], audio_only: bool = False) -> float:
+    """
+    Estimate how expensive a download is (in MB) from its info dict.
+
+    Uses the known file size when yt-dlp reports one, otherwise the duration.
+    """
+    if not info:
+        return DEFAULT_JOB_COST
+
+    size = info.get('filesize') or info.get('filesize_approx')
+    if not size:
+        duration = info.get('duration') or 0
+        if not duration:
+            return DEFAULT_JOB_COST
+        rate = AUDIO_BYTES_PER_SECOND if audio_only else VIDEO_BYTES_PER_SECOND
+        size = duration * rate
+
+    return max(size / (1024 * 1024), 0.1)
+
+
+class _Ticket:
+    """A download waiting for (or holding) a slot."""
+
+    __slots__ = ('client', 'lane', 'platform', 'tag', 'seq', 'granted')
+
+    def __init__(self, client: str, lane: str, platform: str, tag: float, seq: int):
+        self.client = client
+        self.lane = lane
+        self.platform = platform
+        self.tag = tag
+        self.seq = seq
+        self.granted = False
+
+
+class DownloadScheduler:
+    """
+    Weighted-fair, shortest-job-first scheduler for download jobs.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = SCHEDULER_MAX_CONCURRENT,
+        lane_limits: Dict[str, int] = SCHEDULER_LANE_LIMITS,
+        platform_limits: Dict[str, int] = SCHEDULER_PLATFORM_LIMITS,
+        client_weights: Dict[str, float] = SCHEDULER_CLIENT_WEIGHTS,
+        max_wait: int = SCHEDULER_MAX_WAIT,
+    ):
+        self.max_concurrent = max_concurrent
+        self.lane_limits = lane_limits
+        self.platform_limits = platform_limits
+        self.client_weights = client_weights
+        self.max_wait = max_wait
+
+        self._cond = threading.Condition()
+        self._waiting = []
+        self._running = 0
+        self._running_by_lane: Dict[str, int] = defaultdict(int)
+        self._running_by_platform: Dict[str, int] = defaultdict(int)
+        self._virtual_time = 0.0
+        self._last_tag: Dict[str, float] = {}
+        self._seq = itertools.count()
+
+    def _fits(self, ticket: _Ticket) -> bool:
+        """Is there a free slot for this ticket (global, lane and platform)?"""
+        if self._running >= self.max_concurrent:
+            return False
+        lane_limit = self.lane_limits.get(ticket.lane)
+        if lane_limit is not None and self._running_by_lane[ticket.lane] >= lane_limit:
+            return False
+        platform_limit = self.platform_limits.get(ticket.platform)
+        if platform_limit is not None and self._running_by_platform[ticket.platform] >= platform_limit:
+            return False
+        return True
+
+    def _dispatch(self):
+        """Grant slots to the best waiting tickets that fit. Caller holds the lock."""
+        granted_any = False
+        for ticket in sorted(self._waiting, key=lambda t: (t.tag, t.seq)):
+            if self._running >= self.max_concurrent:
+                break
+            if not self._fits(ticket):
+                continue
+            ticket.granted = True
+            self._waiting.remove(ticket)
+            self._running += 1
+            self._running_by_lane[ticket.lane] += 1
+            self._running_by_platform[ticket.platform] += 1
+            self._virtual_time = max(self._virtual_time, ticket.tag)
+            granted_any = True
+        if granted_any:
+            self._cond.notify_all()
+
+    def _release(self, ticket: _Ticket):
+        with self._cond:
+            self._running -= 1
+            self._running_by_lane[ticket.lane] -= 1
+            self._running_by_platform[ticket.platform] -= 1
+            self._dispatch()
+
+    def run(self, fn: Callable, client_ip: str, lane: str = 'video', platform: str = 'other', cost: float = DEFAULT_JOB_COST):
+        """
+        Wait for a slot, run fn() and free the slot again.
+
+        Args:
+            fn: The download to run
+            client_ip: Client's IP address (fairness key)
+            lane: 'audio' or 'video'
+            platform: Platform name (for per-platform limits)
+            cost: Estimated job size (see estimate_job_cost)
+
+        Returns:
+            Whatever fn() returns
+        """
+        with self._cond:
+            weight = self.client_weights.get(client_ip, 1.0)
+            start = max(self._virtual_time, self._last_tag.get(client_ip, 0.0))
+            tag = start + cost / weight
+            self._last_tag[client_ip] = tag
+            ticket = _Ticket(client_ip, lane, platform, tag, next(self._seq))
+            self._waiting.append(ticket)
+            self._dispatch()
+
+            deadline = time.monotonic() + self.max_wait
+            while not ticket.granted:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._waiting.remove(ticket)
+                    # Give the capacity it reserved back to the client
+                    # (unless its tag was already forgotten as idle)
+                    if client_ip in self._last_tag:
+                        self._last_tag[client_ip] -= cost / weight
+                    raise Exception("Server is busy right now. Please try again in a minute.")
+                self._cond.wait(remaining)
+
+            self._forget_idle_clients()
+
+        try:
+            return fn()
+        finally:
+            self._release(ticket)
+
+    def _forget_idle_clients(self):
+        """Drop finish tags that are already in the past (keeps the dict small)."""
+        if len(self._last_tag) < 1000:
+            return
+        for client, tag in list(self._last_tag.items()):
+            if tag <= self._virtual_time:
+                del self._last_tag[client]
+
+    def stats(self) -> Dict:
+        """Current queue/slot usage (for health checks)."""
+        with self._cond:
+            return {
+                'running': self._running,
+                'waiting': len(self._waiting),
+                'running_by_lane': dict(self._running_by_lane),
+                'max_concurrent': self.max_concurrent,
+            }
+
+
+# Global scheduler instance
+download_scheduler = DownloadScheduler()
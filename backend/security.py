@@ -6,8 +6,11 @@ Additional security functions for the application.
 
 import re
 from pathlib import Path
-from urllib.parse import urlparse
 from backend.config import DOWNLOADS_DIR, ALLOWED_DOMAINS
+from backend.url_classifier import allowed_hosts, match_host, parse_host
+
+# Built once at import instead of on every call
+ALLOWED_HOSTS = allowed_hosts(ALLOWED_DOMAINS)
 
 
 def sanitize_filename(filename: str) -> str:
@@ -59,24 +62,20 @@ def validate_domain(url: str) -> bool:
     """
     Validate if URL domain is allowed.
     
+    Subdomains of an allowed domain are allowed too (m.youtube.com when
+    youtube.com is listed), using the same host matching as url_classifier.
+    
     Args:
         url: URL to validate
         
     Returns:
         True if allowed, False otherwise
     """
-    if not ALLOWED_DOMAINS:
+    if not ALLOWED_HOSTS:
         return True  # All domains allowed if list is empty
     
     try:
-        parsed = urlparse(url)
-        domain = parsed.netloc.lower()
-        
-        # Remove port if present
-        if ':' in domain:
-            domain = domain.split(':')[0]
-        
-        return domain in [d.lower() for d in ALLOWED_DOMAINS if d]
+        return match_host(parse_host(url), ALLOWED_HOSTS) is not None
     except Exception:
         return False
 
@@ -0,0 +1,151 @@
+"""
+Static Assets Module
+
+Serves the frontend files from memory, precompressed and fingerprinted.
+
+Why? send_from_directory re-reads every file and sends it uncompressed with
+no useful caching. The frontend is tiny and never changes while the app is
+running, so we do the work once at startup:
+- read each file and hash its content
+- precompress it (gzip, and brotli if the module is installed)
+- rewrite index.html to point at fingerprinted URLs (/assets/app.<hash>.js)
+
+Fingerprinted URLs change whenever the content does, so they can be cached
+"forever" (immutable). index.html itself keeps its URL and is revalidated
+with an ETag, which we answer with a 304 straight from memory.
+"""
+
+import gzip
+import hashlib
+import re
+from pathlib import Path
+from typing import Dict, Optional
+from flask import Response
+
+try:
+    import brotli
+except ImportError:  # brotli is optional
+    brotli = None
+
+ASSET_FILES = ['styles.css', 'app.js', 'ads.js', 'config.js']
+INDEX_FILE = 'index.html'
+MIMETYPES = {
+    '.html': 'text/html; charset=utf-8',
+    '.css': 'text/css; charset=utf-8',
+    '.js': 'application/javascript; charset=utf-8',
+}
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE = 'no-cache'
+# Don't bother compressing tiny files
+MIN_COMPRESS_SIZE = 256
+
+
+class _Asset:
+    """One file with its precomputed variants."""
+
+    def __init__(self, name: str, data: bytes):
+        self.name = name
+        self.mimetype = MIMETYPES.get(Path(name).suffix, 'application/octet-stream')
+        self.digest = hashlib.sha256(data).hexdigest()[:12]
+        self.variants: Dict[str, bytes] = {'identity': data}
+        if len(data) >= MIN_COMPRESS_SIZE:
+            self.variants['gzip'] = gzip.compress(data, compresslevel=9, mtime=0)
+            if brotli is not None:
+                self.variants['br'] = brotli.compress(data, quality=11)
+
+    @property
+    def fingerprinted_name(self) -> str:
+        path = Path(self.name)
+        return f"{path.stem}.{self.digest}{path.suffix}"
+
+
+class StaticAssets:
+    """
+    In-memory registry of frontend files.
+    """
+
+    def __init__(self, frontend_dir: Path, reload: bool = False):
+        self.frontend_dir = Path(frontend_dir)
+        self.reload = reload
+        self._mtimes: Dict[str, float] = {}
+        self.load()
+
+    def load(self):
+        """Read, hash and compress all frontend files."""
+        assets = {}
+        for name in ASSET_FILES:
+            assets[name] = _Asset(name, (self.frontend_dir / name).read_bytes())
+
+        # Point index.html at the fingerprinted URLs
+        html = (self.frontend_dir / INDEX_FILE).read_text(encoding='utf-8')
+        for name, asset in assets.items():
+            html = re.sub(
+                rf'(\s(?:href|src)=")({re.escape(name)})(")',
+                rf'\g<1>/assets/{asset.fingerprinted_name}\g<3>',
+                html
+            )
+        assets[INDEX_FILE] = _Asset(INDEX_FILE, html.encode('utf-8'))
+
+        self._assets = assets
+        self._fingerprinted = {a.fingerprinted_name: a for a in assets.values() if a.name != INDEX_FILE}
+        self._mtimes = self._current_mtimes()
+
+    def _current_mtimes(self) -> Dict[str, float]:
+        return {
+            name: (self.frontend_dir / name).stat().st_mtime
+            for name in ASSET_FILES + [INDEX_FILE]
+        }
+
+    def _reload_if_changed(self):
+        """In debug mode, pick up edits to the frontend without a restart."""
+        if self.reload and self._current_mtimes() != self._mtimes:
+            self.load()
+
+    def response(self, name: str, request, fingerprinted: bool = False) -> Optional[Response]:
+        """
+        Build the response for an asset, or None if it doesn't exist.
+
+        Args:
+            name: Plain name ('app.js') or fingerprinted name ('app.<hash>.js')
+            request: Flask request (for Accept-Encoding / If-None-Match)
+            fingerprinted: True when served from /assets/ (immutable caching)
+        """
+        self._reload_if_changed()
+        asset = self._fingerprinted.get(name) if fingerprinted else self._assets.get(name)
+        if asset is None:
+            return None
+
+        cache_control = IMMUTABLE_CACHE if fingerprinted else REVALIDATE_CACHE
+        encoding = self._pick_encoding(asset, request.accept_encodings)
+        # Each encoding is its own representation, so it gets its own ETag
+        etag = f'"{asset.digest}"' if encoding == 'identity' else f'"{asset.digest}-{encoding}"'
+        headers = {
+            'Cache-Control': cache_control,
+            'ETag': etag,
+            'Vary': 'Accept-Encoding',
+        }
+
+        # Conditional request - answer from memory without a body, but only
+        # if the client holds this encoding's representation
+        if request.if_none_match.contains_weak(etag.strip('"')):
+            return Response(status=304, headers=headers)
+
+        body = asset.variants[encoding]
+        if encoding != 'identity':
+            headers['Content-Encoding'] = encoding
+        headers['Content-Length'] = str(len(body))
+        return Response(body, content_type=asset.mimetype, headers=headers)
+
+    @staticmethod
+    def _pick_encoding(asset: _Asset, accept_encodings) -> str:
+        """
+        The client's most preferred compressed variant we have.
+
+        q=0 means "not acceptable"; on equal q-values br wins over gzip.
+        """
+        best, best_quality = 'identity', 0
+        for encoding in ('br', 'gzip'):
+            quality = accept_encodings.quality(encoding)
+            if encoding in asset.variants and quality > best_quality:
+                best, best_quality = encoding, quality
+        return best
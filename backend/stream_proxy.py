@@ -0,0 +1,221 @@
+"""
+Streaming Proxy Module
+
+Relays media bytes from the platform CDN to the client without staging the
+file on disk.
+
+Why? Some signed media URLs only work from the IP that extracted them, so we
+can't hand them to the browser. Downloading the whole file first costs disk
+space and doubles the transfer time. Streaming it through keeps memory per
+transfer at one fixed-size buffer.
+
+Backpressure: the WSGI server pulls the next chunk only after the previous one
+was written to the client socket, so a slow client simply stops us reading
+from upstream (and TCP flow control slows the CDN down in turn).
+"""
+
+import http.client
+import threading
+from collections import deque
+from typing import Dict, Iterator, Optional, Tuple
+from urllib.parse import urlparse, urljoin
+from itsdangerous import URLSafeTimedSerializer, BadSignature
+from backend.config import (
+    SECRET_KEY,
+    YTDLP_OPTIONS,
+    STREAM_PROXY_CHUNK_SIZE,
+    STREAM_PROXY_MAX_BUFFERS,
+    STREAM_PROXY_MAX_IDLE_PER_HOST,
+    STREAM_PROXY_TIMEOUT,
+    STREAM_PROXY_TOKEN_TTL,
+)
+
+# Response headers we pass through to the client
+PASSTHROUGH_HEADERS = ['Content-Type', 'Content-Length', 'Content-Range', 'Accept-Ranges', 'Last-Modified', 'ETag']
+MAX_REDIRECTS = 3
+
+
+class BufferPool:
+    """
+    Pool of fixed-size reusable buffers.
+
+    Keeps at most max_buffers idle buffers around so memory stays flat no
+    matter how many transfers have run.
+    """
+
+    def __init__(self, buffer_size: int = STREAM_PROXY_CHUNK_SIZE, max_buffers: int = STREAM_PROXY_MAX_BUFFERS):
+        self.buffer_size = buffer_size
+        self.max_buffers = max_buffers
+        self._buffers = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> bytearray:
+        with self._lock:
+            if self._buffers:
+                return self._buffers.pop()
+        return bytearray(self.buffer_size)
+
+    def release(self, buffer: bytearray):
+        with self._lock:
+            if len(self._buffers) < self.max_buffers:
+                self._buffers.append(buffer)
+
+
+class ConnectionPool:
+    """
+    Keep-alive HTTP(S) connections, pooled per upstream host and egress route.
+    """
+
+    def __init__(self, max_idle_per_host: int = STREAM_PROXY_MAX_IDLE_PER_HOST, timeout: int = STREAM_PROXY_TIMEOUT):
+        self.max_idle_per_host = max_idle_per_host
+        self.timeout = timeout
+        self._idle: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, scheme: str, host: str, port: Optional[int], route=None) -> Tuple[Tuple, http.client.HTTPConnection]:
+        port = port or (443 if scheme == 'https' else 80)
+        key = (scheme, host, port, route.name if route else None)
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return key, idle.pop()
+
+        if route is not None:
+            # Same proxy/source address the media URL was extracted through
+            conn = route.http_connection(scheme, host, port, self.timeout)
+        elif scheme == 'https':
+            conn = http.client.HTTPSConnection(host, port, timeout=self.timeout)
+        else:
+            conn = http.client.HTTPConnection(host, port, timeout=self.timeout)
+        return key, conn
+
+    def release(self, key: Tuple, conn: http.client.HTTPConnection):
+        """Return a connection whose response was fully read."""
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle_per_host:
+                idle.append(conn)
+                return
+        conn.close()
+
+
+class StreamProxy:
+    """
+    Streams upstream media to the client through pooled connections.
+    """
+
+    def __init__(self):
+        self.connections = ConnectionPool()
+        self.buffers = BufferPool()
+        self._serializer = URLSafeTimedSerializer(SECRET_KEY, salt='stream-proxy')
+
+    # ------------------------------------------------------------------
+    # Tokens
+    # ------------------------------------------------------------------
+
+    def make_token(self, media_url: str, http_headers: Optional[Dict] = None, route: Optional[str] = None) -> str:
+        """
+        Sign a media URL (and the headers it needs) for /api/file.
+
+        The token is signed with SECRET_KEY, so any worker can serve it and
+        clients can't use the proxy for arbitrary URLs.
+
+        Args:
+            route: Name of the egress route the URL was extracted through
+                (IP-bound URLs only work from that route)
+        """
+        return self._serializer.dumps({'url': media_url, 'headers': http_headers or {}, 'route': route})
+
+    def load_token(self, token: str) -> Optional[Dict]:
+        """Return {'url', 'headers', 'route'} for a valid token, None otherwise."""
+        try:
+            return self._serializer.loads(token, max_age=STREAM_PROXY_TOKEN_TTL)
+        except BadSignature:
+            return None
+
+    # ------------------------------------------------------------------
+    # Streaming
+    # ------------------------------------------------------------------
+
+    def _upstream_headers(self, http_headers: Optional[Dict], range_header: Optional[str]) -> Dict:
+        """Build request headers that match what the extractor sent."""
+        headers = dict(YTDLP_OPTIONS.get('http_headers', {}))
+        if YTDLP_OPTIONS.get('user_agent'):
+            headers['User-Agent'] = YTDLP_OPTIONS['user_agent']
+        headers.update(http_headers or {})
+        # We relay bytes as-is, so never ask for a compressed body
+        headers['Accept-Encoding'] = 'identity'
+        headers['Connection'] = 'keep-alive'
+        if range_header:
+            headers['Range'] = range_header
+        return headers
+
+    def open(self, media_url: str, http_headers: Optional[Dict] = None, range_header: Optional[str] = None,
+             route=None) -> Tuple[int, Dict, Iterator[bytes]]:
+        """
+        Open an upstream request and return (status, headers, body iterator).
+
+        Args:
+            media_url: Signed media URL
+            http_headers: Extra headers from the info dict
+            range_header: Client's Range header, forwarded upstream
+            route: EgressRoute to connect through (None = direct)
+        """
+        headers = self._upstream_headers(http_headers, range_header)
+
+        for _ in range(MAX_REDIRECTS + 1):
+            parsed = urlparse(media_url)
+            key, conn = self.connections.acquire(parsed.scheme, parsed.hostname, parsed.port, route)
+            path = parsed.path or '/'
+            if parsed.query:
+                path += '?' + parsed.query
+
+            try:
+                conn.request('GET', path, headers=headers)
+                response = conn.getresponse()
+            except (http.client.HTTPException, OSError):
+                # Stale keep-alive connection - retry once on a fresh one
+                conn.close()
+                key, conn = self.connections.acquire(parsed.scheme, parsed.hostname, parsed.port, route)
+                conn.request('GET', path, headers=headers)
+                response = conn.getresponse()
+
+            if response.status in (301, 302, 303, 307, 308) and response.getheader('Location'):
+                media_url = urljoin(media_url, response.getheader('Location'))
+                response.read()
+                self.connections.release(key, conn)
+                continue
+
+            response_headers = {
+                name: response.getheader(name)
+                for name in PASSTHROUGH_HEADERS
+                if response.getheader(name)
+            }
+            return response.status, response_headers, self._stream(key, conn, response)
+
+        raise Exception("Too many redirects from media server")
+
+    def _stream(self, key: Tuple, conn: http.client.HTTPConnection, response: http.client.HTTPResponse) -> Iterator[bytes]:
+        """Yield the body in fixed-size chunks, reusing one buffer."""
+        buffer = self.buffers.acquire()
+        view = memoryview(buffer)
+        completed = False
+        try:
+            while True:
+                n = response.readinto(view)
+                if not n:
+                    break
+                yield bytes(view[:n])
+            completed = True
+        finally:
+            view.release()
+            self.buffers.release(buffer)
+            if completed and not response.will_close:
+                self.connections.release(key, conn)
+            else:
+                # Client went away mid-transfer - don't reuse a half-read connection
+                conn.close()
+
+
+# Global stream proxy instance
+stream_proxy = StreamProxy()
@@ -0,0 +1,139 @@
+"""
+Subtitles Module
+
+Picks, fetches and converts subtitle tracks from a yt-dlp info dict.
+
+Why? Users who only want captions used to go through a full media
+download. The info dict from the extraction we already did (and cached)
+lists every subtitle track with a direct URL, so a caption request is one
+small text fetch plus an in-process VTT -> SRT conversion - no yt-dlp run,
+no ffmpeg, no media bytes.
+"""
+
+import re
+import urllib.request
+from typing import Dict, List, Optional, Tuple
+from backend.config import SUBTITLE_FETCH_TIMEOUT, SUBTITLE_MAX_BYTES, YTDLP_OPTIONS
+
+SUBTITLE_FORMATS = ('srt', 'vtt')
+MIMETYPES = {
+    'srt': 'application/x-subrip; charset=utf-8',
+    'vtt': 'text/vtt; charset=utf-8',
+}
+
+_TIMESTAMP = re.compile(r'(?:(\d+):)?(\d{1,2}):(\d{2})[.,](\d{3})')
+_CUE_TIMING = re.compile(r'^\s*(\S+)\s+-->\s+(\S+)')
+_TAGS = re.compile(r'<[^>]+>')
+
+
+class SubtitlesNotFound(Exception):
+    """The video has no usable track for the requested language."""
+
+
+def languages(tracks: Optional[Dict]) -> List[str]:
+    """Languages that have at least one usable track."""
+    return sorted(lang for lang, formats in (tracks or {}).items()
+                  if any(f.get('url') for f in formats or []))
+
+
+def pick_track(info: Dict, lang: str, auto: bool, target: str) -> Optional[Dict]:
+    """
+    Find the best track for a language.
+
+    Prefers a track already in the target format, then VTT (which we can
+    convert). Other formats (json3, ttml, ...) aren't supported.
+    """
+    tracks = (info.get('automatic_captions') if auto else info.get('subtitles')) or {}
+    formats = [f for f in tracks.get(lang) or [] if f.get('url')]
+    for ext in (target, 'vtt'):
+        for track in formats:
+            if track.get('ext') == ext:
+                return track
+    return None
+
+
+def fetch_track(track: Dict) -> str:
+    """Download a subtitle track's text (size-capped)."""
+    headers = {'User-Agent': YTDLP_OPTIONS.get('user_agent', 'Mozilla/5.0')}
+    headers.update(track.get('http_headers') or {})
+    req = urllib.request.Request(track['url'], headers=headers)
+    with urllib.request.urlopen(req, timeout=SUBTITLE_FETCH_TIMEOUT) as response:
+        data = response.read(SUBTITLE_MAX_BYTES + 1)
+    if len(data) > SUBTITLE_MAX_BYTES:
+        raise Exception("Subtitle track is too large")
+    return data.decode('utf-8-sig', errors='replace')
+
+
+def _srt_timestamp(value: str) -> str:
+    match = _TIMESTAMP.match(value)
+    if not match:
+        raise ValueError(f"Bad timestamp: {value}")
+    hours, minutes, seconds, millis = match.groups()
+    return f"{int(hours or 0):02d}:{int(minutes):02d}:{int(seconds):02d},{millis}"
+
+
+def _overlap(previous: List[str], text: List[str]) -> int:
+    """Number of leading lines of text that repeat the end of the previous cue."""
+    for size in range(min(len(previous), len(text)), 0, -1):
+        if previous[-size:] == text[:size]:
+            return size
+    return 0
+
+
+def vtt_to_srt(vtt: str, auto: bool = False) -> str:
+    """
+    Convert WebVTT to SubRip.
+
+    Drops the header, NOTE/STYLE/REGION blocks, cue settings and inline tags.
+    Automatic captions (auto=True) are roll-up captions: each cue starts with
+    the last line(s) of the previous one. That overlap is removed; uploaded
+    subtitles are kept as they are, repeated lines included.
+    """
+    cues: List[Tuple[str, str, List[str]]] = []
+    previous: List[str] = []
+
+    for block in re.split(r'\n\s*\n', vtt.replace('\r\n', '\n').replace('\r', '\n')):
+        lines = block.strip('\n').split('\n')
+        # Cue identifiers come before the timing line
+        timing_index = next((i for i, line in enumerate(lines) if '-->' in line), None)
+        if timing_index is None:
+            continue  # Header, NOTE, STYLE, REGION
+        timing = _CUE_TIMING.match(lines[timing_index])
+        if not timing:
+            continue
+        try:
+            start, end = _srt_timestamp(timing.group(1)), _srt_timestamp(timing.group(2))
+        except ValueError:
+            continue
+
+        text = [_TAGS.sub('', line).strip() for line in lines[timing_index + 1:]]
+        text = [line for line in text if line]
+        if auto and text:
+            # Roll-up captions: skip the lines the previous cue ended with
+            text, previous = text[_overlap(previous, text):], text
+        if not text:
+            continue
+        cues.append((start, end, text))
+
+    return '\n'.join(
+        f"{number}\n{start} --> {end}\n" + '\n'.join(text) + '\n'
+        for number, (start, end, text) in enumerate(cues, 1)
+    )
+
+
+def render(info: Dict, lang: str, target: str = 'srt', auto: bool = False) -> str:
+    """
+    Subtitle text for a language in the target format.
+
+    Raises:
+        SubtitlesNotFound: If there's no usable track for the language
+        Exception: If the track can't be fetched
+    """
+    track = pick_track(info, lang, auto, target)
+    if track is None:
+        kind = 'automatic captions' if auto else 'subtitles'
+        raise SubtitlesNotFound(f"No {kind} available for language '{lang}'")
+    text = fetch_track(track)
+    if track.get('ext') == target:
+        return text
+    return vtt_to_srt(text, auto)  # Only vtt -> srt is left
@@ -0,0 +1,223 @@
+"""
+Thumbnail Cache Module
+
+Fetches video thumbnails once, shrinks them and serves them from a disk cache.
+
+Why? Loading thumbnails straight from the platform CDN fails on
+hotlink-protected platforms, leaks our users' traffic to the platform and is
+slow on mobile (originals are often 1280px JPEGs). Here each thumbnail is
+downloaded once, resized/recompressed into small variants at ingest time and
+then served with long-lived cache headers.
+
+Layout of the cache directory:
+- <content_hash>_<size>.<ext>  resized variants (keyed by image content, so
+  the same image under different URLs is stored once)
+- refs/<url_hash>              maps a thumbnail URL to its content hash
+
+Resizing uses Pillow when it is installed; without it the original image is
+cached and served as-is.
+"""
+
+import hashlib
+import io
+import os
+import threading
+import urllib.request
+from pathlib import Path
+from typing import Optional, Tuple
+from urllib.parse import urlparse
+from itsdangerous import URLSafeSerializer, BadSignature
+from backend.config import (
+    SECRET_KEY,
+    YTDLP_OPTIONS,
+    THUMBNAIL_CACHE_DIR,
+    THUMBNAIL_CACHE_MAX_BYTES,
+    THUMBNAIL_MAX_SOURCE_BYTES,
+    THUMBNAIL_FETCH_TIMEOUT,
+)
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional
+    Image = None
+
+# Variant name -> max width in pixels
+THUMBNAIL_SIZES = {
+    'small': 320,
+    'medium': 640,
+}
+DEFAULT_SIZE = 'small'
+JPEG_QUALITY = 80
+WEBP_QUALITY = 75
+
+# Anything else (file://, ftp://, data:) would let an extractor-supplied
+# URL read local files or reach other services through us
+FETCH_SCHEMES = ('http', 'https')
+
+
+class _HTTPOnlyRedirectHandler(urllib.request.HTTPRedirectHandler):
+    """Follow redirects only to http(s) (urllib also allows ftp://)."""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        if urlparse(newurl).scheme not in FETCH_SCHEMES:
+            raise Exception("Thumbnail redirected to a disallowed URL scheme")
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+_opener = urllib.request.build_opener(_HTTPOnlyRedirectHandler)
+
+
+class ThumbnailCache:
+    """
+    Content-keyed disk cache of resized thumbnails with an LRU size budget.
+    """
+
+    def __init__(self, cache_dir: Path = THUMBNAIL_CACHE_DIR, max_bytes: int = THUMBNAIL_CACHE_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.refs_dir = self.cache_dir / 'refs'
+        self.refs_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._serializer = URLSafeSerializer(SECRET_KEY, salt='thumbnail')
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Tokens
+    # ------------------------------------------------------------------
+
+    def make_token(self, thumbnail_url: str) -> str:
+        """
+        Sign a thumbnail URL for /api/thumbnail.
+
+        Signed so the endpoint can't be used to fetch arbitrary URLs. No
+        timestamp, so the same thumbnail always gets the same (cacheable) URL.
+        """
+        return self._serializer.dumps(thumbnail_url)
+
+    def load_token(self, token: str) -> Optional[str]:
+        try:
+            return self._serializer.loads(token)
+        except BadSignature:
+            return None
+
+    # ------------------------------------------------------------------
+    # Cache
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _hash(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()[:32]
+
+    def _variant_path(self, content_key: str, size: str, fmt: str) -> Path:
+        return self.cache_dir / f"{content_key}_{size}.{fmt}"
+
+    def _ref_path(self, thumbnail_url: str) -> Path:
+        return self.refs_dir / self._hash(thumbnail_url.encode('utf-8'))
+
+    def get(self, thumbnail_url: str, size: str = DEFAULT_SIZE, webp: bool = False) -> Tuple[Path, str]:
+        """
+        Return (path, mimetype) of a cached variant, fetching it on first use.
+
+        Args:
+            thumbnail_url: Original thumbnail URL from the info dict
+            size: Variant name from THUMBNAIL_SIZES
+            webp: True if the client accepts WebP
+        """
+        if size not in THUMBNAIL_SIZES:
+            size = DEFAULT_SIZE
+        fmt = 'webp' if webp and Image is not None else 'jpg'
+
+        ref_path = self._ref_path(thumbnail_url)
+        if ref_path.exists():
+            content_key = ref_path.read_text().strip()
+            path = self._variant_path(content_key, size, fmt)
+            if path.exists():
+                self._touch(path)
+                return path, self._mimetype(path)
+
+        content_key = self._ingest(thumbnail_url)
+        ref_path.write_text(content_key)
+        path = self._variant_path(content_key, size, fmt)
+        if not path.exists():
+            # No Pillow: only the original was stored
+            path = next(self.cache_dir.glob(f"{content_key}_original.*"))
+        return path, self._mimetype(path)
+
+    def _fetch(self, thumbnail_url: str) -> bytes:
+        """Download the original image (with the extractor's user agent)."""
+        if urlparse(thumbnail_url).scheme not in FETCH_SCHEMES:
+            raise Exception("Thumbnail URL must be http or https")
+        headers = {'User-Agent': YTDLP_OPTIONS.get('user_agent', 'Mozilla/5.0')}
+        req = urllib.request.Request(thumbnail_url, headers=headers)
+        with _opener.open(req, timeout=THUMBNAIL_FETCH_TIMEOUT) as response:
+            data = response.read(THUMBNAIL_MAX_SOURCE_BYTES + 1)
+        if len(data) > THUMBNAIL_MAX_SOURCE_BYTES:
+            raise Exception("Thumbnail too large")
+        return data
+
+    def _ingest(self, thumbnail_url: str) -> str:
+        """Fetch a thumbnail once and write all its variants. Returns the content key."""
+        data = self._fetch(thumbnail_url)
+        content_key = self._hash(data)
+
+        if Image is None:
+            ext = 'png' if data.startswith(b'\x89PNG') else 'webp' if data[8:12] == b'WEBP' else 'jpg'
+            self._write(self.cache_dir / f"{content_key}_original.{ext}", data)
+        else:
+            image = Image.open(io.BytesIO(data))
+            image = image.convert('RGB')
+            for size, max_width in THUMBNAIL_SIZES.items():
+                variant = image.copy()
+                variant.thumbnail((max_width, max_width * 2))
+                for fmt, options in (('jpg', {'format': 'JPEG', 'quality': JPEG_QUALITY, 'optimize': True, 'progressive': True}),
+                                     ('webp', {'format': 'WEBP', 'quality': WEBP_QUALITY, 'method': 4})):
+                    out = io.BytesIO()
+                    variant.save(out, **options)
+                    self._write(self._variant_path(content_key, size, fmt), out.getvalue())
+
+        self._evict()
+        return content_key
+
+    def _write(self, path: Path, data: bytes):
+        """Write atomically so concurrent readers never see half a file."""
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _touch(path: Path):
+        """Bump mtime so eviction treats the file as recently used."""
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _mimetype(path: Path) -> str:
+        return {'.webp': 'image/webp', '.png': 'image/png'}.get(path.suffix, 'image/jpeg')
+
+    def _evict(self):
+        """Delete least recently used variants until the cache fits the budget."""
+        with self._lock:
+            files = []
+            total = 0
+            for entry in os.scandir(self.cache_dir):
+                if entry.is_file() and not entry.name.startswith('.'):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+            if total <= self.max_bytes:
+                return
+
+            # Oldest first; stale refs just cause a re-fetch
+            for _, size, path in sorted(files):
+                try:
+                    os.unlink(path)
+                    total -= size
+                except OSError:
+                    pass
+                if total <= self.max_bytes:
+                    break
+
+
+# Global thumbnail cache instance
+thumbnail_cache = ThumbnailCache()
@@ -0,0 +1,37 @@
+"""
+Timecodes Module
+
+Parsing of clip boundaries given by clients.
+
+Why? The clip range is checked while validating a request, long before any
+download runs. Keeping the parser here means the request checks don't have
+to import the download service, and both share one definition of what a
+valid time is. JSON allows NaN and Infinity, which would make every
+comparison with a clip boundary false, so they are rejected too.
+"""
+
+import math
+from typing import Optional
+from yt_dlp.utils import parse_duration
+
+
+def parse_time(value) -> Optional[float]:
+    """
+    Parse a clip boundary: seconds (90, "90") or a timestamp ("1:30").
+    
+    Raises:
+        ValueError: If the value can't be parsed or isn't a finite time
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        seconds = float(value)
+    else:
+        seconds = parse_duration(str(value).strip())
+        if seconds is None:
+            raise ValueError(f"Invalid time: {value}")
+    if not math.isfinite(seconds):
+        raise ValueError(f"Invalid time: {value}")
+    if seconds < 0:
+        raise ValueError("Time can't be negative")
+    return seconds
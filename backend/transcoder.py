@@ -0,0 +1,73 @@
+"""
+Transcoder Module
+
+Runs audio re-encodes (mp3) in a small, capped worker pool.
+
+Why? Encoding to mp3 is a full decode + encode and uses a whole CPU core for
+the length of the track. Most users are happy with the platform's native
+AAC/Opus audio (a plain stream copy), so mp3 is only produced on request,
+and at most MP3_ENCODE_WORKERS encodes run at once per worker process so
+encodes can't starve request handling.
+"""
+
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from backend.config import FFMPEG_BINARY, MP3_ENCODE_WORKERS, MP3_BITRATE
+
+# Give up on an encode that takes longer than this
+ENCODE_TIMEOUT = 600  # Seconds
+
+
+class Transcoder:
+    """
+    Capped pool for ffmpeg audio encodes.
+    """
+
+    def __init__(self, max_workers: int = MP3_ENCODE_WORKERS):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='mp3-encode')
+
+    def to_mp3(self, source: Path, bitrate: str = MP3_BITRATE) -> Path:
+        """
+        Encode a media file to mp3 (blocks until the pool has run it).
+
+        The source file is deleted once the mp3 is written.
+
+        Returns:
+            Path of the mp3 file
+        """
+        return self._pool.submit(self._encode_mp3, Path(source), bitrate).result()
+
+    @staticmethod
+    def _encode_mp3(source: Path, bitrate: str) -> Path:
+        target = source.with_suffix('.mp3')
+        if target == source:
+            return source
+
+        tmp_target = target.with_name(f".{target.name}.tmp.mp3")
+        command = [
+            FFMPEG_BINARY, '-y', '-loglevel', 'error',
+            '-i', str(source),
+            '-vn',
+            '-codec:a', 'libmp3lame',
+            '-b:a', bitrate,
+            # One encoder thread per job - the pool size is the CPU cap
+            '-threads', '1',
+            str(tmp_target),
+        ]
+        try:
+            subprocess.run(command, check=True, capture_output=True, timeout=ENCODE_TIMEOUT)
+        except subprocess.CalledProcessError as e:
+            tmp_target.unlink(missing_ok=True)
+            raise Exception(f"mp3 conversion failed: {e.stderr.decode(errors='replace')[:200]}")
+        except (subprocess.TimeoutExpired, OSError) as e:
+            tmp_target.unlink(missing_ok=True)
+            raise Exception(f"mp3 conversion failed: {str(e)[:200]}")
+
+        tmp_target.replace(target)
+        source.unlink(missing_ok=True)
+        return target
+
+
+# Global transcoder instance
+transcoder = Transcoder()
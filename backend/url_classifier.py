@@ -0,0 +1,175 @@
+"""
+URL Classifier Module
+
+Works out which platform a URL belongs to, the video ID and a canonical URL.
+
+Why? Checking "youtube.com" in url with substring matches is slow when done
+several times per request, and wrong: "x.com" matches fox.com and
+netflix.com. Here the URL is parsed once, its host is looked up in a
+precomputed host table (exact match, then parent domains), and the result is
+memoized.
+
+The (platform, video_id) pair is stable across URL variants
+(youtu.be/ID, m.youtube.com/watch?v=ID&si=..., /shorts/ID), so it's what
+caches and job deduplication are keyed on.
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, FrozenSet, NamedTuple, Optional
+from urllib.parse import urlparse, parse_qsl, urlencode, urlunparse
+
+# Host -> platform. Subdomains match their parent (m.youtube.com -> youtube).
+PLATFORM_HOSTS: Dict[str, str] = {
+    'youtube.com': 'youtube',
+    'youtu.be': 'youtube',
+    'youtube-nocookie.com': 'youtube',
+    'instagram.com': 'instagram',
+    'twitter.com': 'twitter',
+    'x.com': 'twitter',
+    'vimeo.com': 'vimeo',
+    'tiktok.com': 'tiktok',
+    'dailymotion.com': 'dailymotion',
+    'dai.ly': 'dailymotion',
+    'facebook.com': 'facebook',
+    'fb.watch': 'facebook',
+    'reddit.com': 'reddit',
+    'v.redd.it': 'reddit',
+}
+
+# Platform -> patterns that pull the video ID out of "<path>?<query>"
+_ID_PATTERNS = {
+    'youtube': [
+        re.compile(r'(?:^|[?&])v=([\w-]{11})'),
+        re.compile(r'^/(?:shorts|embed|live|v)/([\w-]{11})'),
+        re.compile(r'^/([\w-]{11})(?:$|[/?])'),  # youtu.be/<id>
+    ],
+    'instagram': [re.compile(r'^/(?:[\w.]+/)?(?:p|reels?|tv)/([\w-]+)')],
+    'twitter': [re.compile(r'/status(?:es)?/(\d+)')],
+    'vimeo': [re.compile(r'^/(?:video/)?(\d+)')],
+    'tiktok': [re.compile(r'/video/(\d+)')],
+    'dailymotion': [re.compile(r'^/(?:video/)?(x[a-z0-9]+)')],
+    'reddit': [re.compile(r'/comments/([a-z0-9]+)')],
+}
+
+# Platform -> canonical URL for a video ID
+_CANONICAL_URLS = {
+    'youtube': 'https://www.youtube.com/watch?v={id}',
+    'twitter': 'https://x.com/i/status/{id}',
+    'vimeo': 'https://vimeo.com/{id}',
+    'dailymotion': 'https://www.dailymotion.com/video/{id}',
+}
+
+# Query parameters that never change which video a URL points to
+_TRACKING_PARAMS = frozenset({'si', 'feature', 'fbclid', 'gclid', 'igshid', 'igsh', 'ref_src'})
+
+
+class ClassifiedURL(NamedTuple):
+    """Result of classify_url."""
+
+    platform: str               # 'youtube', 'instagram', ... or 'other'
+    video_id: Optional[str]     # Platform video ID, if recognised
+    normalized_url: str         # Canonical form of the URL
+
+    @property
+    def cache_key(self) -> str:
+        """Key for caches and deduplication (same video = same key)."""
+        if self.video_id:
+            return f"{self.platform}:{self.video_id}"
+        return self.normalized_url
+
+
+def parse_host(url: str) -> str:
+    """Return the lowercase host of a URL without port or 'www.'."""
+    try:
+        host = (urlparse(url.strip()).hostname or '').lower()
+    except ValueError:
+        return ''
+    return host[4:] if host.startswith('www.') else host
+
+
+def match_host(host: str, hosts) -> Optional[str]:
+    """
+    Find the entry of `hosts` (a set or dict) that host belongs to.
+
+    Tries the host itself, then each parent domain:
+    m.youtube.com -> youtube.com. Never matches on substrings.
+    """
+    while host:
+        if host in hosts:
+            return host
+        _, _, host = host.partition('.')
+    return None
+
+
+def _strip_tracking(parsed) -> str:
+    query = [(k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True)
+             if k not in _TRACKING_PARAMS and not k.startswith('utm_')]
+    return urlunparse((
+        parsed.scheme.lower(),
+        parsed.netloc.lower(),
+        parsed.path,
+        '',
+        urlencode(query),
+        '',  # Fragment never reaches the server
+    ))
+
+
+@lru_cache(maxsize=4096)
+def classify_url(url: str) -> ClassifiedURL:
+    """
+    Classify a URL (memoized - repeated calls for the same URL are free).
+
+    Args:
+        url: Any URL
+
+    Returns:
+        ClassifiedURL(platform, video_id, normalized_url)
+    """
+    url = (url or '').strip()
+    try:
+        parsed = urlparse(url)
+    except ValueError:
+        return ClassifiedURL('other', None, url)
+
+    host = parse_host(url)
+    matched = match_host(host, PLATFORM_HOSTS)
+    platform = PLATFORM_HOSTS[matched] if matched else 'other'
+
+    video_id = None
+    target = parsed.path + ('?' + parsed.query if parsed.query else '')
+    for pattern in _ID_PATTERNS.get(platform, []):
+        found = pattern.search(target)
+        if found:
+            video_id = found.group(1)
+            break
+
+    # watch?v=ID&list=... is the video itself: extraction runs with
+    # noplaylist, so it shares the plain video's cache key. /playlist?list=...
+    # has no video ID and keeps its own URL.
+
+    if video_id and platform in _CANONICAL_URLS:
+        normalized = _CANONICAL_URLS[platform].format(id=video_id)
+    else:
+        normalized = _strip_tracking(parsed)
+
+    return ClassifiedURL(platform, video_id, normalized)
+
+
+def allowed_hosts(domains) -> FrozenSet[str]:
+    """
+    Build the allow-list set once (lowercase, no 'www.').
+
+    Entries can be hosts ('vimeo.com') or platform names from the host
+    table ('youtube' allows youtube.com, youtu.be, ...).
+    """
+    hosts = set()
+    for domain in domains:
+        domain = domain.strip().lower()
+        if domain.startswith('www.'):
+            domain = domain[4:]
+        if not domain:
+            continue
+        platform_hosts = [h for h, platform in PLATFORM_HOSTS.items() if platform == domain]
+        hosts.update(platform_hosts or [domain])
+    return frozenset(hosts)
@@ -30,9 +30,12 @@ const statusMessage = document.getElementById('status-message');
 const progressBar = document.getElementById('progress-bar');
 const progressFill = document.getElementById('progress-fill');
 const downloadTypeRadios = document.querySelectorAll('input[name="download-type"]');
+const clipStartInput = document.getElementById('clip-start');
+const clipEndInput = document.getElementById('clip-end');
 
 let currentVideoInfo = null;
 let currentUrl = '';
+let formatsRequest = null;
 
 // Initialize
 document.addEventListener('DOMContentLoaded', () => {
@@ -57,14 +60,20 @@ function setupEventListeners() {
     formatSelect.addEventListener('change', () => {
         // Format selection changed
     });
+
+    // The format list needs a full extraction - only fetch it when the
+    // user actually opens the quality selector
+    formatSelect.addEventListener('focus', loadFormats);
+    formatSelect.addEventListener('mousedown', loadFormats);
 }
 
 async function checkServerHealth() {
     try {
-        console.log('Checking server health at:', API_BASE_URL.replace('/api', '/api/health'));
-        const response = await fetch(`${API_BASE_URL.replace('/api', '/api/health')}`);
+        const healthUrl = API_BASE_URL.replace('/api', '/api/health/ready');
+        console.log('Checking server health at:', healthUrl);
+        const response = await fetch(healthUrl);
         const data = await response.json();
-        if (data.status === 'healthy') {
+        if (data.status === 'ready') {
             console.log('✅ Server is online');
         } else {
             console.warn('Server health check returned:', data);
@@ -100,13 +109,8 @@ async function handleValidate() {
         console.log('Validating URL:', url);
         console.log('API Base URL:', API_BASE_URL);
         
-        const response = await fetch(`${API_BASE_URL}/validate`, {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-            },
-            body: JSON.stringify({ url }),
-        });
+        // Cheap probe: title, thumbnail and "is this supported" only
+        const response = await fetch(`${API_BASE_URL}/info?tier=probe&url=${encodeURIComponent(url)}`);
 
         console.log('Response status:', response.status);
         
@@ -121,6 +125,7 @@ async function handleValidate() {
 
         if (data.valid) {
             currentVideoInfo = data.video_info;
+            formatsRequest = null;
             showVideoInfo(data.video_info);
             populateFormatSelect(data.video_info.formats || []);
             downloadBtn.disabled = false;
@@ -152,7 +157,11 @@ function showVideoInfo(info) {
     const uploader = info.uploader || 'Unknown';
     videoMeta.textContent = `${uploader} • ${duration}`;
     
-    if (info.thumbnail) {
+    if (info.thumbnail_proxy) {
+        // Resized copy from our cache (works for hotlink-protected platforms)
+        videoThumbnail.src = `${API_BASE_URL.replace('/api', '')}${info.thumbnail_proxy}`;
+        videoThumbnail.style.display = 'block';
+    } else if (info.thumbnail) {
         videoThumbnail.src = info.thumbnail;
         videoThumbnail.style.display = 'block';
     } else {
@@ -182,11 +191,48 @@ function populateFormatSelect(formats) {
         option.textContent = `${format.resolution || 'Unknown'}${size}`;
         
         formatSelect.appendChild(option);
+
+        // Offer the cheaper-to-deliver variant when it differs from the best one
+        if (format.fast_format_id && format.fast_format_id !== format.format_id) {
+            const fastOption = document.createElement('option');
+            fastOption.value = format.fast_format_id;
+            const fastSize = format.fast_filesize ? ` (${formatFileSize(format.fast_filesize)})` : '';
+            fastOption.textContent = `${format.resolution || 'Unknown'} - fastest${fastSize}`;
+            formatSelect.appendChild(fastOption);
+        }
     });
 }
 
+function loadFormats() {
+    // Already loaded (or loading) for this URL
+    if (!currentUrl || formatsRequest) {
+        return;
+    }
+
+    const url = currentUrl;
+    formatsRequest = fetch(`${API_BASE_URL}/info?tier=formats&url=${encodeURIComponent(url)}`)
+        .then(response => response.json())
+        .then(data => {
+            if (url !== currentUrl) {
+                return;
+            }
+            if (data.valid && data.video_info) {
+                currentVideoInfo = data.video_info;
+                populateFormatSelect(data.video_info.formats || []);
+            } else {
+                // Keep "Best Quality" and allow a retry on next open
+                formatsRequest = null;
+            }
+        })
+        .catch(error => {
+            console.error('Failed to load formats:', error);
+            formatsRequest = null;
+        });
+}
+
 function handleDownloadTypeChange() {
-    const isAudio = document.querySelector('input[name="download-type"]:checked').value === 'audio';
+    const downloadType = document.querySelector('input[name="download-type"]:checked').value;
+    const isAudio = downloadType === 'audio' || downloadType === 'mp3';
     
     if (isAudio) {
         formatSelect.style.display = 'none';
@@ -204,8 +250,13 @@ async function handleDownload() {
     }
 
     const downloadType = document.querySelector('input[name="download-type"]:checked').value;
-    const audioOnly = downloadType === 'audio';
+    const audioOnly = downloadType === 'audio' || downloadType === 'mp3';
+    // "Audio Only" keeps the platform's native audio; only MP3 re-encodes
+    const audioFormat = downloadType === 'mp3' ? 'mp3' : 'native';
     const formatId = audioOnly ? null : formatSelect.value;
+    // Optional clip range - only the needed part is downloaded
+    const clipStart = clipStartInput.value.trim() || null;
+    const clipEnd = clipEndInput.value.trim() || null;
 
     downloadBtn.disabled = true;
     downloadBtn.textContent = 'Downloading...';
@@ -224,6 +275,9 @@ async function handleDownload() {
                 url: currentUrl,
                 format_id: formatId,
                 audio_only: audioOnly,
+                audio_format: audioFormat,
+                start: clipStart,
+                end: clipEnd,
             }),
         });
 
@@ -238,7 +292,7 @@ async function handleDownload() {
             // Wait a bit then show success
             setTimeout(() => {
                 showStatus('success', `Download complete! File: ${data.filename}`);
-                downloadFile(data.download_url, data.filename);
+                downloadFile(data.download_url, data.filename, data.delivery);
                 downloadBtn.disabled = false;
                 downloadBtn.textContent = 'Download';
             }, 2000);
@@ -268,9 +322,16 @@ function simulateProgress() {
     }, 200);
 }
 
-function downloadFile(downloadUrl, filename) {
+function downloadFile(downloadUrl, filename, delivery) {
     const link = document.createElement('a');
-    link.href = `${API_BASE_URL.replace('/api', '')}${downloadUrl}`;
+    if (delivery === 'direct') {
+        // Platform media URL - fetched straight from the CDN
+        link.href = downloadUrl;
+        link.target = '_blank';
+        link.rel = 'noopener';
+    } else {
+        link.href = `${API_BASE_URL.replace('/api', '')}${downloadUrl}`;
+    }
     link.download = filename;
     document.body.appendChild(link);
     link.click();
@@ -14,12 +14,54 @@ bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
 backlog = 2048
 
 # Worker processes
-workers = multiprocessing.cpu_count() * 2 + 1
-worker_class = 'sync'
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+# Threaded workers so each process can queue downloads in its scheduler.
+# A queued download holds its request thread, so a worker needs clearly
+# more threads than download slots: otherwise the scheduler never sees a
+# real queue (only requests that got a thread can wait in it) and pages,
+# health checks and API calls block behind downloads.
+worker_class = 'gthread'
+download_slots = int(os.getenv('SCHEDULER_MAX_CONCURRENT', 4))
+MIN_FREE_THREADS = 4  # Threads always left for non-download traffic
+threads = int(os.getenv('GUNICORN_THREADS', download_slots * 2 + MIN_FREE_THREADS))
+if threads < download_slots + MIN_FREE_THREADS:
+    raise ValueError(
+        f"GUNICORN_THREADS={threads} is too low for SCHEDULER_MAX_CONCURRENT={download_slots}: "
+        f"use at least {download_slots + MIN_FREE_THREADS} so downloads can queue without "
+        f"blocking other requests"
+    )
 worker_connections = 1000
 timeout = 120
 keepalive = 5
 
+# Worker recycling
+# Long-lived workers fragment their heap (big extractions, thumbnails), so
+# RSS only grows. Restart each worker after max_requests (jittered so they
+# don't all restart at once), and right away once its RSS passes
+# MAX_WORKER_RSS_MB. Running requests finish first (graceful_timeout);
+# downloads cut off after that are resumed from the job store.
+max_requests = int(os.getenv('MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.getenv('MAX_REQUESTS_JITTER', 100))
+MAX_WORKER_RSS_MB = int(os.getenv('MAX_WORKER_RSS_MB', 512))  # 0 = no RSS limit
+
+
+def _rss_mb():
+    """Current resident set size of this process (0 where /proc isn't available)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def post_request(worker, req, environ, resp):
+    if not MAX_WORKER_RSS_MB or not worker.alive:
+        return
+    rss = _rss_mb()
+    if rss > MAX_WORKER_RSS_MB:
+        worker.log.info("Worker RSS %.0fMB over %dMB, recycling", rss, MAX_WORKER_RSS_MB)
+        worker.alive = False
+
 # Logging
 accesslog = '-'
 errorlog = '-'
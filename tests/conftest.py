@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Make `backend` importable when running plain `pytest` from anywhere
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
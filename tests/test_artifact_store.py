@@ -0,0 +1,131 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import backend.app as app_module
+import backend.artifact_store as artifact_store_module
+from backend.artifact_store import LocalArtifactStore, S3ArtifactStore, ClientError, create_artifact_store
+from backend.cluster import Cluster
+
+
+class FakeS3:
+    """In-memory stand-in for the few boto3 S3 client calls the store makes."""
+
+    def __init__(self):
+        self.objects = {}
+
+    def upload_file(self, filename, bucket, key, ExtraArgs=None):
+        with open(filename, 'rb') as f:
+            self.objects[(bucket, key)] = (f.read(), ExtraArgs['ContentType'])
+
+    def head_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise ClientError({'Error': {'Code': '404'}}, 'HeadObject')
+        return {}
+
+    def generate_presigned_url(self, operation, Params, ExpiresIn):
+        return f"https://s3.example.com/{Params['Bucket']}/{Params['Key']}?expires={ExpiresIn}"
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop((Bucket, Key), None)
+
+
+@pytest.fixture
+def s3_store():
+    return S3ArtifactStore(bucket='media', prefix='downloads/', client=FakeS3())
+
+
+def test_s3_put_uploads_and_removes_the_local_copy(s3_store, tmp_path):
+    path = tmp_path / 'video.mp4'
+    path.write_bytes(b'data')
+    assert s3_store.put(path, 'video [abc].mp4') == 'video [abc].mp4'
+    assert s3_store.client.objects[('media', 'downloads/video [abc].mp4')] == (b'data', 'video/mp4')
+    assert not path.exists()
+    assert s3_store.exists('video [abc].mp4')
+    assert s3_store.local_path('video [abc].mp4') is None
+
+
+def test_s3_miss_and_delete(s3_store, tmp_path):
+    assert not s3_store.exists('missing.mp4')
+    path = tmp_path / 'a.mp3'
+    path.write_bytes(b'x')
+    s3_store.put(path)
+    s3_store.delete('a.mp3')
+    assert not s3_store.exists('a.mp3')
+
+
+def test_s3_url_is_presigned(s3_store):
+    assert s3_store.url('a b.mp4') == f"https://s3.example.com/media/downloads/a b.mp4?expires={artifact_store_module.S3_URL_TTL}"
+
+
+def test_s3_needs_a_bucket():
+    with pytest.raises(Exception, match='S3_BUCKET'):
+        S3ArtifactStore(bucket='', client=FakeS3())
+
+
+def test_local_store(tmp_path):
+    store = LocalArtifactStore(tmp_path / 'downloads')
+    work = tmp_path / 'work'
+    work.mkdir()
+    (work / 'clip.mp4').write_bytes(b'data')
+    assert store.put(work / 'clip.mp4', 'clip [abc].mp4') == 'clip [abc].mp4'
+    assert store.exists('clip [abc].mp4') and not store.exists('clip.mp4')
+    assert store.local_path('clip [abc].mp4').read_bytes() == b'data'
+    assert store.url('clip [abc].mp4') is None
+
+
+def test_local_store_is_the_default(monkeypatch):
+    monkeypatch.setattr(artifact_store_module, 'ARTIFACT_STORE', 'local')
+    assert isinstance(create_artifact_store(), LocalArtifactStore)
+
+
+def test_file_endpoint_redirects_to_s3_or_404s(s3_store, tmp_path, monkeypatch):
+    monkeypatch.setattr(app_module, 'artifact_store', s3_store)
+    path = tmp_path / 'video.mp4'
+    path.write_bytes(b'data')
+    s3_store.put(path)
+    client = app_module.app.test_client()
+
+    response = client.get('/api/file/video.mp4')
+    assert response.status_code == 302
+    assert response.headers['Location'].startswith('https://s3.example.com/media/downloads/video.mp4')
+    assert client.get('/api/file/missing.mp4').status_code == 404
+
+
+class NodeHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != '/api/file/remote.mp4':
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'video/mp4')
+        self.send_header('Content-Length', '6')
+        self.end_headers()
+        self.wfile.write(b'remote')
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def other_node():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), NodeHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_local_store_falls_back_to_the_node_that_has_the_file(other_node, monkeypatch):
+    monkeypatch.setattr(app_module, 'cluster', Cluster({'a': 'http://127.0.0.1:1', 'b': other_node}, node_id='a'))
+    client = app_module.app.test_client()
+
+    response = client.get('/api/file/remote.mp4?node=b')
+    assert response.status_code == 200
+    assert response.get_data() == b'remote'
+    assert response.headers['Content-Disposition'] == "attachment; filename*=UTF-8''remote.mp4"
+    assert client.get('/api/file/gone.mp4?node=b').status_code == 404
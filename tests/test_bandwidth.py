@@ -0,0 +1,77 @@
+import time
+
+import pytest
+
+import backend.bandwidth as bandwidth_module
+from backend.bandwidth import BandwidthShaper, ThroughputMeter, TokenBucket, CLASS_FILE, CLASS_DOWNLOAD
+
+
+def test_unlimited_bucket_never_waits():
+    bucket = TokenBucket(0)
+    started = time.monotonic()
+    bucket.consume(10 ** 9)
+    assert time.monotonic() - started < 0.05
+
+
+def test_burst_is_free_and_debt_is_slept_off():
+    bucket = TokenBucket(10_000)
+    started = time.monotonic()
+    bucket.consume(10_000)
+    assert time.monotonic() - started < 0.05
+    bucket.consume(2_000)
+    assert time.monotonic() - started == pytest.approx(0.2, abs=0.08)
+
+
+def test_global_limit_is_split_and_keeps_the_interactive_reserve():
+    assert BandwidthShaper(0, 10_000_000, 2_000_000, workers=4).bulk.rate == 2_000_000
+    # A reserve larger than the limit still leaves 10% for bulk traffic
+    assert BandwidthShaper(0, 10_000_000, 20_000_000, workers=1).bulk.rate == 1_000_000
+    assert not BandwidthShaper(0, 0, 2_000_000, workers=4).shaping
+
+
+def test_throttle_limits_each_client(monkeypatch):
+    slept = []
+    monkeypatch.setattr(bandwidth_module.time, 'sleep', slept.append)
+    shaper = BandwidthShaper(client_limit=1000, global_limit=0, interactive_reserve=0, workers=1)
+    assert list(shaper.throttle([b'x' * 1000, b'x' * 500], 'a', CLASS_FILE)) == [b'x' * 1000, b'x' * 500]
+    assert slept and sum(slept) == pytest.approx(0.5, abs=0.05)
+
+    # Another client has its own bucket
+    slept.clear()
+    list(shaper.throttle([b'x' * 1000], 'b', CLASS_FILE))
+    assert not slept
+
+
+def test_throttle_closes_the_source():
+    class Source:
+        closed = False
+
+        def __iter__(self):
+            yield b'chunk'
+
+        def close(self):
+            self.closed = True
+
+    source = Source()
+    stream = BandwidthShaper(0, 0, 0, workers=1).throttle(source, 'a', CLASS_FILE)
+    next(stream)
+    stream.close()
+    assert source.closed
+
+
+def test_client_buckets_are_capped(monkeypatch):
+    monkeypatch.setattr(bandwidth_module, 'MAX_CLIENT_BUCKETS', 3)
+    shaper = BandwidthShaper(client_limit=1000, global_limit=0, interactive_reserve=0, workers=1)
+    for n in range(5):
+        shaper._client_bucket(f"client{n}")
+    assert list(shaper._clients) == ['client2', 'client3', 'client4']
+
+
+def test_meter_reports_totals_per_class():
+    meter = ThroughputMeter()
+    meter.record(CLASS_DOWNLOAD, 5000)
+    meter.record(CLASS_DOWNLOAD, 5000)
+    meter.record(CLASS_FILE, 100)
+    stats = meter.stats()
+    assert stats[CLASS_DOWNLOAD] == {'bytes_total': 10_000, 'bytes_per_second': 1000}
+    assert stats[CLASS_FILE]['bytes_total'] == 100
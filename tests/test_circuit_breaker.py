@@ -0,0 +1,33 @@
+import time
+
+from backend.circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+
+
+def test_opens_after_threshold():
+    breaker = CircuitBreaker(failure_threshold=2, cooldown=60)
+    breaker.record_failure('youtube')
+    assert breaker.state('youtube') == CLOSED
+    breaker.record_failure('youtube')
+    assert breaker.state('youtube') == OPEN
+    assert breaker.retry_after('youtube') > 0
+
+
+def test_half_open_failure_reopens():
+    breaker = CircuitBreaker(failure_threshold=3, cooldown=60)
+    for _ in range(3):
+        breaker.record_failure('youtube')
+    breaker._opened_at['youtube'] = time.time() - 61
+    assert breaker.state('youtube') == HALF_OPEN
+    assert breaker.retry_after('youtube') == 0
+
+    breaker.record_failure('youtube')
+    assert breaker.state('youtube') == OPEN
+
+
+def test_success_closes():
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=60)
+    breaker.record_failure('youtube')
+    breaker._opened_at['youtube'] = time.time() - 61
+    breaker.record_success('youtube')
+    assert breaker.state('youtube') == CLOSED
+    assert breaker.stats() == {}
@@ -0,0 +1,118 @@
+"""Tests for hedged player-client racing."""
+
+import threading
+import time
+
+import pytest
+
+from backend.client_selector import ClientSelector
+
+
+@pytest.fixture
+def selector():
+    return ClientSelector(clients={'youtube': ['a', 'b', 'c']}, hedge_delay=0.05, latency_budget=2, max_parallel=3)
+
+
+def extract_threads():
+    return [t for t in threading.enumerate() if t.name.startswith('extract')]
+
+
+def test_last_success_is_tried_first(selector):
+    selector.record('youtube', 'c', True)
+    assert selector.ranked('youtube')[0] == 'c'
+    assert selector.ranked('vimeo') == [None]
+
+
+def test_slow_client_is_hedged_and_losers_are_flagged(selector):
+    calls = []
+    release = threading.Event()
+
+    def attempt(client, budget, hedged, decided):
+        calls.append((client, hedged))
+        if client == 'a':
+            release.wait(2)
+            return 'slow'
+        return client
+
+    assert selector.run('youtube', attempt) == 'b'
+    release.set()
+    assert calls[0] == ('a', False)
+    assert calls[1] == ('b', True)
+    assert selector.best('youtube') == 'b'
+
+
+def test_running_loser_is_told_the_race_is_decided(selector):
+    seen = []
+    done = threading.Event()
+
+    def attempt(client, budget, hedged, decided):
+        if client == 'a':
+            seen.append(decided.wait(2))
+            done.set()
+            return 'late'
+        return client
+
+    assert selector.run('youtube', attempt) == 'b'
+    assert done.wait(2)
+    assert seen == [True]
+
+
+def test_queued_attempts_are_dropped_once_decided():
+    selector = ClientSelector(clients={'youtube': ['a', 'b', 'c']}, hedge_delay=0.05, latency_budget=2,
+                              max_parallel=3, max_workers=1)
+    calls = []
+
+    def attempt(client, budget, hedged, decided):
+        calls.append(client)
+        # Holds the only thread while b and c are queued behind it
+        time.sleep(0.3)
+        return client
+
+    assert selector.run('youtube', attempt) == 'a'
+    time.sleep(0.1)
+    assert calls == ['a']
+
+
+def test_budget_shrinks_for_later_attempts(selector):
+    budgets = []
+
+    def attempt(client, budget, hedged, decided):
+        budgets.append(budget)
+        raise Exception('HTTP Error 403')
+
+    with pytest.raises(Exception, match='403'):
+        selector.run('youtube', attempt)
+    assert len(budgets) == 3
+    assert budgets[0] >= budgets[-1]
+
+
+def test_final_error_stops_the_race(selector):
+    calls = []
+
+    def attempt(client, budget, hedged, decided):
+        calls.append(client)
+        raise Exception('Private video')
+
+    with pytest.raises(Exception, match='Private'):
+        selector.run('youtube', attempt)
+    assert calls == ['a']
+
+
+def test_threads_are_bounded_and_freed_by_stopped_losers():
+    selector = ClientSelector(clients={'youtube': ['a', 'b', 'c']}, hedge_delay=0.05, latency_budget=0.5,
+                              max_parallel=3, max_workers=2)
+    before = len(extract_threads())
+
+    def stuck(client, budget, hedged, decided):
+        # Gives up as soon as the race is over
+        decided.wait(5)
+        raise Exception('timed out')
+
+    for _ in range(5):
+        with pytest.raises(Exception, match='timed out after'):
+            selector.run('youtube', stuck)
+        assert len(extract_threads()) - before <= 2
+
+    started = time.monotonic()
+    assert selector.run('youtube', lambda client, budget, hedged, decided: 'ok') == 'ok'
+    assert time.monotonic() - started < 0.5
@@ -0,0 +1,35 @@
+import pytest
+
+from backend.download_service import DownloadService
+from backend.info_cache import info_cache
+from backend.job_store import JobStore
+
+
+@pytest.mark.parametrize('start, end, fraction', [
+    (None, None, 1.0),
+    (0, 60, 0.1),
+    (540, None, 0.1),
+    (300, 900, 0.5),   # end past the duration
+    (700, 800, 0.0),   # starts after the end of the media
+])
+def test_clip_fraction(start, end, fraction):
+    assert DownloadService._clip_fraction(600, start, end) == pytest.approx(fraction)
+
+
+def test_clip_fraction_without_duration():
+    assert DownloadService._clip_fraction(None, 10, 20) == 1.0
+
+
+def test_clip_cost_is_the_clipped_share():
+    service = DownloadService()
+    info_cache.set('https://example.com/ten-minutes', {'duration': 600, 'filesize': 600 * 1024 * 1024})
+    assert service.estimate_cost('https://example.com/ten-minutes') == pytest.approx(600)
+    assert service.estimate_cost('https://example.com/ten-minutes', start=60, end=120) == pytest.approx(60)
+
+
+def test_clips_are_separate_jobs():
+    url = 'https://www.youtube.com/watch?v=dQw4w9WgXcQ'
+    full = JobStore.job_key(url, None, False)
+    clip = JobStore.job_key(url, None, False, {'start': 10.0, 'end': 20.0})
+    other_clip = JobStore.job_key(url, None, False, {'start': 10.0, 'end': 30.0})
+    assert len({full, clip, other_clip}) == 3
@@ -0,0 +1,85 @@
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import backend.cluster as cluster_module
+from backend.cluster import Cluster, NodeUnreachable
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == '/slow':
+            time.sleep(2)
+        if self.headers.get('If-None-Match') == '"abc"':
+            self.send_response(304)
+            self.send_header('ETag', '"abc"')
+            self.end_headers()
+            return
+        body = b'{"status": "success"}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('ETag', '"abc"')
+        self.send_header('Cache-Control', 'private, max-age=60')
+        self.send_header('Content-Disposition', 'attachment; filename="a.srt"')
+        self.send_header('X-Internal', 'not forwarded')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def owner():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def make_cluster(owner_url: str) -> Cluster:
+    return Cluster({'a': 'http://127.0.0.1:1', 'b': owner_url}, node_id='a')
+
+
+def test_response_headers_pass_through(owner):
+    status, headers, body = make_cluster(owner).forward('b', 'GET', '/info', None, {})
+    assert status == 200
+    assert body == b'{"status": "success"}'
+    assert headers == {
+        'Content-Type': 'application/json',
+        'ETag': '"abc"',
+        'Cache-Control': 'private, max-age=60',
+        'Content-Disposition': 'attachment; filename="a.srt"',
+    }
+
+
+def test_not_modified_is_passed_on(owner):
+    status, headers, body = make_cluster(owner).forward('b', 'GET', '/info', None, {'If-None-Match': '"abc"'})
+    assert status == 304
+    assert headers['ETag'] == '"abc"'
+    assert body == b''
+
+
+def test_connect_failure_is_unreachable():
+    dead = f"http://127.0.0.1:{free_port()}"
+    with pytest.raises(NodeUnreachable):
+        make_cluster(dead).forward('b', 'GET', '/info', None, {})
+
+
+def test_read_timeout_is_not_unreachable(owner, monkeypatch):
+    monkeypatch.setattr(cluster_module, 'CLUSTER_FORWARD_TIMEOUT', 0.5)
+    with pytest.raises(Exception) as raised:
+        make_cluster(owner).forward('b', 'GET', '/slow', None, {})
+    assert not isinstance(raised.value, NodeUnreachable)
@@ -0,0 +1,92 @@
+"""Tests for format listing and the direct-URL delivery checks."""
+
+import pytest
+import yt_dlp
+
+from backend.download_service import DownloadService
+from backend.info_cache import info_cache
+
+VIDEO_ONLY = {'format_id': '137', 'vcodec': 'avc1', 'acodec': 'none'}
+AUDIO_ONLY = {'format_id': '140', 'vcodec': 'none', 'acodec': 'mp4a.40.2'}
+MUXED = {'format_id': '18', 'vcodec': 'avc1', 'acodec': 'mp4a.40.2'}
+
+
+def test_explicit_pair_always_merges():
+    assert DownloadService()._will_merge('https://example.com/uncached', '137+140/best')
+
+
+def test_single_format_never_merges():
+    service = DownloadService()
+    assert not service._will_merge('https://example.com/uncached', '18/best')
+    assert not service._will_merge('https://example.com/uncached', 'bestaudio[ext=m4a]/bestaudio/best')
+
+
+def test_default_selector_without_cached_info_merges():
+    assert DownloadService()._will_merge('https://example.com/never-seen', 'bestvideo+bestaudio/best')
+
+
+def test_default_selector_uses_cached_formats():
+    service = DownloadService()
+    info_cache.set('https://example.com/dash', {'formats': [VIDEO_ONLY, AUDIO_ONLY, MUXED]})
+    info_cache.set('https://example.com/progressive', {'formats': [MUXED]})
+    assert service._will_merge('https://example.com/dash', 'bestvideo+bestaudio/best')
+    assert not service._will_merge('https://example.com/progressive', 'bestvideo+bestaudio/best')
+    # Instagram-style "<id>+bestaudio" falls back to the file itself without an audio stream
+    assert not service._will_merge('https://example.com/progressive', '18+bestaudio/best')
+
+
+def test_listed_audio_option_is_the_m4a_an_audio_download_picks():
+    opus = {'format_id': '251', 'ext': 'webm', 'vcodec': 'none', 'acodec': 'opus', 'abr': 160}
+    m4a = {'format_id': '140', 'ext': 'm4a', 'vcodec': 'none', 'acodec': 'mp4a.40.2', 'abr': 129}
+    formats = DownloadService()._extract_formats({'formats': [opus, m4a]})
+    assert formats[-1]['resolution'] == 'audio only'
+    assert formats[-1]['format_id'] == '140'
+
+
+def progressive_info(**extra):
+    info = {'id': 'abc', 'title': 'Clip', 'ext': 'mp4', 'protocol': 'https', 'vcodec': 'avc1', 'acodec': 'mp4a.40.2',
+            'url': 'https://media.example.com/clip.mp4', 'http_headers': {'User-Agent': 'Mozilla/5.0'}}
+    info.update(extra)
+    return info
+
+
+def test_direct_url_is_handed_out(monkeypatch):
+    monkeypatch.setattr(yt_dlp.YoutubeDL, 'extract_info', lambda self, url, download=False: progressive_info())
+    result = DownloadService().resolve_direct_url('https://example.com/progressive-clip', format_id='18')
+    assert result['delivery'] == 'direct'
+    assert result['media_url'] == 'https://media.example.com/clip.mp4'
+    assert result['egress'] == 'direct'
+
+
+def test_cookie_bound_url_is_downloaded_on_the_server(monkeypatch):
+    info = progressive_info(cookies='SID=secret; Domain=.example.com; Path=/; Secure')
+    monkeypatch.setattr(yt_dlp.YoutubeDL, 'extract_info', lambda self, url, download=False: info)
+    assert DownloadService().resolve_direct_url('https://example.com/cookie-clip', format_id='18') is None
+
+
+def test_cost_of_a_selector_with_an_unknown_size_part():
+    service = DownloadService()
+    audio = {'format_id': '140', 'vcodec': 'none', 'acodec': 'mp4a.40.2', 'filesize': 3 * 1024 * 1024}
+    av1 = {'format_id': '399', 'vcodec': 'av01', 'acodec': 'none'}
+    info_cache.set('https://example.com/two-hours', {'duration': 7200, 'formats': [av1, audio]})
+    info_cache.set('https://example.com/two-hours-tbr', {'duration': 7200, 'formats': [dict(av1, tbr=2000), audio]})
+
+    # No size and no bitrate: the duration estimate, not just the 3MB of audio
+    assert service.estimate_cost('https://example.com/two-hours', '399+140') == pytest.approx(
+        service.estimate_cost('https://example.com/two-hours'))
+    assert service.estimate_cost('https://example.com/two-hours', '399+140') > 1000
+    # Bitrate known: 2000 kbps for 2h plus the audio
+    assert service.estimate_cost('https://example.com/two-hours-tbr', '399+140') == pytest.approx(
+        (2000 * 1000 / 8 * 7200 + 3 * 1024 * 1024) / 1024 / 1024)
+    # Both sizes known
+    assert service.estimate_cost('https://example.com/two-hours', '140') == pytest.approx(3)
+
+
+def test_native_audio_is_a_stream_copy():
+    options = DownloadService()._build_ydl_options('https://www.youtube.com/watch?v=dQw4w9WgXcQ', audio_only=True)
+    assert options['format'] == 'bestaudio[ext=m4a]/bestaudio/best'
+    assert options['postprocessors'] == [{'key': 'FFmpegExtractAudio', 'preferredcodec': 'best'}]
+
+
+def test_mp3_is_never_delivered_directly():
+    assert DownloadService().resolve_direct_url('https://example.com/song', audio_only=True, audio_format='mp3') is None
@@ -0,0 +1,37 @@
+from backend.format_index import FormatIndex
+
+AV1_1080 = {'format_id': '399', 'ext': 'mp4', 'vcodec': 'av01.0.08M.08', 'acodec': 'none',
+            'height': 1080, 'width': 1920, 'tbr': 2500}
+VP9_1080 = {'format_id': '248', 'ext': 'webm', 'vcodec': 'vp9', 'acodec': 'none',
+            'height': 1080, 'width': 1920, 'tbr': 2200, 'filesize': 400_000_000}
+AVC_1080 = {'format_id': '137', 'ext': 'mp4', 'vcodec': 'avc1.640028', 'acodec': 'none',
+            'height': 1080, 'width': 1920, 'tbr': 1800, 'filesize': 350_000_000}
+AVC_1080_NO_SIZE = {'format_id': '299', 'ext': 'mp4', 'vcodec': 'avc1.64002a', 'acodec': 'none',
+                    'height': 1080, 'width': 1920, 'tbr': 3000}
+M4A = {'format_id': '140', 'ext': 'm4a', 'vcodec': 'none', 'acodec': 'mp4a.40.2', 'abr': 129, 'filesize': 3_000_000}
+OPUS = {'format_id': '251', 'ext': 'webm', 'vcodec': 'none', 'acodec': 'opus', 'abr': 160, 'filesize': 3_500_000}
+
+
+def test_best_prefers_compatible_codec_over_bitrate():
+    index = FormatIndex([AV1_1080, VP9_1080, AVC_1080, M4A, OPUS])
+    [entry] = index.to_list()
+    assert entry['format_id'] == '137+140'
+    assert not entry['needs_reencode']
+    assert entry['filesize'] == 353_000_000
+
+
+def test_known_size_beats_bitrate_for_the_same_codec():
+    index = FormatIndex([AVC_1080_NO_SIZE, AVC_1080, M4A])
+    assert index.best('1920x1080')['format_id'] == '137'
+
+
+def test_bitrate_breaks_remaining_ties():
+    faster = dict(AVC_1080, format_id='136', tbr=2000)
+    index = FormatIndex([AVC_1080, faster, M4A])
+    assert index.best('1920x1080')['format_id'] == '136'
+
+
+def test_best_audio_prefers_m4a_when_asked():
+    index = FormatIndex([M4A, OPUS])
+    assert index.best_audio()['format_id'] == '251'
+    assert index.best_audio(prefer_ext='m4a')['format_id'] == '140'
@@ -0,0 +1,24 @@
+import backend.app as app_module
+
+
+def test_health_reports_the_directory_and_readiness_separately(monkeypatch):
+    monkeypatch.setattr(app_module, '_readiness', {'checked_at': 0, 'ready': False, 'body': b''})
+
+    def broken(job_id):
+        raise Exception('database is locked')
+
+    monkeypatch.setattr(app_module.job_store, 'get', broken)
+    client = app_module.app.test_client()
+
+    data = client.get('/api/health').get_json()
+    assert data['downloads_dir_exists'] is True
+    assert data['ready'] is False
+    assert data['status'] == 'unhealthy'
+
+    ready = client.get('/api/health/ready')
+    assert ready.status_code == 503
+    assert ready.get_json()['checks'] == {'downloads_dir': True, 'job_store': False}
+
+
+def test_liveness_does_no_checks():
+    assert app_module.app.test_client().get('/api/health/live').status_code == 200
@@ -0,0 +1,72 @@
+from backend.info_projection import slim_info, iter_entries
+
+RAW = {
+    'id': 'abc',
+    'title': 'Video',
+    'duration': 212,
+    'uploader': None,
+    'description': 'Text',
+    'http_headers': {'User-Agent': 'Mozilla/5.0'},
+    'requested_formats': [{'format_id': '137'}],
+    'formats': [
+        {'format_id': '137', 'ext': 'mp4', 'vcodec': 'avc1', 'acodec': 'none', 'height': 1080, 'tbr': 4000,
+         'url': 'https://media.example.com/137', 'fragments': [{'path': 'seg1'}], 'downloader_options': {}},
+        {'ext': 'mhtml', 'url': 'https://media.example.com/storyboard'},
+    ],
+    'chapters': [{'title': 'Intro', 'start_time': 0, 'end_time': 10, 'extra': 1}],
+    'subtitles': {
+        'en': [
+            {'ext': 'json3', 'url': 'https://subs.example.com/en.json3'},
+            {'ext': 'vtt', 'url': 'https://subs.example.com/en.vtt', 'name': 'English'},
+            {'ext': 'srt'},
+        ],
+        'de': [{'ext': 'ttml', 'url': 'https://subs.example.com/de.ttml'}],
+    },
+    'automatic_captions': {'fr': [{'ext': 'srv3', 'url': 'https://subs.example.com/fr.srv3'}]},
+}
+
+
+def test_only_used_fields_are_kept():
+    slim = slim_info(RAW)
+    assert slim['id'] == 'abc' and slim['duration'] == 212
+    # None values and fields we never read are dropped
+    assert 'uploader' not in slim
+    assert 'http_headers' not in slim and 'requested_formats' not in slim
+    assert slim['formats'] == [
+        {'format_id': '137', 'ext': 'mp4', 'vcodec': 'avc1', 'acodec': 'none', 'height': 1080, 'tbr': 4000},
+    ]
+    assert slim['chapters'] == [{'title': 'Intro', 'start_time': 0, 'end_time': 10}]
+
+
+def test_only_servable_subtitle_tracks_are_kept():
+    slim = slim_info(RAW)
+    assert slim['subtitles'] == {'en': [{'url': 'https://subs.example.com/en.vtt', 'ext': 'vtt'}]}
+    assert 'automatic_captions' not in slim
+
+
+def test_slim_info_is_idempotent():
+    slim = slim_info(RAW)
+    again = slim_info(slim)
+    assert again == slim
+    assert again is not slim
+
+
+def test_entries_are_pulled_lazily_up_to_the_limit():
+    pulled = []
+
+    def entries():
+        for i in range(1000):
+            pulled.append(i)
+            yield {'id': str(i), 'title': f"Entry {i}", 'url': f"https://example.com/{i}", 'formats': [{}]}
+
+    kept = list(iter_entries({'entries': entries()}, limit=3))
+    assert [e['id'] for e in kept] == ['0', '1', '2']
+    assert 'formats' not in kept[0]
+    assert pulled == [0, 1, 2]
+
+
+def test_missing_entries_are_skipped_and_playlists_keep_an_entry_list():
+    slim = slim_info({'_type': 'playlist', 'title': 'List', 'entries': [None, {'id': 'a'}]})
+    assert slim['entries'] == [{'id': 'a'}]
+    assert slim_info({'_type': 'playlist', 'entries': []})['entries'] == []
+    assert 'entries' not in slim_info({'title': 'Video'})
@@ -0,0 +1,143 @@
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+from backend.job_store import JobStore, STATUS_DOWNLOADING, STATUS_INTERRUPTED, STATUS_FINISHED
+
+URL = 'https://www.youtube.com/watch?v=dQw4w9WgXcQ'
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(tmp_path / 'jobs.db')
+
+
+def dead_pid() -> int:
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+def set_owner(store, job_id, owner, updated_at=None):
+    with store._connect() as conn:
+        conn.execute('UPDATE jobs SET owner = ?, updated_at = ? WHERE id = ?',
+                     (owner, updated_at or time.time(), job_id))
+
+
+def test_url_variants_share_a_job():
+    assert JobStore.job_key(URL, None, False) == JobStore.job_key('https://youtu.be/dQw4w9WgXcQ?si=abc', None, False)
+    assert JobStore.job_key(URL, None, False) != JobStore.job_key(URL, None, True)
+    assert JobStore.job_key(URL, None, True, {'audio_format': 'mp3'}) != JobStore.job_key(URL, None, True)
+
+
+def test_same_download_is_not_started_twice(store):
+    job, owned = store.start(URL, '18', False, {'audio_format': 'native'})
+    assert owned
+    assert job['status'] == STATUS_DOWNLOADING
+    assert job['options'] == {'audio_format': 'native'}
+
+    again, owned = store.start('https://youtu.be/dQw4w9WgXcQ', '18', False, {'audio_format': 'native'})
+    assert not owned
+    assert again['id'] == job['id']
+
+
+def test_job_of_a_dead_local_worker_is_taken_over(store):
+    job, _ = store.start(URL, None, False)
+    set_owner(store, job['id'], f"{socket.gethostname()}:{dead_pid()}")
+    _, owned = store.start(URL, None, False)
+    assert owned
+    assert store.get(job['id'])['owner'] == f"{socket.gethostname()}:{os.getpid()}"
+
+
+def test_quiet_local_worker_is_not_taken_over(store):
+    job, _ = store.start(URL, None, False)
+    # Our own pid is alive, however old the heartbeat
+    set_owner(store, job['id'], f"{socket.gethostname()}:{os.getpid()}", updated_at=time.time() - 10_000)
+    assert store.start(URL, None, False)[1] is False
+
+
+def test_remote_worker_is_judged_by_heartbeat(store):
+    job, _ = store.start(URL, None, False)
+    set_owner(store, job['id'], 'other-host:123')
+    assert store.start(URL, None, False)[1] is False
+    set_owner(store, job['id'], 'other-host:123', updated_at=time.time() - 10_000)
+    assert store.start(URL, None, False)[1] is True
+
+
+def test_finished_and_failed_jobs_can_be_started_again(store):
+    job, _ = store.start(URL, None, False)
+    store.finish(job['id'], {'filename': 'a.mp4'})
+    finished = store.get(job['id'])
+    assert finished['status'] == STATUS_FINISHED
+    assert finished['result'] == {'filename': 'a.mp4'}
+
+    store.fail(job['id'], 'x' * 1000)
+    assert len(store.get(job['id'])['error']) == 500
+    restarted, owned = store.start(URL, None, False)
+    assert owned
+    assert restarted['status'] == STATUS_DOWNLOADING
+    assert restarted['result'] is None and restarted['error'] is None
+
+
+def test_only_interrupted_jobs_can_be_claimed_once(store):
+    job, _ = store.start(URL, None, False)
+    assert not store.claim(job['id'])
+    with store._connect() as conn:
+        conn.execute('UPDATE jobs SET status = ? WHERE id = ?', (STATUS_INTERRUPTED, job['id']))
+    assert [j['id'] for j in store.interrupted_jobs()] == [job['id']]
+    assert store.claim(job['id'])
+    assert not store.claim(job['id'])
+
+
+def test_keep_alive_heartbeats_while_running(store):
+    job, _ = store.start(URL, None, False)
+    set_owner(store, job['id'], f"{socket.gethostname()}:{os.getpid()}", updated_at=1.0)
+    with store.keep_alive(job['id'], interval=0.05):
+        time.sleep(0.2)
+    assert store.get(job['id'])['updated_at'] > time.time() - 5
+
+
+def test_progress_writes_are_throttled(store):
+    job, _ = store.start(URL, None, False)
+    store.update_progress(job['id'], 10, '/tmp/a.part')
+    store.update_progress(job['id'], 20)
+    job = store.get(job['id'])
+    assert job['progress'] == 10
+    assert job['part_path'] == '/tmp/a.part'
+
+
+def test_recover_interrupts_dead_jobs_and_cleans_orphans(store, tmp_path):
+    downloads = tmp_path / 'downloads'
+    work = downloads / '.work'
+    work.mkdir(parents=True)
+
+    dead, _ = store.start(URL, None, False)
+    set_owner(store, dead['id'], f"{socket.gethostname()}:{dead_pid()}")
+    live, _ = store.start(URL, None, True)
+
+    (work / dead['id']).mkdir()
+    (work / dead['id'] / 'video.mp4.part').write_bytes(b'partial')
+    (work / live['id']).mkdir()
+    old_orphan = work / 'gone'
+    old_orphan.mkdir()
+    (old_orphan / 'x.part').write_bytes(b'')
+    young_orphan = work / 'young'
+    young_orphan.mkdir()
+    stray_part = downloads / 'stray.mp4.part'
+    stray_part.write_bytes(b'')
+    long_ago = time.time() - 10 * 86400
+    for path in (old_orphan / 'x.part', old_orphan, stray_part):
+        os.utime(path, (long_ago, long_ago))
+
+    stats = store.recover(downloads, work)
+
+    assert stats == {'interrupted': 1, 'adopted': 2, 'removed': 2}
+    assert store.get(dead['id'])['status'] == STATUS_INTERRUPTED
+    assert store.get(live['id'])['status'] == STATUS_DOWNLOADING
+    assert (work / dead['id'] / 'video.mp4.part').exists()
+    assert not old_orphan.exists() and not stray_part.exists()
+    assert young_orphan.exists()
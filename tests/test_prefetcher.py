@@ -0,0 +1,66 @@
+import pytest
+
+from backend.prefetcher import Prefetcher, SharedBudget, SpaceSaving
+
+URL = 'https://www.youtube.com/watch?v=dQw4w9WgXcQ'
+
+
+class Service:
+    """Just what the prefetcher calls on DownloadService."""
+
+    def __init__(self, existing=None):
+        self.existing = existing
+        self.downloads = []
+
+    def existing_download(self, url):
+        return self.existing
+
+    def download_video(self, url):
+        self.downloads.append(url)
+        return {'status': 'success'}
+
+    def estimate_cost(self, url):
+        return 1.0
+
+
+@pytest.fixture
+def budget(tmp_path):
+    return SharedBudget(tmp_path / 'prefetch.db')
+
+
+def test_finished_download_costs_no_budget(budget):
+    service = Service(existing={'status': 'finished'})
+    prefetcher = Prefetcher(service, budget)
+    for _ in range(5):
+        prefetcher._predownload(URL)
+    assert service.downloads == []
+    assert prefetcher.stats()['skipped_existing'] == 5
+    # The whole budget is still there for URLs that need a download
+    assert budget.take('download', 1)
+
+
+def test_missing_download_takes_budget(budget):
+    service = Service()
+    prefetcher = Prefetcher(service, budget)
+    prefetcher._predownload(URL)
+    assert service.downloads == [URL]
+    assert not budget.take('download', 1)
+
+
+def test_budget_is_shared_and_limited(tmp_path):
+    first = SharedBudget(tmp_path / 'prefetch.db')
+    second = SharedBudget(tmp_path / 'prefetch.db')
+    assert first.take('extract', 2)
+    assert second.take('extract', 2)
+    assert not first.take('extract', 2)
+    assert second.take('download', 2)
+
+
+def test_space_saving_keeps_heavy_hitters():
+    sketch = SpaceSaving(capacity=3)
+    for key in ['hot'] * 10 + ['a', 'b', 'c', 'd', 'e']:
+        sketch.add(key)
+    assert sketch.top(1) == [('hot', 10)]
+    assert len(sketch._counts) == 3
+    assert sketch.decay() == []
+    assert sketch.top(1) == [('hot', 5)]
@@ -0,0 +1,105 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import backend.download_service as download_service_module
+from backend.download_service import DownloadService
+from backend.info_cache import InfoCache, info_cache
+
+
+class Handler(BaseHTTPRequestHandler):
+    requests = []
+
+    def do_GET(self):
+        Handler.requests.append(self.path)
+        if self.path.startswith('/oembed'):
+            body = json.dumps({'title': 'From oEmbed', 'thumbnail_url': 'https://i.example.com/t.jpg',
+                               'author_name': 'Someone'}).encode()
+            content_type = 'application/json'
+        else:
+            body, content_type = b'\x00' * 2048, 'video/mp4'
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_HEAD = do_GET
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    Handler.requests = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_probe_reuses_a_full_extraction_without_network():
+    url = 'https://example.com/already-extracted'
+    info_cache.set(url, {'title': 'Cached', 'duration': 42, 'uploader': 'Me', 'thumbnail': ''})
+    info = DownloadService().probe(url)
+    assert info['title'] == 'Cached'
+    assert info['duration'] == 42
+    assert info['tier'] == 'probe'
+    assert info['formats'] == []
+
+
+def test_probe_uses_oembed_first(server, monkeypatch):
+    monkeypatch.setitem(download_service_module.OEMBED_ENDPOINTS, 'other', server + '/oembed')
+    info = DownloadService().probe(server + '/oembed-video.mp4')
+    assert info['title'] == 'From oEmbed'
+    assert info['uploader'] == 'Someone'
+    assert info['thumbnail_proxy'].startswith('/api/thumbnail/')
+    assert [path.split('?')[0] for path in Handler.requests] == ['/oembed']
+
+
+def test_probe_falls_back_to_a_flat_extraction(server):
+    service = DownloadService()
+    url = server + '/flat-clip.mp4'
+    info = service.probe(url)
+    assert info['title'] == 'flat-clip'
+    assert info['supported']
+
+    # Cached: no further requests, and the JSON is memoized
+    seen = len(Handler.requests)
+    assert service.probe(url) is info
+    assert service.probe_json(url) is service.probe_json(url)
+    assert json.loads(service.probe_json(url))['title'] == 'flat-clip'
+    assert len(Handler.requests) == seen
+
+
+def test_info_cache_ttl_lru_and_url_variants():
+    cache = InfoCache(max_entries=2, ttl=60)
+    cache.set('https://www.youtube.com/watch?v=aaaaaaaaaaa', {'id': 'a'})
+    assert cache.get('https://youtu.be/aaaaaaaaaaa?si=x') == {'id': 'a'}
+
+    cache.set('https://www.youtube.com/watch?v=bbbbbbbbbbb', {'id': 'b'})
+    cache.get('https://www.youtube.com/watch?v=aaaaaaaaaaa')
+    cache.set('https://www.youtube.com/watch?v=ccccccccccc', {'id': 'c'})
+    assert cache.get('https://www.youtube.com/watch?v=bbbbbbbbbbb') is None
+    assert cache.get('https://www.youtube.com/watch?v=aaaaaaaaaaa') == {'id': 'a'}
+
+    cache.ttl = 0.01
+    time.sleep(0.02)
+    assert cache.get('https://www.youtube.com/watch?v=aaaaaaaaaaa') is None
+
+
+def test_memoized_values_are_dropped_with_their_entry():
+    cache = InfoCache(max_entries=4, ttl=60)
+    url = 'https://example.com/memo'
+    assert cache.memoize(url, 'json', str) is None
+    cache.set(url, {'v': 1})
+    first = cache.memoize(url, 'json', lambda info: object())
+    assert cache.memoize(url, 'json', lambda info: object()) is first
+    cache.set(url, {'v': 2})
+    assert cache.memoize(url, 'json', lambda info: info['v']) == 2
@@ -0,0 +1,100 @@
+"""Tests for the cheap checks in front of /api/download."""
+
+import json
+
+import pytest
+
+import backend.app as app_module
+import backend.request_checks as request_checks_module
+import backend.security as security_module
+from backend.circuit_breaker import CircuitBreaker
+from backend.rate_limiter import RateLimiter
+from backend.request_checks import RequestChecks
+from backend.url_classifier import allowed_hosts
+
+URL = 'https://www.youtube.com/watch?v=dQw4w9WgXcQ'
+
+
+@pytest.fixture
+def checks(monkeypatch):
+    """Fresh counters, a rate limit of one request and a breaker that opens on one failure."""
+    checks = RequestChecks()
+    monkeypatch.setattr(app_module, 'request_checks', checks)
+    monkeypatch.setattr(request_checks_module, 'rate_limiter', RateLimiter(max_requests=1))
+    monkeypatch.setattr(request_checks_module, 'circuit_breaker', CircuitBreaker(failure_threshold=1))
+    return checks
+
+
+def post(body, **kwargs):
+    data = body if isinstance(body, (bytes, str)) else json.dumps(body)
+    return app_module.app.test_client().post('/api/download', data=data, content_type='application/json', **kwargs)
+
+
+def test_oversized_body_is_413(checks):
+    response = post({'url': URL, 'padding': 'x' * checks.max_body_bytes})
+    assert response.status_code == 413
+    assert checks.stats()['rejected']['body'] == 1
+
+
+@pytest.mark.parametrize('body', [b'not json', b'[1, 2]'])
+def test_body_must_be_a_json_object(checks, body):
+    assert post(body).status_code == 400
+    assert checks.stats()['rejected']['body'] == 1
+
+
+@pytest.mark.parametrize('body, message', [
+    ({}, 'URL is required'),
+    ({'url': 5}, 'URL must be a string'),
+    ({'url': URL, 'audio_only': 'yes'}, 'audio_only'),
+    ({'url': URL, 'audio_format': 'flac'}, 'audio_format'),
+    ({'url': URL, 'start': 'abc'}, 'Invalid time'),
+    ({'url': URL, 'start': 60, 'end': 30}, 'Clip end must be after clip start'),
+])
+def test_schema_errors_are_400(checks, body, message):
+    response = post(body)
+    assert response.status_code == 400
+    assert message in response.get_json()['message']
+    assert checks.stats()['rejected']['schema'] == 1
+
+
+def test_non_finite_clip_time_is_400(checks):
+    # Not valid JSON, but Python's json module (and so get_json) accepts it
+    response = post(b'{"url": "%s", "start": NaN, "end": Infinity}' % URL.encode())
+    assert response.status_code == 400
+    assert checks.stats()['rejected']['schema'] == 1
+
+
+@pytest.mark.parametrize('url', ['ftp://www.youtube.com/video', 'https://'])
+def test_bad_url_is_400(checks, url):
+    assert post({'url': url}).status_code == 400
+    assert checks.stats()['rejected']['url'] == 1
+
+
+def test_disallowed_domain_is_403(checks, monkeypatch):
+    monkeypatch.setattr(security_module, 'ALLOWED_HOSTS', allowed_hosts(['vimeo.com']))
+    response = post({'url': URL})
+    assert response.status_code == 403
+    assert checks.stats()['rejected']['domain'] == 1
+
+
+def test_rate_limited_client_is_429_before_any_extraction(checks, monkeypatch):
+    calls = []
+    monkeypatch.setattr(app_module.download_service, 'refresh_info', lambda url: calls.append(url))
+    monkeypatch.setattr(app_module.download_service, 'get_video_info', lambda url: calls.append(url))
+    # Use up the one request
+    request_checks_module.rate_limiter.is_allowed('127.0.0.1')
+
+    response = post({'url': URL})
+    assert response.status_code == 429
+    assert response.get_json()['rate_limit_exceeded'] is True
+    assert checks.stats()['rejected']['rate_limit'] == 1
+    assert calls == []
+
+
+def test_open_breaker_is_503_with_retry_after(checks):
+    request_checks_module.circuit_breaker.record_failure('youtube')
+    response = post({'url': URL})
+    assert response.status_code == 503
+    assert int(response.headers['Retry-After']) > 0
+    assert checks.stats()['rejected']['breaker'] == 1
+    assert checks.stats()['passed'] == 0
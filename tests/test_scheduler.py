@@ -0,0 +1,170 @@
+"""Tests for the download scheduler's ordering, limits and timeouts."""
+
+import threading
+import time
+
+import pytest
+
+from backend.scheduler import DownloadScheduler, estimate_job_cost, DEFAULT_JOB_COST
+
+
+@pytest.fixture
+def scheduler():
+    """One slot, no lane/platform limits or weights."""
+    return DownloadScheduler(max_concurrent=1, lane_limits={}, platform_limits={}, client_weights={}, max_wait=5)
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached")
+        time.sleep(0.005)
+
+
+def run_queued(scheduler, jobs, **blocker):
+    """
+    Occupy every slot, queue `jobs` ([(name, run kwargs)]) in order, then
+    free the slots. Returns the names in the order they ran.
+    """
+    release = threading.Event()
+    order = []
+    threads = []
+
+    blocking = [
+        threading.Thread(daemon=True, target=scheduler.run, args=(release.wait,), kwargs={'client_ip': 'blocker', **blocker})
+        for _ in range(scheduler.max_concurrent)
+    ]
+    for thread in blocking:
+        thread.start()
+    wait_for(lambda: scheduler.stats()['running'] == scheduler.max_concurrent)
+
+    for name, kwargs in jobs:
+        thread = threading.Thread(daemon=True, target=scheduler.run, args=(lambda name=name: order.append(name),), kwargs=kwargs)
+        thread.start()
+        threads.append(thread)
+        expected = len(threads)
+        wait_for(lambda: scheduler.stats()['waiting'] == expected)
+
+    release.set()
+    for thread in blocking + threads:
+        thread.join(timeout=5)
+    return order
+
+
+def test_new_client_is_not_stuck_behind_a_busy_one(scheduler):
+    order = run_queued(scheduler, [
+        ('a1', {'client_ip': 'a', 'cost': 10}),
+        ('a2', {'client_ip': 'a', 'cost': 10}),
+        ('a3', {'client_ip': 'a', 'cost': 10}),
+        ('b1', {'client_ip': 'b', 'cost': 10}),
+    ])
+    assert order.index('b1') < order.index('a2')
+    assert order.index('a1') < order.index('a2') < order.index('a3')
+
+
+def test_shorter_jobs_run_first(scheduler):
+    order = run_queued(scheduler, [
+        ('long', {'client_ip': 'a', 'cost': 500}),
+        ('short', {'client_ip': 'b', 'cost': 1}),
+    ])
+    assert order == ['short', 'long']
+
+
+def test_client_weight_buys_earlier_slots():
+    scheduler = DownloadScheduler(max_concurrent=1, lane_limits={}, platform_limits={}, client_weights={'premium': 10.0})
+    order = run_queued(scheduler, [
+        ('normal', {'client_ip': 'normal', 'cost': 50}),
+        ('premium', {'client_ip': 'premium', 'cost': 50}),
+    ])
+    assert order == ['premium', 'normal']
+
+
+def test_free_lane_is_not_blocked_by_a_full_one():
+    scheduler = DownloadScheduler(max_concurrent=2, lane_limits={'video': 1, 'audio': 1}, platform_limits={}, client_weights={})
+    release = threading.Event()
+    video = threading.Thread(daemon=True, target=scheduler.run, args=(release.wait,), kwargs={'client_ip': 'a', 'lane': 'video'})
+    video.start()
+    wait_for(lambda: scheduler.stats()['running'] == 1)
+
+    ran = []
+    scheduler.run(lambda: ran.append('audio'), client_ip='b', lane='audio')
+    assert ran == ['audio']
+    release.set()
+    video.join(timeout=5)
+
+
+def test_platform_limit():
+    scheduler = DownloadScheduler(max_concurrent=3, lane_limits={}, platform_limits={'youtube': 1}, client_weights={})
+    release = threading.Event()
+    first = threading.Thread(daemon=True, target=scheduler.run, args=(release.wait,),
+                             kwargs={'client_ip': 'a', 'platform': 'youtube'})
+    first.start()
+    wait_for(lambda: scheduler.stats()['running'] == 1)
+
+    waiter = threading.Thread(daemon=True, target=scheduler.run, args=(lambda: None,),
+                              kwargs={'client_ip': 'b', 'platform': 'youtube'})
+    waiter.start()
+    wait_for(lambda: scheduler.stats()['waiting'] == 1)
+    assert scheduler.run(lambda: 'vimeo', client_ip='c', platform='vimeo') == 'vimeo'
+
+    release.set()
+    first.join(timeout=5)
+    waiter.join(timeout=5)
+    assert scheduler.stats()['running'] == 0
+
+
+def test_timeout_gives_up_and_returns_the_reserved_capacity():
+    scheduler = DownloadScheduler(max_concurrent=1, lane_limits={}, platform_limits={}, client_weights={}, max_wait=0.1)
+    release = threading.Event()
+    blocker = threading.Thread(daemon=True, target=scheduler.run, args=(release.wait,), kwargs={'client_ip': 'blocker'})
+    blocker.start()
+    wait_for(lambda: scheduler.stats()['running'] == 1)
+
+    before = scheduler._last_tag.get('a', 0.0)
+    with pytest.raises(Exception, match='busy'):
+        scheduler.run(lambda: None, client_ip='a', cost=40)
+    assert scheduler._last_tag['a'] == pytest.approx(max(before, scheduler._virtual_time))
+    assert scheduler.stats()['waiting'] == 0
+
+    release.set()
+    blocker.join(timeout=5)
+
+
+def test_timeout_after_client_was_forgotten():
+    scheduler = DownloadScheduler(max_concurrent=1, lane_limits={}, platform_limits={}, client_weights={}, max_wait=0.1)
+    release = threading.Event()
+    blocker = threading.Thread(daemon=True, target=scheduler.run, args=(release.wait,), kwargs={'client_ip': 'blocker'})
+    blocker.start()
+    wait_for(lambda: scheduler.stats()['running'] == 1)
+
+    original_wait = scheduler._cond.wait
+
+    def wait_and_forget(timeout=None):
+        result = original_wait(timeout)
+        scheduler._last_tag.pop('a', None)  # What _forget_idle_clients does under load
+        return result
+
+    scheduler._cond.wait = wait_and_forget
+    with pytest.raises(Exception, match='busy'):
+        scheduler.run(lambda: None, client_ip='a')
+
+    release.set()
+    blocker.join(timeout=5)
+
+
+def test_slot_is_freed_when_the_job_fails(scheduler):
+
+    def fail():
+        raise RuntimeError('boom')
+
+    with pytest.raises(RuntimeError):
+        scheduler.run(fail, client_ip='a')
+    assert scheduler.run(lambda: 'ok', client_ip='a') == 'ok'
+    assert scheduler.stats()['running'] == 0
+
+
+def test_estimate_job_cost():
+    assert estimate_job_cost(None) == DEFAULT_JOB_COST
+    assert estimate_job_cost({'filesize': 10 * 1024 * 1024}) == pytest.approx(10)
+    assert estimate_job_cost({'duration': 60}, audio_only=True) < estimate_job_cost({'duration': 60})
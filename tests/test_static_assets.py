@@ -0,0 +1,69 @@
+import gzip
+
+import pytest
+from flask import Request
+from werkzeug.test import EnvironBuilder
+
+from backend.static_assets import StaticAssets, ASSET_FILES, IMMUTABLE_CACHE, REVALIDATE_CACHE
+
+APP_JS = b'console.log("hello");\n' * 40
+
+
+@pytest.fixture
+def assets(tmp_path):
+    for name in ASSET_FILES:
+        (tmp_path / name).write_bytes(APP_JS if name == 'app.js' else b'/* tiny */')
+    (tmp_path / 'index.html').write_text(
+        '<link rel="stylesheet" href="styles.css"><script src="app.js"></script>' + ' ' * 300, encoding='utf-8')
+    return StaticAssets(tmp_path)
+
+
+def request_with(**headers) -> Request:
+    return Request(EnvironBuilder(headers=headers).get_environ())
+
+
+def test_gzip_when_accepted(assets):
+    response = assets.response('app.js', request_with(**{'Accept-Encoding': 'gzip, deflate'}))
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.get_data()) == APP_JS
+    assert response.headers['Vary'] == 'Accept-Encoding'
+    assert response.headers['Cache-Control'] == REVALIDATE_CACHE
+
+
+@pytest.mark.parametrize('accept', ['gzip;q=0', 'identity', '', 'gzip;q=0, identity;q=1'])
+def test_identity_when_gzip_is_not_acceptable(assets, accept):
+    response = assets.response('app.js', request_with(**{'Accept-Encoding': accept}))
+    assert 'Content-Encoding' not in response.headers
+    assert response.get_data() == APP_JS
+
+
+def test_tiny_files_are_not_compressed(assets):
+    response = assets.response('ads.js', request_with(**{'Accept-Encoding': 'gzip'}))
+    assert 'Content-Encoding' not in response.headers
+
+
+def test_not_modified_only_for_the_same_encoding(assets):
+    gzipped = assets.response('app.js', request_with(**{'Accept-Encoding': 'gzip'}))
+    plain = assets.response('app.js', request_with())
+    assert gzipped.headers['ETag'] != plain.headers['ETag']
+
+    revalidated = assets.response('app.js', request_with(**{
+        'Accept-Encoding': 'gzip', 'If-None-Match': gzipped.headers['ETag']}))
+    assert revalidated.status_code == 304
+    assert revalidated.get_data() == b''
+
+    # Holding the gzip representation doesn't make the identity one fresh
+    response = assets.response('app.js', request_with(**{'If-None-Match': gzipped.headers['ETag']}))
+    assert response.status_code == 200
+    assert response.get_data() == APP_JS
+
+
+def test_index_points_at_fingerprinted_assets(assets):
+    html = assets.response('index.html', request_with()).get_data(as_text=True)
+    name = html.split('src="/assets/')[1].split('"')[0]
+    assert name.startswith('app.') and name != 'app.js'
+
+    response = assets.response(name, request_with(), fingerprinted=True)
+    assert response.headers['Cache-Control'] == IMMUTABLE_CACHE
+    assert response.get_data() == APP_JS
+    assert assets.response('app.js', request_with(), fingerprinted=True) is None
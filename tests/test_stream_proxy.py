@@ -0,0 +1,122 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from backend.stream_proxy import BufferPool, StreamProxy
+
+MEDIA = bytes(range(256)) * 64
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    connections = set()
+
+    def do_GET(self):
+        Handler.connections.add(self.client_address)
+        if self.path.startswith('/redirect'):
+            hops = int(self.path.rsplit('/', 1)[1])
+            self.send_response(302)
+            self.send_header('Location', f"/redirect/{hops - 1}" if hops > 1 else '/media')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = MEDIA
+        status = 200
+        if self.headers.get('Range') == 'bytes=0-99':
+            body, status = MEDIA[:100], 206
+        self.send_response(status)
+        self.send_header('Content-Type', 'video/mp4')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('X-Upstream-Only', 'yes')
+        self.end_headers()
+        self.wfile.write(body)
+        if self.path == '/drop':
+            # Looks like keep-alive to the client, but the server hangs up
+            self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def upstream():
+    Handler.connections = set()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def fetch(proxy, url, **kwargs):
+    status, headers, body = proxy.open(url, **kwargs)
+    return status, headers, b''.join(body)
+
+
+def test_buffer_pool_reuses_and_caps_idle_buffers():
+    pool = BufferPool(buffer_size=16, max_buffers=2)
+    buffers = [pool.acquire() for _ in range(4)]
+    assert all(len(b) == 16 for b in buffers)
+    for buffer in buffers:
+        pool.release(buffer)
+    assert len(pool._buffers) == 2
+    assert pool.acquire() is buffers[1]
+
+
+def test_streams_body_and_passes_through_headers(upstream):
+    proxy = StreamProxy()
+    proxy.buffers = BufferPool(buffer_size=1000, max_buffers=1)
+    status, headers, body = fetch(proxy, upstream + '/media')
+    assert status == 200
+    assert body == MEDIA
+    assert headers == {'Content-Type': 'video/mp4', 'Content-Length': str(len(MEDIA))}
+
+
+def test_range_is_forwarded(upstream):
+    status, headers, body = fetch(StreamProxy(), upstream + '/media', range_header='bytes=0-99')
+    assert status == 206
+    assert body == MEDIA[:100]
+
+
+def test_redirects_are_followed_up_to_the_limit(upstream):
+    proxy = StreamProxy()
+    assert fetch(proxy, upstream + '/redirect/3')[2] == MEDIA
+    with pytest.raises(Exception, match='Too many redirects'):
+        proxy.open(upstream + '/redirect/4')
+
+
+def test_connection_is_kept_alive_between_transfers(upstream):
+    proxy = StreamProxy()
+    fetch(proxy, upstream + '/media')
+    fetch(proxy, upstream + '/media')
+    assert len(Handler.connections) == 1
+
+
+def test_stale_connection_is_retried_on_a_fresh_one(upstream):
+    proxy = StreamProxy()
+    fetch(proxy, upstream + '/drop')
+    # The pooled connection was closed by the server
+    status, _, body = fetch(proxy, upstream + '/media')
+    assert status == 200
+    assert body == MEDIA
+    assert len(Handler.connections) == 2
+
+
+def test_abandoned_transfer_does_not_return_its_connection(upstream):
+    proxy = StreamProxy()
+    proxy.buffers = BufferPool(buffer_size=100, max_buffers=1)
+    _, _, body = proxy.open(upstream + '/media')
+    next(body)
+    body.close()
+    assert not any(proxy.connections._idle.values())
+
+
+def test_token_round_trip_and_tampering():
+    proxy = StreamProxy()
+    token = proxy.make_token('https://cdn.example.com/v.mp4', {'Referer': 'https://example.com/'}, 'direct')
+    assert proxy.load_token(token) == {
+        'url': 'https://cdn.example.com/v.mp4', 'headers': {'Referer': 'https://example.com/'}, 'route': 'direct',
+    }
+    assert proxy.load_token(token[:-2] + 'xx') is None
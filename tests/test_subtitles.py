@@ -0,0 +1,110 @@
+"""Tests for subtitle track picking, the WebVTT -> SubRip converter and /api/subtitles."""
+
+import pytest
+
+from backend.info_cache import info_cache
+from backend.subtitles import vtt_to_srt, languages, pick_track, render, SubtitlesNotFound
+
+
+def vtt(*cues):
+    blocks = ['WEBVTT\nKind: captions\nLanguage: en']
+    for start, end, text in cues:
+        blocks.append(f"{start} --> {end} align:start position:0%\n{text}")
+    return '\n\n'.join(blocks) + '\n'
+
+
+def texts(srt):
+    """Cue texts of an SRT document."""
+    return [block.split('\n', 2)[2] for block in srt.strip().split('\n\n')]
+
+
+def test_basic_conversion():
+    srt = vtt_to_srt(vtt(
+        ('00:00:01.000', '00:00:02.500', 'Hello'),
+        ('01:02:03.004', '01:02:04.000', '<c>World</c>'),
+    ))
+    assert srt == (
+        "1\n00:00:01,000 --> 00:00:02,500\nHello\n\n"
+        "2\n01:02:03,004 --> 01:02:04,000\nWorld\n"
+    )
+
+
+def test_short_timestamps_and_cue_identifiers():
+    srt = vtt_to_srt("WEBVTT\n\nintro\n00:01.000 --> 00:02.000\nHi\n")
+    assert srt == "1\n00:00:01,000 --> 00:00:02,000\nHi\n"
+
+
+def test_header_note_and_style_blocks_are_dropped():
+    srt = vtt_to_srt(
+        "WEBVTT\n\nNOTE a comment\n\nSTYLE\n::cue { color: red }\n\n"
+        "00:00:01.000 --> 00:00:02.000\nText\n"
+    )
+    assert texts(srt) == ['Text']
+
+
+def test_uploaded_subtitles_keep_repeated_lines():
+    cues = vtt(
+        ('00:00:01.000', '00:00:02.000', 'yeah'),
+        ('00:00:02.000', '00:00:03.000', 'yeah'),
+        ('00:00:03.000', '00:00:04.000', 'Hello'),
+        ('00:00:04.000', '00:00:05.000', 'Hello\nWorld'),
+    )
+    assert texts(vtt_to_srt(cues)) == ['yeah', 'yeah', 'Hello', 'Hello\nWorld']
+
+
+def test_automatic_captions_drop_the_roll_up_overlap():
+    cues = vtt(
+        ('00:00:01.000', '00:00:03.000', 'we are going'),
+        ('00:00:03.000', '00:00:03.010', 'we are going'),
+        ('00:00:03.010', '00:00:05.000', 'we are going\nto the park'),
+        ('00:00:05.000', '00:00:07.000', 'to the park\nand then home'),
+    )
+    assert texts(vtt_to_srt(cues, auto=True)) == ['we are going', 'to the park', 'and then home']
+
+
+def test_automatic_captions_only_strip_a_prefix():
+    # "yes" also appeared earlier in the previous cue, but not at its end
+    cues = vtt(
+        ('00:00:01.000', '00:00:02.000', 'yes\nno'),
+        ('00:00:02.000', '00:00:03.000', 'yes\nmaybe'),
+    )
+    assert texts(vtt_to_srt(cues, auto=True)) == ['yes\nno', 'yes\nmaybe']
+
+
+def test_bad_timestamps_are_skipped():
+    srt = vtt_to_srt("WEBVTT\n\nxx --> yy\nBroken\n\n00:00:01.000 --> 00:00:02.000\nFine\n")
+    assert texts(srt) == ['Fine']
+
+
+def test_track_selection():
+    info = {'subtitles': {
+        'en': [{'ext': 'json3', 'url': 'j'}, {'ext': 'vtt', 'url': 'v'}],
+        'de': [{'ext': 'vtt'}],  # No URL - unusable
+    }}
+    assert languages(info['subtitles']) == ['en']
+    assert pick_track(info, 'en', False, 'srt')['url'] == 'v'
+    assert pick_track(info, 'de', False, 'srt') is None
+
+
+def test_missing_language_is_a_not_found_error():
+    with pytest.raises(SubtitlesNotFound):
+        render({'subtitles': {'en': [{'url': 'https://example.com/en.vtt', 'ext': 'vtt'}]}}, 'fr')
+
+
+def test_endpoint_maps_only_missing_tracks_to_404(monkeypatch):
+    import backend.app as app_module
+
+    url = 'https://www.youtube.com/watch?v=sUbT1tLe5xx'
+    info_cache.set(url, {'id': 'sUbT1tLe5xx', 'title': 'Captions', 'subtitles': {}})
+    client = app_module.app.test_client()
+
+    response = client.get('/api/subtitles', query_string={'url': url, 'lang': 'fr'})
+    assert response.status_code == 404
+
+    def unavailable(*args):
+        raise Exception('ERROR: [youtube] sUbT1tLe5xx: Video unavailable')
+
+    monkeypatch.setattr(app_module.download_service, 'get_subtitles', unavailable)
+    response = client.get('/api/subtitles', query_string={'url': url, 'lang': 'fr'})
+    assert response.status_code == 400
+    assert 'Video unavailable' in response.get_json()['message']
@@ -0,0 +1,71 @@
+import io
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from PIL import Image
+
+from backend.thumbnail_cache import ThumbnailCache
+
+
+def png_bytes(width=1280, height=720) -> bytes:
+    out = io.BytesIO()
+    Image.new('RGB', (width, height), (200, 30, 30)).save(out, format='PNG')
+    return out.getvalue()
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == '/to-ftp':
+            self.send_response(302)
+            self.send_header('Location', 'ftp://127.0.0.1/etc/passwd')
+            self.end_headers()
+            return
+        body = png_bytes()
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/png')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ThumbnailCache(tmp_path / 'thumbnails', max_bytes=10 * 1024 * 1024)
+
+
+@pytest.mark.parametrize('url', ['file:///etc/passwd', 'ftp://example.com/a.jpg', 'data:image/png;base64,AAAA'])
+def test_non_http_urls_are_refused(cache, url):
+    with pytest.raises(Exception, match='http or https'):
+        cache.get(url)
+    assert not list(cache.cache_dir.glob('*_*'))
+
+
+def test_redirect_to_ftp_is_refused(cache, server):
+    with pytest.raises(Exception, match='disallowed URL scheme'):
+        cache.get(server + '/to-ftp')
+
+
+def test_variants_are_resized_and_shared_by_content(cache, server):
+    path, mimetype = cache.get(server + '/a.png', size='small', webp=True)
+    assert mimetype == 'image/webp'
+    assert Image.open(path).width == 320
+
+    other, _ = cache.get(server + '/same-image-other-url.png', size='small', webp=True)
+    assert other == path
+    medium, mimetype = cache.get(server + '/a.png', size='medium')
+    assert mimetype == 'image/jpeg'
+    assert Image.open(medium).width == 640
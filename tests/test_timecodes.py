@@ -0,0 +1,16 @@
+import pytest
+
+from backend.timecodes import parse_time
+
+
+@pytest.mark.parametrize('value, seconds', [
+    (None, None), ('', None), (90, 90.0), (1.5, 1.5), ('90', 90.0), ('1:30', 90.0), (' 1:02:03 ', 3723.0),
+])
+def test_parse_time(value, seconds):
+    assert parse_time(value) == seconds
+
+
+@pytest.mark.parametrize('value', ['abc', -1, '-5', True, float('nan'), float('inf'), 'inf'])
+def test_parse_time_rejects(value):
+    with pytest.raises(ValueError):
+        parse_time(value)
@@ -0,0 +1,65 @@
+import shutil
+import threading
+import time
+import wave
+
+import pytest
+
+import backend.transcoder as transcoder_module
+from backend.config import FFMPEG_BINARY
+from backend.transcoder import Transcoder
+
+
+def test_encodes_are_capped_by_the_pool(monkeypatch, tmp_path):
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def encode(source, bitrate):
+        with lock:
+            running.append(source)
+            peak.append(len(running))
+        time.sleep(0.05)
+        with lock:
+            running.remove(source)
+        return source.with_suffix('.mp3')
+
+    monkeypatch.setattr(Transcoder, '_encode_mp3', staticmethod(encode))
+    transcoder = Transcoder(max_workers=2)
+    threads = [threading.Thread(target=transcoder.to_mp3, args=(tmp_path / f"{n}.m4a",), daemon=True) for n in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert max(peak) == 2
+
+
+def test_mp3_source_is_left_alone(tmp_path):
+    source = tmp_path / 'song.mp3'
+    source.write_bytes(b'ID3')
+    assert Transcoder(max_workers=1).to_mp3(source) == source
+    assert source.read_bytes() == b'ID3'
+
+
+def test_failed_encode_keeps_the_source_and_cleans_up(monkeypatch, tmp_path):
+    monkeypatch.setattr(transcoder_module, 'FFMPEG_BINARY', str(tmp_path / 'no-such-ffmpeg'))
+    source = tmp_path / 'song.m4a'
+    source.write_bytes(b'not audio')
+    with pytest.raises(Exception, match='mp3 conversion failed'):
+        Transcoder(max_workers=1).to_mp3(source)
+    assert source.exists()
+    assert [p.name for p in tmp_path.iterdir()] == ['song.m4a']
+
+
+@pytest.mark.skipif(shutil.which(FFMPEG_BINARY) is None, reason='ffmpeg is not installed')
+def test_encode_replaces_the_source_with_an_mp3(tmp_path):
+    source = tmp_path / 'tone.wav'
+    with wave.open(str(source), 'wb') as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(8000)
+        out.writeframes(b'\x00\x10' * 8000)
+    target = Transcoder(max_workers=1).to_mp3(source, bitrate='64k')
+    assert target == tmp_path / 'tone.mp3'
+    assert target.stat().st_size > 0
+    assert not source.exists()
@@ -0,0 +1,14 @@
+from backend.url_classifier import classify_url
+
+
+def test_watch_url_in_playlist_is_the_video():
+    plain = classify_url('https://www.youtube.com/watch?v=dQw4w9WgXcQ')
+    in_list = classify_url('https://www.youtube.com/watch?v=dQw4w9WgXcQ&list=PL1234567890&index=3')
+    assert in_list.video_id == 'dQw4w9WgXcQ'
+    assert in_list.cache_key == plain.cache_key
+
+
+def test_playlist_page_has_no_video_id():
+    classified = classify_url('https://www.youtube.com/playlist?list=PL1234567890')
+    assert classified.video_id is None
+    assert 'list=PL1234567890' in classified.normalized_url
@@ -0,0 +1,86 @@
+"""Tests for per-job workspaces and publishing under unique names."""
+
+from pathlib import Path
+
+import pytest
+import yt_dlp
+
+import backend.download_service as download_service_module
+from backend.artifact_store import LocalArtifactStore
+from backend.download_service import DownloadService
+
+URL = 'https://example.com/video'
+
+
+@pytest.fixture
+def downloads(tmp_path, monkeypatch):
+    """Send job workspaces and published files to tmp_path."""
+    store = LocalArtifactStore(tmp_path / 'downloads')
+    monkeypatch.setattr(download_service_module, 'WORK_DIR', tmp_path / 'work')
+    monkeypatch.setattr(download_service_module, 'artifact_store', store)
+    return store
+
+
+def fake_download(body=b'media', title='Same Title', report=True):
+    """YoutubeDL.extract_info that writes one file to outtmpl and reports it like yt-dlp's post hooks."""
+    def extract_info(self, url, download=False):
+        path = Path(self.params['outtmpl']['default'] % {'title': title, 'ext': 'mp4'})
+        path.write_bytes(body)
+        if report:
+            for hook in self.params['post_hooks']:
+                hook(str(path))
+        return {'title': title}
+    return extract_info
+
+
+def test_published_name_is_unique_per_job():
+    path = Path('/work/job/My: Video.mp4')
+    first = DownloadService._published_name(path, 'a' * 40)
+    assert first == f"My_ Video [{'a' * 12}].mp4"
+    assert DownloadService._published_name(path, 'a' * 40) == first
+    assert DownloadService._published_name(path, 'b' * 40) != first
+
+
+def test_long_title_keeps_job_key_and_extension():
+    name = DownloadService._published_name(Path('x' * 300 + '.webm'), 'c' * 40)
+    assert len(name) == 200
+    assert name.endswith(f" [{'c' * 12}].webm")
+
+
+def test_download_is_published_and_workspace_removed(downloads, tmp_path, monkeypatch):
+    monkeypatch.setattr(yt_dlp.YoutubeDL, 'extract_info', fake_download())
+    result = DownloadService()._run_download(URL, '18', False, 'd' * 40)
+
+    assert result['filename'] == f"Same Title [{'d' * 12}].mp4"
+    assert result['filesize'] == 5
+    assert Path(result['filepath']).read_bytes() == b'media'
+    assert downloads.exists(result['filename'])
+    assert not (tmp_path / 'work' / ('d' * 40)).exists()
+
+
+def test_same_title_from_two_jobs_does_not_collide(downloads, monkeypatch):
+    service = DownloadService()
+    monkeypatch.setattr(yt_dlp.YoutubeDL, 'extract_info', fake_download(b'first'))
+    first = service._run_download(URL, '18', False, 'e' * 40)
+    monkeypatch.setattr(yt_dlp.YoutubeDL, 'extract_info', fake_download(b'second'))
+    second = service._run_download('https://example.com/other', '18', False, 'f' * 40)
+
+    assert first['filename'] != second['filename']
+    assert downloads.local_path(first['filename']).read_bytes() == b'first'
+    assert downloads.local_path(second['filename']).read_bytes() == b'second'
+
+
+def test_file_without_post_hook_report_is_not_guessed(downloads, monkeypatch):
+    monkeypatch.setattr(yt_dlp.YoutubeDL, 'extract_info', fake_download(report=False))
+    with pytest.raises(Exception, match='Downloaded file not found'):
+        DownloadService()._run_download(URL, '18', False, 'g' * 40)
+    assert list(downloads.root.iterdir()) == []
+
+
+def test_oversized_file_is_not_published(downloads, tmp_path, monkeypatch):
+    monkeypatch.setattr(download_service_module, 'MAX_DOWNLOAD_SIZE_BYTES', 3)
+    monkeypatch.setattr(yt_dlp.YoutubeDL, 'extract_info', fake_download())
+    with pytest.raises(Exception, match='File too large'):
+        DownloadService()._run_download(URL, '18', False, 'h' * 40)
+    assert list(downloads.root.iterdir()) == []
+    assert not (tmp_path / 'work' / ('h' * 40)).exists()